@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+向量索引后端基准测试：faiss / numpy / hnswlib
+
+对每个已安装的后端，使用相同的向量和查询测量建索引耗时、recall@k（以精确检索为基准）、
+每个查询的耗时、索引文件大小和打开索引的耗时。后端按配置选择索引结构
+（--type auto 时按向量数量在 flat / HNSW / IVF-PQ 之间选择）。
+
+用法:
+    python benchmarks/bench_backends.py [--count 100000] [--dim 384] [--k 10]
+    python benchmarks/bench_backends.py --backends numpy,hnswlib --type hnsw
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import numpy as np
+
+from bench_storage import load_vectors, make_vectors
+from prompts_tool.core.backends import NumpyBackend, available_backends
+from prompts_tool.core.config import IndexConfig
+
+
+def main():
+    parser = argparse.ArgumentParser(description="向量索引后端基准测试")
+    parser.add_argument("--count", type=int, default=100000, help="合成向量数量")
+    parser.add_argument("--dim", type=int, default=384, help="合成向量维度")
+    parser.add_argument("--queries-count", type=int, default=1000, help="合成查询数量")
+    parser.add_argument("--vectors", help="评测集文档嵌入 .npy")
+    parser.add_argument("--queries", help="评测集查询嵌入 .npy")
+    parser.add_argument("--backends", help="要测试的后端，逗号分隔（默认全部已安装的后端）")
+    parser.add_argument("--type", default="auto", help="索引结构: auto / flat / hnsw / ivfpq")
+    parser.add_argument("--k", type=int, default=10, help="recall@k 的 k")
+    args = parser.parse_args()
+
+    if args.vectors and args.queries:
+        vectors, queries = load_vectors(args.vectors), load_vectors(args.queries)
+    else:
+        data = make_vectors(args.count + args.queries_count, args.dim)
+        vectors, queries = data[:args.count], data[args.count:]
+    ids = np.arange(len(vectors), dtype="int64")
+    dim = vectors.shape[1]
+    config = IndexConfig(type=args.type, rescore=False)
+
+    backends = available_backends()
+    if args.backends:
+        backends = {name: backends[name] for name in args.backends.split(",") if name in backends}
+
+    exact = NumpyBackend.build(NumpyBackend.choose_spec(len(vectors), dim, config), vectors, ids)
+    _, truth = exact.search(queries, args.k)
+
+    print(f"\n{len(vectors)} 个向量，{dim} 维，{len(queries)} 个查询，recall@{args.k}（基准: 精确检索）")
+    print(f"{'后端':<10} {'结构':<22} {'建索引秒':>8} {'recall':>8} {'毫秒/查询':>10} {'文件 MB':>8} {'打开毫秒':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, backend_type in backends.items():
+            spec = backend_type.choose_spec(len(vectors), dim, config)
+            start = time.perf_counter()
+            index = backend_type.build(spec, vectors, ids)
+            build_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            _, found = index.search(queries, args.k)
+            query_ms = (time.perf_counter() - start) / len(queries) * 1000
+            recall = np.mean([len(set(f) & set(t)) / args.k for f, t in zip(found, truth)])
+
+            path = Path(tmp) / f"{name}.index"
+            index.save(path)
+            start = time.perf_counter()
+            backend_type.open(path, spec)
+            open_ms = (time.perf_counter() - start) * 1000
+
+            print(f"{name:<10} {spec['factory']:<22} {build_seconds:>8.2f} {recall:>8.4f} "
+                  f"{query_ms:>10.3f} {path.stat().st_size / 2**20:>8.1f} {open_ms:>8.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
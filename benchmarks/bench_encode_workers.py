@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+多进程编码扩展性基准测试
+
+在合成语料上依次使用 1、2、4 … N 个编码进程（每个进程分到相同份额的 CPU
+线程），输出每秒 token 数、相对单进程的加速比和并行效率。进程启动和模型
+加载时间不计入吞吐量。
+
+需要 sentence-transformers（首次运行会下载模型）；--backend onnx 需要先导出 ONNX 模型。
+
+用法:
+    python benchmarks/bench_encode_workers.py [--texts 4000] [--max-workers 8]
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from bench_encode import make_texts
+from prompts_tool.core.batching import token_lengths
+from prompts_tool.core.config import Config, ModelConfig
+from prompts_tool.core.encode_pool import EncodePool
+from prompts_tool.core.encoders import load_encoder
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多进程编码扩展性基准测试")
+    parser.add_argument("--texts", type=int, default=4000, help="合成文本数量")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2", help="嵌入模型名称")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1, help="最大进程数")
+    parser.add_argument("--memory-mb", type=int, default=1024, help="所有进程合计的批次内存预算")
+    parser.add_argument("--backend", default="torch", help="编码后端: torch 或 onnx")
+    args = parser.parse_args()
+
+    model_config = ModelConfig(name=args.model, backend=args.backend, batch_memory_mb=args.memory_mb)
+    onnx_path = Config(model=model_config).get_onnx_model_path()
+
+    texts = make_texts(args.texts)
+    lengths = token_lengths(load_encoder(model_config, onnx_path), texts)
+    counts = []
+    workers = 1
+    while workers < args.max_workers:
+        counts.append(workers)
+        workers *= 2
+    counts.append(args.max_workers)
+
+    print(f"\n{len(texts)} 个文本，共 {sum(lengths)} 个 token，模型 {args.model}，{os.cpu_count()} 个核心")
+    print(f"{'进程':>4} {'线程/进程':>9} {'token/秒':>12} {'加速比':>8} {'效率':>6} {'模型加载':>8}")
+    baseline = None
+    for workers in counts:
+        started = time.perf_counter()
+        with EncodePool(model_config, workers, onnx_path=onnx_path) as pool:
+            # 预热：等待所有进程加载模型
+            pool.encode(texts[:workers * 8], lengths[:workers * 8])
+            warmup = time.perf_counter() - started
+            pool.encode(texts, lengths)
+        rate = pool.stats["tokens_per_second"]
+        baseline = baseline or rate
+        print(f"{workers:>4} {pool.stats['threads_per_worker']:>9} {rate:>12.0f} "
+              f"{rate / baseline:>7.2f}x {rate / baseline / workers:>6.0%} {warmup:>7.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+关键词查询延迟基准测试
+
+在合成的中英混合语料（默认 10 万个 Prompt）上建立 BM25 索引，测量单条
+查询的延迟分布（p50 / p95 / 最大值）。汉字按齐夫分布抽取，常用二元组
+的倒排列表很长，与真实中文语料相近。
+
+--no-prune 关闭高频词跳过，用于对比。索引写入 --db 指定的文件时，
+再次运行会直接复用，无需重新建立。
+
+用法:
+    python benchmarks/bench_keyword.py [--prompts 100000] [--queries 200] [--no-prune]
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from prompts_tool.core import keyword
+from prompts_tool.core.keyword import KeywordIndex
+from prompts_tool.core.tokenizer import Tokenizer
+
+LATIN_WORDS = ["python", "function", "docstring", "review", "pytest", "fixture", "API", "sql",
+               "refactor", "translate", "summary", "email", "commit", "bug", "design", "outline"]
+PUNCTUATION = ["，", "。", "：", "\n", " "]
+
+
+def make_text(rng: random.Random, hanzi: list, weights: list, chars: int) -> str:
+    """生成一段合成文本（齐夫分布的汉字 + 少量英文单词）"""
+    parts, length = [], 0
+    while length < chars:
+        run = "".join(rng.choices(hanzi, weights=weights, k=rng.randint(2, 12)))
+        parts.append(run)
+        parts.append(rng.choice(PUNCTUATION))
+        if rng.random() < 0.3:
+            parts.append(f" {rng.choice(LATIN_WORDS)} ")
+        length += len(run) + 1
+    return "".join(parts)
+
+
+def build(index: KeywordIndex, prompts: int, doc_chars: int, seed: int = 0) -> float:
+    """建立索引，返回耗时（秒）"""
+    rng = random.Random(seed)
+    hanzi = [chr(c) for c in range(0x4E00, 0x4E00 + 3000)]
+    weights = [1 / (rank + 1) for rank in range(len(hanzi))]
+    tokenize = index.tokenizer.tokenize
+
+    def documents():
+        for i in range(prompts):
+            text = make_text(rng, hanzi, weights, doc_chars)
+            yield f"prompt-{i:06d}.md", str(i), tokenize(text)
+            if (i + 1) % 10000 == 0:
+                print(f"   {i + 1}/{prompts}")
+
+    start = time.perf_counter()
+    index.update(documents())
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="关键词查询延迟基准测试")
+    parser.add_argument("--prompts", type=int, default=100000, help="合成 Prompt 数量")
+    parser.add_argument("--doc-chars", type=int, default=200, help="每个 Prompt 的字符数")
+    parser.add_argument("--queries", type=int, default=200, help="查询数量")
+    parser.add_argument("--query-chars", type=int, default=16, help="每条查询的字符数")
+    parser.add_argument("--top-k", type=int, default=50)
+    parser.add_argument("--db", help="索引数据库路径（默认使用临时目录）")
+    parser.add_argument("--no-prune", action="store_true", help="不跳过高频词")
+    args = parser.parse_args()
+
+    if args.no_prune:
+        keyword.MAX_DF_RATIO = 1.0
+        keyword.MAX_QUERY_TERMS = 1 << 30
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(args.db) if args.db else Path(tmp) / "keyword.sqlite"
+        index = KeywordIndex(db_path, Tokenizer("bigram"))
+
+        stats = index.get_stats()
+        if stats["documents"] != args.prompts:
+            if stats["documents"]:
+                index.close()
+                db_path.unlink()
+                index = KeywordIndex(db_path, Tokenizer("bigram"))
+            print(f"📝 建立 {args.prompts} 个 Prompt 的关键词索引...")
+            elapsed = build(index, args.prompts, args.doc_chars)
+            stats = index.get_stats()
+            print(f"✅ 建立完成: {elapsed:.1f}s, {stats['terms']} 个词, "
+                  f"{db_path.stat().st_size / 1024 / 1024:.0f} MB")
+
+        rng = random.Random(1)
+        hanzi = [chr(c) for c in range(0x4E00, 0x4E00 + 3000)]
+        weights = [1 / (rank + 1) for rank in range(len(hanzi))]
+        queries = [make_text(rng, hanzi, weights, args.query_chars) for _ in range(args.queries)]
+
+        # 预热页缓存
+        for query in queries[:10]:
+            index.search(query, args.top_k)
+
+        latencies = []
+        for query in queries:
+            start = time.perf_counter()
+            index.search(query, args.top_k)
+            latencies.append((time.perf_counter() - start) * 1000)
+        index.close()
+
+    latencies.sort()
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    print(f"\n📊 {'不跳过高频词' if args.no_prune else '跳过高频词'}，{args.queries} 条查询，"
+          f"{stats['documents']} 个 Prompt")
+    print(f"   p50: {statistics.median(latencies):.1f} ms")
+    print(f"   p95: {p95:.1f} ms")
+    print(f"   max: {latencies[-1]:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+编码后端基准测试：torch vs ONNX Runtime（float32 / int8）
+
+对每个后端测量：新进程中加载模型的启动时间（以及是否导入了 torch）、单条
+查询的嵌入延迟（p50 / p95），以及与 torch 后端嵌入的余弦相似度。
+
+需要先导出 ONNX 模型: prompts --export-onnx（需要 torch、onnxruntime、tokenizers）。
+
+用法:
+    python benchmarks/bench_onnx.py [--model all-MiniLM-L6-v2] [--queries 200]
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import numpy as np
+
+from bench_search_many import make_queries
+from prompts_tool.core.config import Config, ModelConfig
+from prompts_tool.core.encoders import OnnxEncoder, cross_check, load_encoder
+
+# 在新进程中加载编码器并编码一条查询，输出耗时和是否导入了 torch
+STARTUP_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+from prompts_tool.core.config import ModelConfig
+from prompts_tool.core.encoders import load_encoder
+model = load_encoder(ModelConfig(name={name!r}, backend={backend!r}, quantize={quantize!r}), {path!r})
+model.encode(["warm up"])
+print(json.dumps({{"seconds": time.perf_counter() - started, "torch": "torch" in sys.modules}}))
+"""
+
+
+def measure_startup(name: str, backend: str, quantize: bool, path: Path) -> dict:
+    script = STARTUP_SCRIPT.format(name=name, backend=backend, quantize=quantize, path=str(path))
+    output = subprocess.run([sys.executable, "-c", script], cwd=project_root,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def measure_latency(model, queries: list) -> tuple:
+    model.encode(queries[:4])
+    timings = []
+    for query in queries:
+        started = time.perf_counter()
+        model.encode([query])
+        timings.append(time.perf_counter() - started)
+    return np.percentile(timings, 50) * 1000, np.percentile(timings, 95) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="编码后端基准测试")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2", help="嵌入模型名称")
+    parser.add_argument("--queries", type=int, default=200, help="查询数量")
+    args = parser.parse_args()
+
+    path = Config(model=ModelConfig(name=args.model)).get_onnx_model_path()
+    queries = make_queries(args.queries)
+    reference = load_encoder(ModelConfig(name=args.model))
+    backends = [
+        ("torch", "torch", False, reference),
+        ("onnx float32", "onnx", False, OnnxEncoder(path, quantized=False)),
+        ("onnx int8", "onnx", True, OnnxEncoder(path, quantized=True)),
+    ]
+
+    print(f"\n模型 {args.model}，{len(queries)} 条单独编码的查询")
+    print(f"{'后端':<14} {'启动':>8} {'torch':>6} {'p50':>9} {'p95':>9} {'加速比':>7} {'最小余弦':>9}")
+    baseline = None
+    for label, backend, quantize, model in backends:
+        startup = measure_startup(args.model, backend, quantize, path)
+        p50, p95 = measure_latency(model, queries)
+        baseline = baseline or p50
+        agreement = cross_check(reference, model, queries[:64])
+        print(f"{label:<14} {startup['seconds']:>7.2f}s {str(startup['torch']):>6} "
+              f"{p50:>7.2f}ms {p95:>7.2f}ms {baseline / p50:>6.1f}x {agreement['min_cosine']:>9.4f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
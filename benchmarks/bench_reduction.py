@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+降维基准测试：PCA / Matryoshka 截断的召回率与索引大小
+
+以全维度的精确检索为基准，对若干目标维度分别测量 PCA 投影和前缀截断后的
+recall@k、保留的方差比例、索引字节数和查询耗时。
+
+默认使用合成的聚类向量（含大量各向同性噪声，结果偏悲观）；建议用 --vectors / --queries 传入
+评测集的真实嵌入。
+
+用法:
+    python benchmarks/bench_reduction.py [--dims 64,128,256] [--k 10]
+    python benchmarks/bench_reduction.py --vectors corpus.npy --queries queries.npy
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import faiss
+import numpy as np
+
+from bench_storage import index_bytes, load_vectors, make_vectors
+from prompts_tool.core.projection import Projection
+
+
+def main():
+    parser = argparse.ArgumentParser(description="降维基准测试")
+    parser.add_argument("--count", type=int, default=100000, help="合成向量数量")
+    parser.add_argument("--dim", type=int, default=384, help="合成向量维度")
+    parser.add_argument("--queries-count", type=int, default=1000, help="合成查询数量")
+    parser.add_argument("--vectors", help="评测集文档嵌入 .npy")
+    parser.add_argument("--queries", help="评测集查询嵌入 .npy")
+    parser.add_argument("--dims", default="64,128,256", help="目标维度，逗号分隔")
+    parser.add_argument("--k", type=int, default=10, help="recall@k 的 k")
+    args = parser.parse_args()
+
+    if args.vectors and args.queries:
+        vectors, queries = load_vectors(args.vectors), load_vectors(args.queries)
+    else:
+        data = make_vectors(args.count + args.queries_count, args.dim)
+        vectors, queries = data[:args.count], data[args.count:]
+
+    def run(docs: np.ndarray, probes: np.ndarray):
+        index = faiss.IndexFlatIP(docs.shape[1])
+        index.add(docs)
+        start = time.perf_counter()
+        _, found = index.search(probes, args.k)
+        return found, index_bytes(index), (time.perf_counter() - start) / len(probes) * 1000
+
+    truth, full_bytes, full_ms = run(vectors, queries)
+    print(f"\n{len(vectors)} 个向量，{vectors.shape[1]} 维，{len(queries)} 个查询，recall@{args.k}")
+    print(f"{'方式':<10} {'维度':>5} {'recall':>8} {'方差':>7} {'索引比':>7} {'毫秒/查询':>10}")
+    print(f"{'none':<10} {vectors.shape[1]:>5} {1.0:>8.4f} {1.0:>6.0%} {1.0:>6.2f}x {full_ms:>10.3f}")
+
+    for dim in [int(d) for d in args.dims.split(",")]:
+        for method in ("pca", "truncate"):
+            projection = Projection.fit(method, vectors, dim)
+            found, size, ms = run(projection.apply(vectors), projection.apply(queries))
+            recall = np.mean([len(set(f) & set(t)) / args.k for f, t in zip(found, truth)])
+            print(f"{method:<10} {projection.dim:>5} {recall:>8.4f} "
+                  f"{projection.explained_variance(vectors):>6.0%} {size / full_bytes:>6.2f}x {ms:>10.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+批量搜索吞吐量基准测试
+
+在合成的 Prompt 仓库上比较逐条调用 `PromptSearcher.search` 与一次调用
+`search_many`（一次批量编码 + 一次矩阵检索）的每秒查询数。
+
+需要 sentence-transformers 和 faiss（首次运行会下载模型）。
+
+用法:
+    python benchmarks/bench_search_many.py [--prompts 2000] [--queries 1000] [--mode vector]
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from prompts_tool.core.config import Config, RepoConfig, CacheConfig, ModelConfig
+from prompts_tool.core.repo import PromptRepo
+from prompts_tool.core.search import PromptSearcher
+
+TOPICS = ["code review", "docstring", "summarize", "unit test", "translate", "refactor",
+          "SQL query", "commit message", "bug report", "API design", "email reply", "outline"]
+STYLES = ["concise", "detailed", "friendly", "formal", "step by step", "bullet points"]
+
+
+def make_repo(root: Path, count: int, seed: int = 0) -> None:
+    """生成合成 Prompt 文件"""
+    rng = random.Random(seed)
+    for i in range(count):
+        topic, style = rng.choice(TOPICS), rng.choice(STYLES)
+        text = (
+            f"# {topic.title()} #{i}\n"
+            f"You are an assistant. Write a {style} {topic} for {{{{input}}}}.\n"
+            f"Focus on {rng.choice(TOPICS)} and keep it {rng.choice(STYLES)}.\n"
+        )
+        (root / f"prompt_{i:05d}.md").write_text(text, encoding="utf-8")
+
+
+def make_queries(count: int, seed: int = 1) -> list:
+    rng = random.Random(seed)
+    return [f"{rng.choice(STYLES)} {rng.choice(TOPICS)}" for _ in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量搜索吞吐量基准测试")
+    parser.add_argument("--prompts", type=int, default=2000, help="合成 Prompt 数量")
+    parser.add_argument("--queries", type=int, default=1000, help="查询数量")
+    parser.add_argument("--mode", default="vector", help="搜索模式: vector 或 hybrid")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2", help="嵌入模型名称")
+    parser.add_argument("--top-k", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        make_repo(root, args.prompts)
+        config = Config(
+            repo=RepoConfig(local_paths=[str(root)]),
+            model=ModelConfig(name=args.model),
+            cache=CacheConfig(enabled=False),
+        )
+        searcher = PromptSearcher(config, PromptRepo(config))
+        if not searcher.ensure_index():
+            print("❌ 索引构建失败")
+            return 1
+
+        queries = make_queries(args.queries)
+        # 预热（模型首次推理、页缓存）
+        searcher.search_many(queries[:8], top_k=args.top_k, mode=args.mode)
+
+        start = time.perf_counter()
+        single = [searcher.search(q, top_k=args.top_k, mode=args.mode) for q in queries]
+        loop_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        batched = searcher.search_many(queries, top_k=args.top_k, mode=args.mode)
+        batch_elapsed = time.perf_counter() - start
+
+    same = sum(
+        [r["relative_path"] for r in a] == [r["relative_path"] for r in b]
+        for a, b in zip(single, batched)
+    )
+    print(f"\n{args.prompts} 个 Prompt，{len(queries)} 个查询，模式 {args.mode}")
+    print(f"逐条 search:  {len(queries) / loop_elapsed:10.1f} 查询/秒")
+    print(f"search_many:  {len(queries) / batch_elapsed:10.1f} 查询/秒")
+    print(f"加速比:       {loop_elapsed / batch_elapsed:10.1f}x")
+    print(f"结果一致:     {same}/{len(queries)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
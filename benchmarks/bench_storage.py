@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+向量存储格式基准测试：召回率损失与内存占用
+
+以精确的 float32 flat 索引为基准，测量 float16、SQ8（可选 float32 重新打分）
+及 HNSW / IVF-PQ 结构下的 recall@k、每个向量的索引字节数和查询耗时。
+
+默认使用合成的聚类向量；用 --vectors / --queries 传入评测集的嵌入（.npy，
+每行一个向量，未归一化时会先归一化）即可在真实数据上测量。
+
+用法:
+    python benchmarks/bench_storage.py [--count 100000] [--dim 384] [--k 10]
+    python benchmarks/bench_storage.py --vectors corpus.npy --queries queries.npy
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import faiss
+import numpy as np
+
+from prompts_tool.core import ann
+from prompts_tool.core.config import IndexConfig
+from prompts_tool.core.rescore import RescoreStore
+from prompts_tool.core.shard import RESCORE_OVERSAMPLE
+
+
+def make_vectors(count: int, dim: int, clusters: int = 256, seed: int = 0) -> np.ndarray:
+    """生成聚类分布的单位向量（接近真实嵌入的分布）"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim), dtype=np.float32)
+    labels = rng.integers(0, clusters, count)
+    vectors = centers[labels] + 0.6 * rng.standard_normal((count, dim), dtype=np.float32)
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def load_vectors(path: str) -> np.ndarray:
+    vectors = np.ascontiguousarray(np.load(path), dtype="float32")
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def index_bytes(index: faiss.Index) -> int:
+    return faiss.serialize_index(index).nbytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="向量存储格式基准测试")
+    parser.add_argument("--count", type=int, default=100000, help="合成向量数量")
+    parser.add_argument("--dim", type=int, default=384, help="合成向量维度")
+    parser.add_argument("--queries-count", type=int, default=1000, help="合成查询数量")
+    parser.add_argument("--vectors", help="评测集文档嵌入 .npy")
+    parser.add_argument("--queries", help="评测集查询嵌入 .npy")
+    parser.add_argument("--k", type=int, default=10, help="recall@k 的 k")
+    parser.add_argument("--no-ivfpq", action="store_true", help="跳过 IVF-PQ（训练较慢）")
+    args = parser.parse_args()
+
+    if args.vectors and args.queries:
+        vectors, queries = load_vectors(args.vectors), load_vectors(args.queries)
+    else:
+        data = make_vectors(args.count + args.queries_count, args.dim)
+        vectors, queries = data[:args.count], data[args.count:]
+    ids = np.arange(len(vectors), dtype="int64")
+    dim = vectors.shape[1]
+
+    exact = ann.create_index(ann.choose_index_spec(0, dim, IndexConfig(type="flat")), dim)
+    exact.add_with_ids(vectors, ids)
+    _, truth = exact.search(queries, args.k)
+
+    configs = [
+        ("flat float32", IndexConfig(type="flat")),
+        ("flat float16", IndexConfig(type="flat", storage="float16")),
+        ("flat sq8", IndexConfig(type="flat", storage="sq8", rescore=False)),
+        ("flat sq8 + 重打分", IndexConfig(type="flat", storage="sq8")),
+        ("hnsw float32", IndexConfig(type="hnsw")),
+        ("hnsw sq8 + 重打分", IndexConfig(type="hnsw", storage="sq8")),
+        ("ivfpq", IndexConfig(type="ivfpq", rescore=False)),
+        ("ivfpq + 重打分", IndexConfig(type="ivfpq")),
+    ]
+    if args.no_ivfpq:
+        configs = [(label, config) for label, config in configs if config.type != "ivfpq"]
+
+    print(f"\n{len(vectors)} 个向量，{dim} 维，{len(queries)} 个查询，recall@{args.k}（基准: 精确 float32）")
+    print(f"{'存储':<20} {'recall':>8} {'字节/向量':>10} {'内存比':>7} {'毫秒/查询':>10}")
+    baseline_bytes = None
+    with tempfile.TemporaryDirectory() as tmp:
+        store = RescoreStore(Path(tmp))
+        store.write(vectors, ids)
+        for label, config in configs:
+            spec = ann.choose_index_spec(len(vectors), dim, config)
+            index = ann.create_index(spec, dim, vectors)
+            index.add_with_ids(vectors, ids)
+            size = index_bytes(index) / len(vectors)
+            baseline_bytes = baseline_bytes or size
+
+            start = time.perf_counter()
+            if spec["rescore"]:
+                _, candidates = index.search(queries, args.k * RESCORE_OVERSAMPLE)
+                _, found = store.rerank(queries, candidates, args.k)
+            else:
+                _, found = index.search(queries, args.k)
+            elapsed = time.perf_counter() - start
+
+            recall = np.mean([len(set(f) & set(t)) / args.k for f, t in zip(found, truth)])
+            print(f"{label:<20} {recall:>8.4f} {size:>10.1f} {size / baseline_bytes:>6.2f}x "
+                  f"{elapsed / len(queries) * 1000:>10.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+关键词分词吞吐量基准测试
+
+生成合成的中英混合语料，测量分词及建立词频统计的速度（MB/s），
+并估算索引 100 MB 中文语料所需的分词时间。
+
+用法:
+    python benchmarks/bench_tokenizer.py [--size-mb 20] [--segmenter bigram]
+"""
+
+import argparse
+import random
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from prompts_tool.core.tokenizer import Tokenizer
+
+LATIN_WORDS = ["python", "function", "docstring", "review", "pytest", "fixture", "API", "v2"]
+PUNCTUATION = ["，", "。", "：", "\n", " "]
+
+
+def make_corpus(size_mb: float, doc_chars: int = 2000, seed: int = 0) -> list:
+    """生成合成语料（常用汉字 + 少量英文单词），返回文档列表"""
+    rng = random.Random(seed)
+    hanzi = [chr(c) for c in range(0x4E00, 0x4E00 + 3500)]
+    target = int(size_mb * 1024 * 1024)
+
+    docs, total = [], 0
+    while total < target:
+        parts, length = [], 0
+        while length < doc_chars:
+            run = "".join(rng.choices(hanzi, k=rng.randint(1, 16)))
+            parts.append(run)
+            parts.append(rng.choice(PUNCTUATION))
+            if rng.random() < 0.2:
+                parts.append(f" {rng.choice(LATIN_WORDS)} ")
+            length += len(run) + 2
+        doc = "".join(parts)
+        docs.append(doc)
+        total += len(doc.encode("utf-8"))
+    return docs
+
+
+def run(size_mb: float, segmenter: str) -> None:
+    """运行基准测试"""
+    print(f"📝 生成 {size_mb} MB 合成语料...")
+    docs = make_corpus(size_mb)
+    corpus_bytes = sum(len(d.encode("utf-8")) for d in docs)
+    tokenizer = Tokenizer(segmenter)
+
+    start = time.perf_counter()
+    token_count = 0
+    for doc in docs:
+        token_count += len(tokenizer.tokenize(doc))
+    tokenize_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for doc in docs:
+        Counter(tokenizer.tokenize(doc))
+    count_time = time.perf_counter() - start
+
+    mb = corpus_bytes / 1024 / 1024
+    print(f"🔤 分词器: {tokenizer.name}")
+    print(f"📚 语料: {len(docs)} 个文档, {mb:.1f} MB, {token_count} 个词元")
+    print(f"⚡ 分词: {tokenize_time:.2f}s ({mb / tokenize_time:.1f} MB/s)")
+    print(f"⚡ 分词 + 词频统计: {count_time:.2f}s ({mb / count_time:.1f} MB/s)")
+    print(f"⏱️  估算 100 MB 语料: {100 / (mb / count_time):.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="关键词分词吞吐量基准测试")
+    parser.add_argument("--size-mb", type=float, default=20.0, help="合成语料大小 (MB)")
+    parser.add_argument("--segmenter", default="bigram", help="分词方式: bigram 或 jieba")
+    args = parser.parse_args()
+    run(args.size_mb, args.segmenter)
+
+
+if __name__ == "__main__":
+    main()
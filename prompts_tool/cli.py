@@ -2,6 +2,9 @@
 CLI 主入口 - 修复版本，延迟导入重型模块
 """
 
+import atexit
+import contextlib
+import json
 import sys
 import typer
 from pathlib import Path
@@ -11,11 +14,12 @@ from rich.table import Table
 from rich.panel import Panel
 from rich.text import Text
 
-from .core.config import Config
+from .core.config import Config, SEARCH_MODES
 from .core.repo import PromptRepo
 # 延迟导入，避免重型库导入错误
 # from .core.search import PromptSearcher
 from .core.parser import PromptParser
+from .core.daemon import DaemonClient, DaemonError, SearchDaemon
 from .utils.clipboard import ClipboardManager
 
 # 创建 Typer 应用
@@ -28,6 +32,9 @@ app = typer.Typer(
 # 创建 Rich 控制台
 console = Console()
 
+# 批量搜索每次提交给 search_many 的查询数
+BATCH_QUERY_CHUNK = 256
+
 
 def print_banner():
     """打印欢迎横幅"""
@@ -43,10 +50,13 @@ def get_searcher(config, repo):
     """延迟获取搜索器，避免导入错误"""
     try:
         from .core.search import PromptSearcher
-        return PromptSearcher(config, repo)
+        searcher = PromptSearcher(config, repo)
+        # 退出时写入延迟保存的查询缓存
+        atexit.register(searcher.close)
+        return searcher
     except ImportError:
         console.print("⚠️  语义搜索功能不可用（缺少 sentence-transformers 库）", style="yellow")
-        console.print("💡 请运行: pip install sentence-transformers faiss-cpu", style="blue")
+        console.print("💡 请运行: pip install sentence-transformers（可选 faiss-cpu 加速大索引）", style="blue")
         console.print("🔍 将使用关键词搜索替代", style="blue")
         return None
 
@@ -60,7 +70,13 @@ def main(
     preview: Optional[int] = typer.Option(None, "--preview", "-p", help="显示前 N 行预览"),
     filter_keyword: Optional[str] = typer.Option(None, "--filter", "-f", help="按关键词过滤"),
     top_k: int = typer.Option(5, "--top", "-t", help="返回前 K 个搜索结果"),
+    mode: Optional[str] = typer.Option(None, "--mode", "-m", help="搜索模式: hybrid 或 vector（默认取配置）"),
     rebuild_index: bool = typer.Option(False, "--rebuild-index", help="重建搜索索引"),
+    workers: Optional[int] = typer.Option(None, "--workers", "-w", help="建索引时的编码进程数（默认取配置）"),
+    cache_stats: bool = typer.Option(False, "--cache-stats", help="显示嵌入缓存统计"),
+    export_onnx: bool = typer.Option(False, "--export-onnx", help="导出 ONNX 模型（供 onnx 编码后端使用）并与 torch 交叉校验"),
+    daemon: bool = typer.Option(False, "--daemon", help="启动常驻搜索守护进程"),
+    batch: bool = typer.Option(False, "--batch", help="从标准输入逐行读取查询，以 JSONL 输出结果"),
     config_path: Optional[str] = typer.Option(None, "--config", help="配置文件路径"),
 ):
     """
@@ -71,8 +87,19 @@ def main(
     - 列出 Prompt: prompts --list
     - 更新仓库: prompts --update
     - 启动 UI: prompts --ui
+    - 守护进程: prompts --daemon
+    - 批量搜索: prompts --batch < queries.txt > results.jsonl
     """
     
+    # 拼错的模式不能静默退化为语义搜索
+    if mode is not None and mode not in SEARCH_MODES:
+        console.print(f"❌ 未知的搜索模式: {mode}（可选: {'、'.join(SEARCH_MODES)}）", style="red")
+        sys.exit(1)
+
+    if batch:
+        handle_batch_search(config_path, top_k, mode)
+        return
+
     # 打印横幅
     print_banner()
     
@@ -82,6 +109,8 @@ def main(
             config = Config.load(config_path)
         else:
             config = Config.load()
+        if workers is not None:
+            config.model.workers = max(workers, 1)
         console.print(f"✅ 配置加载成功", style="green")
     except Exception as e:
         console.print(f"❌ 配置加载失败: {e}", style="red")
@@ -92,9 +121,21 @@ def main(
     parser = PromptParser()
     clipboard = ClipboardManager()
     
+    if daemon:
+        handle_daemon(config, repo)
+        return
+
+    # 优先使用已运行的守护进程（模型和索引常驻内存），否则在进程内执行
+    client = None
+    # 指定 --workers 时在当前进程重建，守护进程按自己的配置编码
+    if (query or rebuild_index or list_prompts) and not (rebuild_index and workers):
+        client = DaemonClient.connect(config)
+        if client:
+            console.print("⚡ 已连接搜索守护进程", style="green")
+
     # 延迟创建搜索器
-    searcher = None
-    if query or rebuild_index:
+    searcher = client
+    if (query or rebuild_index) and not searcher:
         searcher = get_searcher(config, repo)
         if not searcher:
             # 如果语义搜索不可用，使用关键词搜索
@@ -106,16 +147,20 @@ def main(
                 return
     
     # 处理不同的命令
-    if update:
+    if cache_stats:
+        handle_cache_stats(config)
+    elif export_onnx:
+        handle_export_onnx(config)
+    elif update:
         handle_update(repo)
     elif list_prompts:
-        handle_list_prompts(repo, preview, filter_keyword)
+        handle_list_prompts(repo, preview, filter_keyword, client)
     elif ui:
         handle_ui(config)
     elif rebuild_index and searcher:
         handle_rebuild_index(searcher)
     elif query and searcher:
-        handle_search(query, searcher, parser, clipboard, top_k)
+        handle_search(query, searcher, parser, clipboard, top_k, mode)
     elif query:
         # 已经在上面处理了
         pass
@@ -130,47 +175,14 @@ def handle_simple_search(query: str, repo: PromptRepo, parser: PromptParser, cli
     console.print("💡 使用关键词搜索（语义搜索不可用）", style="blue")
     
     try:
-        # 获取所有 Prompt 文件
-        all_prompts = repo.list_prompts()
-        
-        if not all_prompts:
-            console.print("❌ 没有找到 Prompt 文件", style="red")
-            return
-        
-        # 简单的关键词搜索
-        results = []
-        for prompt in all_prompts:
-            score = 0
-            content = repo.get_prompt_content(prompt["file_path"])
-            
-            # 检查文件名
-            if query.lower() in prompt["name"].lower():
-                score += 2
-            
-            # 检查内容
-            if query.lower() in content.lower():
-                score += 1
-            
-            # 检查路径
-            if query.lower() in prompt["relative_path"].lower():
-                score += 1
-            
-            if score > 0:
-                results.append({
-                    **prompt,
-                    "score": score,
-                    "content": content
-                })
-        
-        # 按分数排序
-        results.sort(key=lambda x: x["score"], reverse=True)
+        # 使用 BM25 关键词索引检索（增量更新，只读取命中的 Prompt 内容）
+        results = repo.search_prompts(query, top_k=top_k)
         
         if results:
             console.print(f"✅ 找到 {len(results)} 个相关 Prompt", style="green")
             
-            # 显示前 top_k 个结果
-            for i, result in enumerate(results[:top_k], 1):
-                console.print(f"\n#{i} {result['name']} (相关度: {result['score']})", style="bold")
+            for i, result in enumerate(results, 1):
+                console.print(f"\n#{i} {result['name']} (相关度: {result['score']:.3f})", style="bold")
                 console.print(f"📁 路径: {result['relative_path']}", style="blue")
                 console.print(f"📝 内容预览:")
                 console.print(result['content'][:200] + "..." if len(result['content']) > 200 else result['content'])
@@ -193,6 +205,39 @@ def handle_simple_search(query: str, repo: PromptRepo, parser: PromptParser, cli
         console.print(f"❌ 搜索失败: {e}", style="red")
 
 
+def handle_batch_search(config_path: Optional[str], top_k: int, mode: Optional[str]):
+    """批量搜索：标准输入每行一个查询，标准输出每行一个 JSON 结果"""
+    output = sys.stdout
+
+    # 提示信息写入 stderr，保证 stdout 只包含 JSONL
+    with contextlib.redirect_stdout(sys.stderr):
+        config = Config.load(config_path)
+        repo = PromptRepo(config)
+        searcher = DaemonClient.connect(config) or get_searcher(config, repo)
+
+        def flush(queries: List[str]) -> None:
+            if searcher is None:
+                batches = [repo.search_prompts(query, top_k=top_k) for query in queries]
+            else:
+                batches = searcher.search_many(queries, top_k=top_k, mode=mode)
+            for query, results in zip(queries, batches):
+                record = {"query": query, "results": results}
+                output.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+            output.flush()
+
+        queries = []
+        for line in sys.stdin:
+            query = line.strip()
+            if not query:
+                continue
+            queries.append(query)
+            if len(queries) >= BATCH_QUERY_CHUNK:
+                flush(queries)
+                queries = []
+        if queries:
+            flush(queries)
+
+
 def handle_update(repo: PromptRepo):
     """处理仓库更新"""
     console.print("🔄 正在更新 Prompt 仓库...", style="yellow")
@@ -203,12 +248,14 @@ def handle_update(repo: PromptRepo):
         console.print("❌ 仓库更新失败！", style="red")
 
 
-def handle_list_prompts(repo: PromptRepo, preview: Optional[int], filter_keyword: Optional[str]):
+def handle_list_prompts(repo: PromptRepo, preview: Optional[int], filter_keyword: Optional[str],
+                        client: Optional[DaemonClient] = None):
     """处理列出 Prompt 文件"""
     console.print("📚 正在获取 Prompt 文件列表...", style="yellow")
     
     try:
-        prompts = repo.list_prompts(
+        lister = client or repo
+        prompts = lister.list_prompts(
             preview_lines=preview,
             filter_keyword=filter_keyword
         )
@@ -292,21 +339,25 @@ def handle_ui(config: Config):
         console.print(f"❌ 启动 Web 界面失败: {e}", style="red")
 
 
-def handle_search(query: str, searcher, parser: PromptParser, clipboard: ClipboardManager, top_k: int):
+def handle_search(query: str, searcher, parser: PromptParser, clipboard: ClipboardManager, top_k: int,
+                  mode: Optional[str] = None):
     """处理语义搜索"""
     console.print(f"🔍 正在搜索: {query}", style="yellow")
     
     try:
-        results = searcher.search(query, top_k=top_k)
+        results = searcher.search(query, top_k=top_k, mode=mode)
         
         if results:
             console.print(f"✅ 找到 {len(results)} 个相关 Prompt", style="green")
             
             for i, result in enumerate(results, 1):
-                console.print(f"\n#{i} {result['name']} (相似度: {result['similarity']:.3f})", style="bold")
+                # 混合搜索的得分是倒数排名融合（RRF）得分，不是余弦相似度
+                label = "融合得分" if "keyword_rank" in result else "相似度"
+                console.print(f"\n#{i} {result['name']} ({label}: {result['score']:.3f})", style="bold")
+                if "keyword_rank" in result:
+                    console.print(f"📊 {format_retriever_scores(result)}", style="dim")
                 console.print(f"📁 路径: {result['relative_path']}", style="blue")
-                console.print(f"📝 内容预览:")
-                console.print(result['content'][:200] + "..." if len(result['content']) > 200 else result['content'])
+                print_preview(result)
                 
                 # 检查是否有变量
                 variables = parser.extract_variables(result['content'])
@@ -326,6 +377,29 @@ def handle_search(query: str, searcher, parser: PromptParser, clipboard: Clipboa
         console.print(f"❌ 搜索失败: {e}", style="red")
 
 
+def print_preview(result: dict, limit: int = 200):
+    """打印内容预览；长 Prompt 显示匹配的段落而不是开头"""
+    content = result['content']
+    start, end = result.get('match_start'), result.get('match_end')
+    if start is not None and (start, end) != (0, len(content)):
+        console.print(f"📝 匹配段落 (第 {start}-{end} 字符):")
+        content = content[start:end].strip()
+    else:
+        console.print(f"📝 内容预览:")
+    console.print(content[:limit] + "..." if len(content) > limit else content)
+
+
+def format_retriever_scores(result: dict) -> str:
+    """格式化混合搜索中各检索器的得分和排名"""
+    parts = []
+    for key, label in (("vector", "语义"), ("keyword", "关键词")):
+        if result.get(f"{key}_rank") is None:
+            parts.append(f"{label}: 未命中")
+        else:
+            parts.append(f"{label}: {result[f'{key}_score']:.3f} (第 {result[f'{key}_rank']} 名)")
+    return " | ".join(parts)
+
+
 def handle_rebuild_index(searcher):
     """处理重建索引"""
     console.print("🔨 正在重建搜索索引...", style="yellow")
@@ -337,6 +411,93 @@ def handle_rebuild_index(searcher):
         console.print(f"❌ 索引重建失败: {e}", style="red")
 
 
+def handle_daemon(config: Config, repo: PromptRepo):
+    """启动常驻搜索守护进程"""
+    searcher = get_searcher(config, repo)
+    if not searcher:
+        console.print("❌ 无法启动守护进程，语义搜索不可用", style="red")
+        return
+
+    search_daemon = SearchDaemon(config, repo, searcher)
+    console.print(f"🛰️  守护进程监听: {search_daemon.socket_path}", style="green")
+    console.print("💡 按 Ctrl+C 停止", style="blue")
+    try:
+        search_daemon.serve_forever()
+    except KeyboardInterrupt:
+        console.print("\n👋 守护进程已停止", style="yellow")
+    except DaemonError as e:
+        console.print(f"❌ {e}", style="red")
+
+
+def handle_export_onnx(config: Config):
+    """导出 ONNX 模型并检查与 torch 后端的余弦一致性"""
+    try:
+        from sentence_transformers import SentenceTransformer
+        from .core.encoders import OnnxEncoder, export_onnx, cross_check
+    except ImportError:
+        console.print("❌ 导出需要 sentence-transformers（含 torch）", style="red")
+        return
+
+    path = config.get_onnx_model_path()
+    console.print(f"📦 正在导出 {config.model.name} 到 {path}...", style="yellow")
+    try:
+        export_onnx(config.model.name, path, quantize=config.model.quantize)
+        reference = SentenceTransformer(config.model.name, device="cpu")
+        table = Table(title="与 torch 后端的余弦相似度")
+        table.add_column("模型", style="magenta")
+        table.add_column("最小", style="cyan")
+        table.add_column("平均", style="green")
+        for quantized in ([False, True] if config.model.quantize else [False]):
+            agreement = cross_check(reference, OnnxEncoder(path, quantized=quantized))
+            table.add_row("int8" if quantized else "float32",
+                          f"{agreement['min_cosine']:.4f}", f"{agreement['mean_cosine']:.4f}")
+        console.print(table)
+    except ImportError as e:
+        console.print(f"❌ 导出缺少依赖: {e}（需要 torch、onnxruntime 和 tokenizers）", style="red")
+        return
+    except Exception as e:
+        console.print(f"❌ 导出失败: {e}", style="red")
+        return
+    console.print("✅ 导出完成，在配置中设置 model.backend: onnx 即可使用", style="green")
+
+
+def handle_cache_stats(config: Config):
+    """显示嵌入缓存统计"""
+    try:
+        from .core.embed_cache import list_cache_stats
+    except ImportError:
+        console.print("❌ 嵌入缓存不可用（缺少 numpy 库）", style="red")
+        return
+
+    stats = list_cache_stats(config.get_embedding_cache_path(), config.cache.max_entries)
+    if not stats:
+        console.print(f"📭 嵌入缓存为空: {config.get_embedding_cache_path()}", style="yellow")
+        return
+
+    table = Table(title="嵌入缓存统计")
+    table.add_column("模型", style="magenta")
+    table.add_column("条目", style="cyan")
+    table.add_column("命中", style="green")
+    table.add_column("未命中", style="yellow")
+    table.add_column("命中率", style="green")
+    table.add_column("淘汰", style="red")
+    table.add_column("大小", style="blue")
+
+    for item in stats:
+        table.add_row(
+            item["model_name"],
+            f"{item['entries']}/{item['max_entries']}",
+            str(item["hits"]),
+            str(item["misses"]),
+            f"{item['hit_rate']:.1%}",
+            str(item["evictions"]),
+            f"{item['size_bytes'] / 1024 / 1024:.1f} MB",
+        )
+
+    console.print(table)
+    console.print(f"📁 缓存目录: {config.get_embedding_cache_path()}", style="blue")
+
+
 def show_help():
     """显示帮助信息"""
     help_text = """
@@ -353,6 +514,8 @@ def show_help():
     - prompts --list --filter "关键词" # 按关键词过滤
     - prompts --top 10               # 返回前10个结果
     - prompts --rebuild-index        # 重建搜索索引
+    - prompts --cache-stats          # 查看嵌入缓存命中率
+    - prompts --daemon               # 启动守护进程，后续查询自动复用常驻模型
     
     示例:
     - prompts "Python 函数文档"
@@ -143,40 +143,8 @@ def handle_simple_search(query: str, repo: PromptRepo, parser: PromptParser, cli
     """处理简单搜索（基于文件名和内容关键词）"""
     console.print(f"🔍 正在搜索: {query}", style="yellow")
     
-    # 获取所有 Prompt 文件
-    all_prompts = repo.list_prompts()
-    
-    if not all_prompts:
-        console.print("❌ 没有找到 Prompt 文件", style="red")
-        return
-    
-    # 简单的关键词搜索
-    results = []
-    for prompt in all_prompts:
-        score = 0
-        content = repo.get_prompt_content(prompt["file_path"])
-        
-        # 检查文件名
-        if query.lower() in prompt["name"].lower():
-            score += 2
-        
-        # 检查内容
-        if query.lower() in content.lower():
-            score += 1
-        
-        # 检查路径
-        if query.lower() in prompt["relative_path"].lower():
-            score += 1
-        
-        if score > 0:
-            results.append({
-                **prompt,
-                "score": score,
-                "content": content
-            })
-    
-    # 按分数排序
-    results.sort(key=lambda x: x["score"], reverse=True)
+    # 使用 BM25 关键词索引检索，只显示前3个
+    results = repo.search_prompts(query, top_k=3)
     
     if not results:
         console.print("❌ 没有找到相关的 Prompt", style="red")
@@ -185,12 +153,12 @@ def handle_simple_search(query: str, repo: PromptRepo, parser: PromptParser, cli
     # 显示搜索结果
     console.print(f"✅ 找到 {len(results)} 个相关 Prompt", style="green")
     
-    for i, result in enumerate(results[:3], 1):  # 只显示前3个
+    for i, result in enumerate(results, 1):
         # 创建结果面板
         content = f"""
         📄 文件名: {result['name']}
         📁 路径: {result['relative_path']}
-        🎯 相关度: {result['score']}
+        🎯 相关度: {result['score']:.3f}
         
         📝 内容预览:
         {result['content'][:300]}{'...' if len(result['content']) > 300 else ''}
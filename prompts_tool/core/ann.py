@@ -0,0 +1,206 @@
+"""ANN index module - picks a FAISS index structure from corpus size and recall target
+
+Small corpora use an exact flat index; mid-size corpora an HNSW graph;
+large corpora IVF-PQ with trained centroids. Flat and HNSW indexes store
+float32 vectors, or float16 / 8-bit scalar-quantized codes to save memory.
+The chosen structure and its parameters (an "index spec") are stored in
+the index manifest.
+
+faiss is imported optionally; without it the searcher uses another
+backend (see `backends`).
+"""
+
+import math
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from .config import IndexConfig
+
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+HAS_FAISS = faiss is not None
+
+# 只读映射索引文件：加载耗时与索引大小无关，多个进程共享页缓存
+INDEX_MMAP_FLAGS = (
+    getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+    if HAS_FAISS else 0
+)
+
+INDEX_TYPES = ("auto", "flat", "hnsw", "ivfpq")
+
+# 向量存储格式及其 FAISS 编码（IVF-PQ 自带压缩，不使用该设置）
+STORAGE_TYPES = {"float32": "Flat", "float16": "SQfp16", "sq8": "SQ8"}
+
+# HNSW 参数随召回率目标递增：(召回率上限, M, efConstruction, efSearch)
+_HNSW_LEVELS = (
+    (0.90, 16, 64, 32),
+    (0.95, 32, 128, 64),
+    (0.99, 32, 200, 128),
+    (1.00, 48, 400, 256),
+)
+
+# IVF-PQ 参数：(召回率上限, 每个 PQ 子空间的维数, nprobe / nlist)
+# PQ 量化误差决定召回率上限（聚类数据上 4 维约 0.72、2 维约 0.89、1 维约 0.97），
+# nprobe 只能逼近该上限
+_IVF_LEVELS = (
+    (0.90, 2, 1 / 64),
+    (0.95, 1, 1 / 32),
+    (0.99, 1, 1 / 16),
+    (1.00, 1, 1 / 8),
+)
+
+# 训练 IVF-PQ 时每个聚类中心使用的样本数
+_TRAIN_POINTS_PER_LIST = 64
+
+# 训练 SQ8 每维取值范围使用的样本数
+_SQ_TRAIN_POINTS = 65536
+
+
+def choose_index_spec(ntotal: int, dimension: int, config: IndexConfig) -> Dict[str, Any]:
+    """Choose the index structure and parameters for `ntotal` vectors"""
+    kind = config.type
+    if kind not in INDEX_TYPES:
+        print(f"警告: 未知的索引类型 {kind}，自动选择")
+        kind = "auto"
+    if kind == "auto":
+        if ntotal < config.flat_max_vectors:
+            kind = "flat"
+        elif ntotal < config.hnsw_max_vectors:
+            kind = "hnsw"
+        else:
+            kind = "ivfpq"
+
+    storage = config.storage
+    if storage not in STORAGE_TYPES:
+        print(f"警告: 未知的向量存储格式 {storage}，使用 float32")
+        storage = "float32"
+    # 有损存储时可用原始 float32 向量对候选重新打分
+    rescore = config.rescore and (storage != "float32" or kind == "ivfpq")
+
+    recall = config.recall_target
+    if kind == "flat":
+        return {"type": "flat", "factory": f"IDMap,{STORAGE_TYPES[storage]}",
+                "storage": storage, "rescore": rescore, "params": {}}
+
+    if kind == "hnsw":
+        m, ef_construction, ef_search = hnsw_params(recall)
+        return {
+            "type": "hnsw",
+            "factory": f"IDMap,HNSW{m},{STORAGE_TYPES[storage]}",
+            "storage": storage,
+            "rescore": rescore,
+            "params": {"M": m, "efConstruction": ef_construction, "efSearch": ef_search},
+        }
+
+    # IVF 聚类数约为 4·√N，取 2 的幂
+    nlist = 2 ** round(math.log2(max(4 * math.sqrt(max(ntotal, 1)), 1)))
+    nlist = min(max(nlist, 64), 65536)
+    # 子空间数需整除维度
+    _, sub_dims, fraction = _pick_level(_IVF_LEVELS, recall)
+    pq_m = max(m for m in range(1, max(dimension // sub_dims, 1) + 1) if dimension % m == 0)
+    return {
+        "type": "ivfpq",
+        "factory": f"IVF{nlist},PQ{pq_m}",
+        "storage": "pq",
+        "rescore": rescore,
+        "params": {"nlist": nlist, "pq_m": pq_m, "nprobe": max(1, math.ceil(nlist * fraction))},
+    }
+
+
+def same_structure(a: Dict[str, Any], b: Dict[str, Any]) -> bool:
+    """Check whether two specs share a structure and storage (parameters may differ)"""
+    return (a["type"], a.get("storage", "float32")) == (b["type"], b.get("storage", "float32"))
+
+
+def hnsw_params(recall: float) -> Tuple[int, int, int]:
+    """Get (M, efConstruction, efSearch) for an HNSW graph at the recall target"""
+    return _pick_level(_HNSW_LEVELS, recall)[1:]
+
+
+def _pick_level(levels: Tuple[tuple, ...], recall: float) -> tuple:
+    """Get the first level whose recall ceiling covers the target"""
+    for level in levels:
+        if recall <= level[0]:
+            return level
+    return levels[-1]
+
+
+def create_index(spec: Dict[str, Any], dimension: int,
+                 training_vectors: Optional[np.ndarray] = None) -> "faiss.Index":
+    """Create an empty index for `spec`, training it if the structure needs it"""
+    index = faiss.index_factory(dimension, spec["factory"], faiss.METRIC_INNER_PRODUCT)
+    if spec["type"] == "hnsw":
+        faiss.downcast_index(index.index).hnsw.efConstruction = spec["params"]["efConstruction"]
+
+    if not index.is_trained:
+        if training_vectors is None or len(training_vectors) == 0:
+            raise ValueError(f"{spec['type']} 索引需要训练数据")
+        sample_size = training_size(spec)
+        if len(training_vectors) > sample_size:
+            rng = np.random.default_rng(0)
+            rows = np.sort(rng.choice(len(training_vectors), sample_size, replace=False))
+            training_vectors = training_vectors[rows]
+        print(f"🎯 正在训练 {spec['factory']} 索引（{len(training_vectors)} 个样本）...")
+        index.train(np.ascontiguousarray(training_vectors, dtype="float32"))
+
+    apply_search_params(index, spec)
+    return index
+
+
+def training_size(spec: Dict[str, Any]) -> int:
+    """Get the number of training samples the structure needs (0 if it needs no training)"""
+    if "nlist" in spec["params"]:
+        return spec["params"]["nlist"] * _TRAIN_POINTS_PER_LIST
+    if spec.get("storage") == "sq8":
+        return _SQ_TRAIN_POINTS
+    return 0
+
+
+def apply_search_params(index: "faiss.Index", spec: Dict[str, Any]) -> None:
+    """Set query-time parameters (efSearch / nprobe) recorded in the spec"""
+    params = faiss.ParameterSpace()
+    if spec["type"] == "hnsw":
+        params.set_index_parameter(index, "efSearch", spec["params"]["efSearch"])
+    elif spec["type"] == "ivfpq":
+        params.set_index_parameter(index, "nprobe", spec["params"]["nprobe"])
+
+
+def supports_remove(spec: Dict[str, Any]) -> bool:
+    """HNSW graphs cannot drop vectors; they are rebuilt instead"""
+    return spec["type"] != "hnsw"
+
+
+def extract_vectors(index: "faiss.Index") -> Tuple[np.ndarray, np.ndarray]:
+    """Get (vectors, ids) stored in an index, e.g. to rebuild it with another structure
+
+    Float32 flat and HNSW indexes return the exact vectors; quantized
+    storage and IVF-PQ return the decoded (approximate) vectors.
+    """
+    if isinstance(index, faiss.IndexIDMap):
+        ids = faiss.vector_to_array(index.id_map).astype("int64")
+        inner = faiss.downcast_index(index.index)
+        return inner.reconstruct_n(0, inner.ntotal), ids
+
+    ivf = faiss.extract_index_ivf(index)
+    invlists = ivf.invlists
+    ids = np.concatenate([np.zeros(0, dtype="int64")] + [
+        faiss.rev_swig_ptr(invlists.get_ids(l), invlists.list_size(l)).copy()
+        for l in range(ivf.nlist) if invlists.list_size(l)
+    ])
+    ivf.set_direct_map_type(faiss.DirectMap.Hashtable)
+    vectors = np.zeros((len(ids), ivf.d), dtype="float32")
+    for row, vector_id in enumerate(ids):
+        vectors[row] = ivf.reconstruct(int(vector_id))
+    return vectors, ids
+
+
+def read_index(path: Path, mmap: bool = False) -> "faiss.Index":
+    """Read an index file, memory-mapped read-only with `mmap`"""
+    if mmap:
+        return faiss.read_index(str(path), INDEX_MMAP_FLAGS)
+    return faiss.read_index(str(path))
@@ -0,0 +1,395 @@
+"""Vector backend module - the index interface used by the searcher
+
+A backend builds, updates, searches and persists one vector index of
+normalized embeddings keyed by int64 vector IDs (inner product = cosine):
+
+- "faiss": flat / HNSW / IVF-PQ structures chosen by `ann`
+- "numpy": exact brute-force search over a memory-mapped matrix
+  (`npindex`), using the FAISS flat file format
+- "hnswlib": an hnswlib graph (optional dependency)
+
+Each index spec records its file format; backends sharing a format
+(faiss and numpy) can open each other's files.
+"""
+
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple, Type
+
+import numpy as np
+
+from .config import IndexConfig
+from . import ann, npindex
+
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+BACKENDS = ("auto", "faiss", "numpy", "hnswlib")
+
+# 索引文件格式
+FAISS_FORMAT = "faiss"
+HNSWLIB_FORMAT = "hnswlib"
+
+
+class VectorBackend:
+    """Base class of vector index backends
+
+    Instances are created empty by `build` or from a file by `open`.
+    `remove` returns False when the structure cannot drop vectors; the
+    caller then rebuilds it from `vectors()`. Structures that only mark
+    removed vectors report them in `deleted_count`; the caller rebuilds
+    once they make up too much of the index.
+    """
+
+    name = ""
+    # 依赖的 pip 包（缺失时提示安装）
+    package = ""
+    file_format = FAISS_FORMAT
+
+    def __init__(self, spec: Dict[str, Any]):
+        self.spec = spec
+        # 索引是否为只读映射；修改前需要调用 make_writable
+        self.mapped = False
+
+    @classmethod
+    def is_available(cls) -> bool:
+        return True
+
+    @classmethod
+    def choose_spec(cls, ntotal: int, dimension: int, config: IndexConfig) -> Dict[str, Any]:
+        """Choose the index structure and parameters for `ntotal` vectors"""
+        raise NotImplementedError
+
+    @classmethod
+    def build(cls, spec: Dict[str, Any], vectors: np.ndarray, ids: np.ndarray,
+              training: Optional[np.ndarray] = None) -> "VectorBackend":
+        """Create an index for `spec` holding `vectors` / `ids`
+
+        Structures that need training use `training` if given (e.g. a
+        sample of a corpus added in chunks afterwards), else `vectors`.
+        """
+        raise NotImplementedError
+
+    @classmethod
+    def open(cls, path: Path, spec: Dict[str, Any]) -> "VectorBackend":
+        """Open a saved index (read-only mapped when the backend supports it)
+
+        Raises `npindex.UnsupportedIndexFormat` if the file cannot be read.
+        """
+        raise NotImplementedError
+
+    @property
+    def d(self) -> int:
+        raise NotImplementedError
+
+    @property
+    def ntotal(self) -> int:
+        """Number of searchable (not deleted) vectors"""
+        raise NotImplementedError
+
+    @property
+    def deleted_count(self) -> int:
+        """Number of removed vectors still taking up space in the index"""
+        return 0
+
+    def add(self, vectors: np.ndarray, ids: np.ndarray) -> None:
+        raise NotImplementedError
+
+    def remove(self, ids: np.ndarray) -> bool:
+        return False
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Get (scores, ids) of the top-k vectors per query; missing hits have ID -1"""
+        raise NotImplementedError
+
+    def vectors(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Get all stored (vectors, ids), e.g. to rebuild with another structure"""
+        raise NotImplementedError
+
+    def save(self, path: Path) -> None:
+        raise NotImplementedError
+
+    def make_writable(self, path: Path) -> None:
+        """Replace a read-only mapped index with an in-memory copy"""
+        self.mapped = False
+
+    def stats(self) -> Dict[str, Any]:
+        """获取索引统计信息"""
+        return {
+            "backend": self.name,
+            "structure": self.spec["type"],
+            "vectors": self.ntotal,
+            "dimension": self.d,
+            "mmap": self.mapped,
+        }
+
+
+class FaissBackend(VectorBackend):
+    """FAISS indexes; the structure is picked from corpus size by `ann`"""
+
+    name = "faiss"
+    package = "faiss-cpu"
+
+    def __init__(self, spec: Dict[str, Any], index: "ann.faiss.Index"):
+        super().__init__(spec)
+        self.index = index
+
+    @classmethod
+    def is_available(cls) -> bool:
+        return ann.HAS_FAISS
+
+    @classmethod
+    def choose_spec(cls, ntotal: int, dimension: int, config: IndexConfig) -> Dict[str, Any]:
+        return dict(ann.choose_index_spec(ntotal, dimension, config), format=FAISS_FORMAT)
+
+    @classmethod
+    def build(cls, spec: Dict[str, Any], vectors: np.ndarray, ids: np.ndarray,
+              training: Optional[np.ndarray] = None) -> "FaissBackend":
+        index = ann.create_index(spec, vectors.shape[1], vectors if training is None else training)
+        index.add_with_ids(np.ascontiguousarray(vectors, dtype="float32"), ids)
+        return cls(spec, index)
+
+    @classmethod
+    def open(cls, path: Path, spec: Dict[str, Any]) -> "FaissBackend":
+        backend = cls(spec, ann.read_index(path, mmap=True))
+        backend.mapped = True
+        ann.apply_search_params(backend.index, spec)
+        return backend
+
+    @property
+    def d(self) -> int:
+        return self.index.d
+
+    @property
+    def ntotal(self) -> int:
+        return self.index.ntotal
+
+    def add(self, vectors: np.ndarray, ids: np.ndarray) -> None:
+        self.index.add_with_ids(vectors, ids)
+
+    def remove(self, ids: np.ndarray) -> bool:
+        if not ann.supports_remove(self.spec):
+            return False
+        self.index.remove_ids(ids)
+        return True
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        return self.index.search(queries, k)
+
+    def vectors(self) -> Tuple[np.ndarray, np.ndarray]:
+        return ann.extract_vectors(self.index)
+
+    def save(self, path: Path) -> None:
+        ann.faiss.write_index(self.index, str(path))
+
+    def make_writable(self, path: Path) -> None:
+        if self.mapped:
+            self.index = ann.read_index(path)
+            ann.apply_search_params(self.index, self.spec)
+            self.mapped = False
+
+
+class NumpyBackend(VectorBackend):
+    """Exact search with NumPy; reads and writes FAISS flat index files"""
+
+    name = "numpy"
+
+    def __init__(self, spec: Dict[str, Any], index: npindex.NumpyIndex):
+        super().__init__(spec)
+        self.index = index
+
+    @classmethod
+    def choose_spec(cls, ntotal: int, dimension: int, config: IndexConfig) -> Dict[str, Any]:
+        # 只支持精确的 float32 flat 索引
+        return {"type": "flat", "factory": "IDMap,Flat", "storage": "float32",
+                "rescore": False, "params": {}, "format": FAISS_FORMAT}
+
+    @classmethod
+    def build(cls, spec: Dict[str, Any], vectors: np.ndarray, ids: np.ndarray,
+              training: Optional[np.ndarray] = None) -> "NumpyBackend":
+        return cls(spec, npindex.NumpyIndex(vectors.shape[1], np.array(vectors, dtype="float32"),
+                                            np.array(ids, dtype="int64")))
+
+    @classmethod
+    def open(cls, path: Path, spec: Dict[str, Any]) -> "NumpyBackend":
+        backend = cls(spec, npindex.read_index(path, mmap=True))
+        backend.mapped = True
+        return backend
+
+    @classmethod
+    def from_arrays(cls, spec: Dict[str, Any], vectors: np.ndarray, ids: np.ndarray) -> "NumpyBackend":
+        """Serve (possibly memory-mapped) arrays without copying them"""
+        backend = cls(spec, npindex.NumpyIndex(vectors.shape[1], vectors, ids))
+        backend.mapped = True
+        return backend
+
+    @property
+    def d(self) -> int:
+        return self.index.d
+
+    @property
+    def ntotal(self) -> int:
+        return self.index.ntotal
+
+    def add(self, vectors: np.ndarray, ids: np.ndarray) -> None:
+        self.index.add_with_ids(vectors, ids)
+
+    def remove(self, ids: np.ndarray) -> bool:
+        self.index.remove_ids(ids)
+        return True
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        return self.index.search(queries, k)
+
+    def vectors(self) -> Tuple[np.ndarray, np.ndarray]:
+        return np.array(self.index.vectors, dtype="float32"), np.array(self.index.ids, dtype="int64")
+
+    def save(self, path: Path) -> None:
+        npindex.write_index(self.index, path)
+
+    def make_writable(self, path: Path) -> None:
+        if self.mapped:
+            self.index = self.index.copy()
+            self.mapped = False
+
+
+class HnswlibBackend(VectorBackend):
+    """hnswlib graph; parameters follow the same recall levels as FAISS HNSW"""
+
+    name = "hnswlib"
+    package = "hnswlib"
+    file_format = HNSWLIB_FORMAT
+
+    def __init__(self, spec: Dict[str, Any], index: "hnswlib.Index"):
+        super().__init__(spec)
+        self.index = index
+        # 已标记删除的向量 ID：hnswlib 无法列出它们，随索引规格保存在清单中
+        self.deleted = set(spec.get("deleted", ()))
+
+    @classmethod
+    def is_available(cls) -> bool:
+        return hnswlib is not None
+
+    @classmethod
+    def choose_spec(cls, ntotal: int, dimension: int, config: IndexConfig) -> Dict[str, Any]:
+        m, ef_construction, ef_search = ann.hnsw_params(config.recall_target)
+        return {
+            "type": "hnsw",
+            "factory": f"hnswlib,M{m}",
+            "storage": "float32",
+            "rescore": False,
+            "params": {"M": m, "efConstruction": ef_construction, "efSearch": ef_search,
+                       "dim": dimension},
+            "format": HNSWLIB_FORMAT,
+        }
+
+    @classmethod
+    def build(cls, spec: Dict[str, Any], vectors: np.ndarray, ids: np.ndarray,
+              training: Optional[np.ndarray] = None) -> "HnswlibBackend":
+        params = spec["params"]
+        index = hnswlib.Index(space="ip", dim=params["dim"])
+        index.init_index(max_elements=max(len(vectors), 1), ef_construction=params["efConstruction"],
+                         M=params["M"])
+        index.set_ef(params["efSearch"])
+        backend = cls(spec, index)
+        backend.add(vectors, ids)
+        return backend
+
+    @classmethod
+    def open(cls, path: Path, spec: Dict[str, Any]) -> "HnswlibBackend":
+        index = hnswlib.Index(space="ip", dim=spec["params"]["dim"])
+        try:
+            index.load_index(str(path))
+        except RuntimeError as e:
+            raise npindex.UnsupportedIndexFormat(f"无法读取 hnswlib 索引: {e}") from e
+        index.set_ef(spec["params"]["efSearch"])
+        return cls(spec, index)
+
+    @property
+    def d(self) -> int:
+        return self.index.dim
+
+    @property
+    def ntotal(self) -> int:
+        return self.index.get_current_count() - len(self.deleted)
+
+    @property
+    def deleted_count(self) -> int:
+        return len(self.deleted)
+
+    def add(self, vectors: np.ndarray, ids: np.ndarray) -> None:
+        if not len(ids):
+            return
+        # 标记删除的元素仍占用图中的位置
+        needed = self.index.get_current_count() + len(ids)
+        if needed > self.index.get_max_elements():
+            self.index.resize_index(max(needed, 2 * self.index.get_max_elements()))
+        self.index.add_items(np.ascontiguousarray(vectors, dtype="float32"), np.asarray(ids, dtype="int64"))
+        if self.deleted.intersection(int(i) for i in ids):
+            self.deleted.difference_update(int(i) for i in ids)
+            self.spec["deleted"] = sorted(self.deleted)
+
+    def remove(self, ids: np.ndarray) -> bool:
+        """Mark vectors deleted; they are skipped by searches but keep their graph slots"""
+        for vector_id in (int(i) for i in ids):
+            if vector_id in self.deleted:
+                continue
+            try:
+                self.index.mark_deleted(vector_id)
+            except RuntimeError:
+                # 图中没有该 ID
+                continue
+            self.deleted.add(vector_id)
+        self.spec["deleted"] = sorted(self.deleted)
+        return True
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        scores = np.full((len(queries), k), -np.finfo("float32").max, dtype="float32")
+        labels = np.full((len(queries), k), -1, dtype="int64")
+        n = min(k, self.ntotal)
+        if n:
+            found, distances = self.index.knn_query(queries, k=n)
+            # 内积空间的距离为 1 - 内积
+            scores[:, :n] = 1 - distances
+            labels[:, :n] = found.astype("int64")
+        return scores, labels
+
+    def vectors(self) -> Tuple[np.ndarray, np.ndarray]:
+        ids = np.array(self.index.get_ids_list(), dtype="int64")
+        if self.deleted:
+            ids = ids[~np.isin(ids, np.fromiter(self.deleted, dtype="int64"))]
+        if not len(ids):
+            return np.zeros((0, self.d), dtype="float32"), ids
+        return np.asarray(self.index.get_items(ids), dtype="float32"), ids
+
+    def save(self, path: Path) -> None:
+        self.index.save_index(str(path))
+
+
+_BACKEND_TYPES: Dict[str, Type[VectorBackend]] = {
+    "faiss": FaissBackend,
+    "numpy": NumpyBackend,
+    "hnswlib": HnswlibBackend,
+}
+
+
+def available_backends() -> Dict[str, Type[VectorBackend]]:
+    """Get the backends whose dependencies are installed"""
+    return {name: backend for name, backend in _BACKEND_TYPES.items() if backend.is_available()}
+
+
+def select_backend(name: Optional[str]) -> Type[VectorBackend]:
+    """Get the backend class configured by `index.backend`
+
+    "auto" prefers FAISS; a missing dependency falls back to auto.
+    """
+    if name not in BACKENDS:
+        print(f"警告: 未知的索引后端 {name}，自动选择")
+        name = "auto"
+    if name != "auto":
+        backend = _BACKEND_TYPES[name]
+        if backend.is_available():
+            return backend
+        print(f"⚠️ 未安装 {name}，自动选择索引后端（pip install {backend.package}）")
+    return FaissBackend if FaissBackend.is_available() else NumpyBackend
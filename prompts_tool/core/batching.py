@@ -0,0 +1,166 @@
+"""Batching module - length-sorted, auto-tuned embedding batches
+
+Texts are grouped by token length so each batch pads to a similar length,
+and batches are capped by a padded-token budget instead of a fixed count.
+The budget is picked by a short calibration run (the fastest of a few
+candidate budgets) below a ceiling derived from the memory budget.
+"""
+
+import time
+from typing import List, Dict, Any, Tuple
+
+import numpy as np
+
+# 每个填充 token 在前向计算中占用的激活内存约为 嵌入维度 × 4 字节 × 该系数
+# （各层隐藏状态、注意力和 FFN 中间结果的粗略估计）
+ACTIVATION_BYTES_FACTOR = 48
+
+# 无法获取分词器时按每 4 个字符一个 token 估算
+CHARS_PER_TOKEN = 4
+
+# 校准时尝试的最小批次 token 数；候选值逐次翻倍直到内存上限
+MIN_BATCH_TOKENS = 1024
+
+# 校准样本的文本数上限，以及文本数少于该值时跳过校准
+CALIBRATION_TEXTS = 256
+
+# 吞吐量提升不足该比例时停止尝试更大的批次
+CALIBRATION_MIN_GAIN = 1.05
+
+
+def token_lengths(model, texts: List[str]) -> List[int]:
+    """Get the (truncated) token length of each text
+
+    Uses the model's own `token_lengths` or its Hugging Face tokenizer
+    when there is one and falls back to a character-based estimate.
+    """
+    if hasattr(model, "token_lengths"):
+        return model.token_lengths(texts)
+    max_length = getattr(model, "max_seq_length", None) or 512
+    tokenizer = getattr(model, "tokenizer", None)
+    if tokenizer is not None:
+        try:
+            encoded = tokenizer(texts, add_special_tokens=True, truncation=True,
+                                max_length=max_length)["input_ids"]
+            return [len(ids) for ids in encoded]
+        except Exception:
+            pass
+    return [min(len(text) // CHARS_PER_TOKEN + 2, max_length) for text in texts]
+
+
+def memory_token_limit(dimension: int, memory_mb: int) -> int:
+    """Get the largest padded-token count per batch that fits in `memory_mb`"""
+    bytes_per_token = max(dimension, 1) * 4 * ACTIVATION_BYTES_FACTOR
+    return max(MIN_BATCH_TOKENS, memory_mb * 1024 * 1024 // bytes_per_token)
+
+
+def plan_batches(order: List[int], lengths: List[int], max_tokens: int) -> List[List[int]]:
+    """Group `order` (sorted by length) into batches of at most `max_tokens` padded tokens"""
+    batches: List[List[int]] = []
+    batch: List[int] = []
+    longest = 0
+    for i in order:
+        width = max(longest, lengths[i])
+        if batch and width * (len(batch) + 1) > max_tokens:
+            batches.append(batch)
+            batch, width = [], lengths[i]
+        batch.append(i)
+        longest = width
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+class BatchEncoder:
+    """Encode texts in length-sorted batches sized by a calibrated token budget
+
+    `batch_tokens` fixes the budget (0 calibrates it). The calibrated
+    budget is kept for later calls on the same encoder. `stats` holds the
+    throughput of the most recent `encode` call.
+    """
+
+    def __init__(self, model, memory_mb: int = 1024, batch_tokens: int = 0):
+        self.model = model
+        self.memory_mb = memory_mb
+        self.batch_tokens = batch_tokens
+        self.stats: Dict[str, Any] = {}
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Encode `texts`, returning embeddings in the original order"""
+        dimension = self.model.get_sentence_embedding_dimension()
+        embeddings = np.zeros((len(texts), dimension), dtype="float32")
+        if not texts:
+            return embeddings
+
+        start = time.perf_counter()
+        lengths = token_lengths(self.model, texts)
+        # 由长到短：最耗内存的批次最先执行，超出内存时尽早失败
+        order = sorted(range(len(texts)), key=lambda i: -lengths[i])
+        ceiling = memory_token_limit(dimension, self.memory_mb)
+
+        done = set()
+        max_tokens = min(self.batch_tokens, ceiling) if self.batch_tokens else 0
+        if not max_tokens:
+            if len(texts) >= CALIBRATION_TEXTS:
+                max_tokens, done = self._calibrate(texts, lengths, order, ceiling, embeddings)
+                self.batch_tokens = max_tokens
+            else:
+                max_tokens = ceiling
+
+        remaining = [i for i in order if i not in done]
+        batches = plan_batches(remaining, lengths, max_tokens)
+        for batch in batches:
+            self._encode_batch(texts, batch, embeddings)
+
+        elapsed = time.perf_counter() - start
+        tokens = sum(lengths)
+        padded = sum(max(lengths[i] for i in batch) * len(batch) for batch in batches)
+        self.stats = {
+            "texts": len(texts),
+            "tokens": tokens,
+            "batch_tokens": max_tokens,
+            "batches": len(batches),
+            "padding": 1 - sum(lengths[i] for i in remaining) / padded if padded else 0.0,
+            "seconds": elapsed,
+            "tokens_per_second": tokens / elapsed if elapsed > 0 else 0.0,
+        }
+        return embeddings
+
+    def _encode_batch(self, texts: List[str], batch: List[int], out: np.ndarray) -> None:
+        vectors = self.model.encode([texts[i] for i in batch], batch_size=len(batch),
+                                    show_progress_bar=False)
+        out[batch] = np.asarray(vectors, dtype="float32")
+
+    def _calibrate(self, texts: List[str], lengths: List[int], order: List[int],
+                   ceiling: int, out: np.ndarray) -> Tuple[int, set]:
+        """Time candidate token budgets on a sample; return the fastest and the encoded rows
+
+        The sample is drawn evenly across the length distribution, and its
+        embeddings are kept so calibration does not repeat any work.
+        """
+        step = max(len(order) // CALIBRATION_TEXTS, 1)
+        sample = order[::step][:CALIBRATION_TEXTS]
+        candidates = []
+        budget = MIN_BATCH_TOKENS
+        while budget < ceiling:
+            candidates.append(budget)
+            budget *= 2
+        candidates.append(ceiling)
+
+        best_budget, best_rate = candidates[0], 0.0
+        done = set()
+        for n, budget in enumerate(candidates):
+            # 交错分配样本，各候选的长度分布相同
+            rows = sample[n::len(candidates)]
+            if not rows:
+                break
+            started = time.perf_counter()
+            for batch in plan_batches(rows, lengths, budget):
+                self._encode_batch(texts, batch, out)
+            elapsed = time.perf_counter() - started
+            done.update(rows)
+            rate = sum(lengths[i] for i in rows) / elapsed if elapsed > 0 else float("inf")
+            if rate < best_rate * CALIBRATION_MIN_GAIN:
+                break
+            best_budget, best_rate = budget, rate
+        return best_budget, done
@@ -0,0 +1,159 @@
+"""Build lock module - advisory inter-process lock around index builds
+
+Only one process (CLI, daemon, UI, cron job) builds a shard at a time.
+The lock is a file created with O_EXCL that records the holder's PID and
+host; while it is held a background thread touches it as a heartbeat.
+A lock whose holder is no longer running, or whose heartbeat stopped, is
+considered stale and broken, so a killed builder never blocks others.
+"""
+
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+BUILD_LOCK_FILE = "build.lock"
+
+# 等待锁时的轮询间隔（秒）
+POLL_SECONDS = 0.2
+
+
+def _process_alive(pid: int) -> bool:
+    """Check whether a local process exists (assumed alive where this cannot be checked)"""
+    if os.name != "posix":
+        # Windows 上 os.kill 会结束进程，只依赖心跳判断
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+
+class BuildLock:
+    """Advisory lock file with PID / heartbeat based stale-lock detection
+
+    `stale_seconds` is how long a heartbeat may be missing before the lock
+    is broken; the holder refreshes it every third of that time.
+    """
+
+    def __init__(self, path: Path, stale_seconds: float = 30.0):
+        self.path = Path(path)
+        self.stale_seconds = stale_seconds
+        self.token: Optional[str] = None
+        self._stop = threading.Event()
+        self._heartbeat: Optional[threading.Thread] = None
+
+    @property
+    def held(self) -> bool:
+        return self.token is not None
+
+    def acquire(self, timeout: float = 0.0) -> bool:
+        """Take the lock, waiting up to `timeout` seconds; returns False on timeout"""
+        if self.held:
+            return True
+        deadline = time.monotonic() + timeout
+        announced = False
+        while True:
+            if self._try_create():
+                return True
+            holder = self.holder()
+            if holder is not None and self._is_stale(holder):
+                print(f"⚠️ 构建锁已失效（进程 {holder.get('pid')}，{holder.get('host')}），接管: {self.path}")
+                self._break(holder)
+                continue
+            if time.monotonic() >= deadline:
+                return False
+            if not announced and holder is not None:
+                print(f"⏳ 进程 {holder.get('pid')} 正在构建索引，等待中（最多 {timeout:g} 秒）")
+                announced = True
+            time.sleep(min(POLL_SECONDS, max(deadline - time.monotonic(), 0)))
+
+    def release(self) -> None:
+        """Stop the heartbeat and delete the lock file if it is still ours"""
+        if not self.held:
+            return
+        self._stop.set()
+        if self._heartbeat is not None:
+            self._heartbeat.join()
+            self._heartbeat = None
+        holder = self.holder()
+        if holder is not None and holder.get("token") == self.token:
+            self.path.unlink(missing_ok=True)
+        self.token = None
+
+    def holder(self) -> Optional[Dict[str, Any]]:
+        """Get the current holder's record plus its heartbeat age, or None if unlocked"""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                holder = json.load(f)
+                holder["heartbeat_age"] = time.time() - os.fstat(f.fileno()).st_mtime
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            # 刚创建尚未写入内容的锁文件
+            try:
+                age = time.time() - self.path.stat().st_mtime
+            except OSError:
+                return None
+            return {"heartbeat_age": age}
+        return holder
+
+    def _is_stale(self, holder: Dict[str, Any]) -> bool:
+        if holder.get("host") == socket.gethostname() and isinstance(holder.get("pid"), int) \
+                and not _process_alive(holder["pid"]):
+            return True
+        return holder["heartbeat_age"] > self.stale_seconds
+
+    def _try_create(self) -> bool:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            return False
+        token = uuid.uuid4().hex
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({
+                "pid": os.getpid(),
+                "host": socket.gethostname(),
+                "started": time.time(),
+                "token": token,
+            }, f)
+        self.token = token
+        self._stop.clear()
+        self._heartbeat = threading.Thread(target=self._beat, name="build-lock-heartbeat", daemon=True)
+        self._heartbeat.start()
+        return True
+
+    def _beat(self) -> None:
+        while not self._stop.wait(self.stale_seconds / 3):
+            try:
+                os.utime(self.path)
+            except OSError:
+                pass
+
+    def _break(self, holder: Dict[str, Any]) -> None:
+        """Remove a stale lock, restoring it if another process replaced it meanwhile"""
+        claimed = self.path.with_name(f"{self.path.name}.{os.getpid()}.stale")
+        try:
+            os.rename(self.path, claimed)
+        except OSError:
+            return
+        try:
+            with open(claimed, "r", encoding="utf-8") as f:
+                token = json.load(f).get("token")
+        except (OSError, ValueError):
+            token = None
+        if token != holder.get("token"):
+            # 判断失效后锁已被其他进程重新获取，放回原处
+            try:
+                os.link(claimed, self.path)
+            except OSError:
+                pass
+        claimed.unlink(missing_ok=True)
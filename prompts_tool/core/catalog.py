@@ -0,0 +1,194 @@
+"""Prompt catalog module caching per-file metadata keyed by stat signature"""
+
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+
+from .parser import PromptParser
+
+# 目录文件格式版本，格式变化时递增以丢弃旧缓存
+CATALOG_VERSION = 1
+
+# 缓存的预览行数上限（与 Web 界面的最大预览行数一致）
+PREVIEW_MAX_LINES = 10
+
+
+@dataclass
+class CatalogEntry:
+    """Cached metadata for a single prompt file"""
+    path: str
+    size: int
+    mtime_ns: int
+    inode: int
+    sha256: str
+    summary: str
+    preview_lines: List[str] = field(default_factory=list)
+    variables: List[str] = field(default_factory=list)
+
+    def signature(self) -> Tuple[int, int, int]:
+        """Stat signature used to detect changed files"""
+        return (self.size, self.mtime_ns, self.inode)
+
+    def preview(self, max_lines: int) -> str:
+        """Rebuild the `get_prompt_summary` output for the first N lines"""
+        return " | ".join(line for line in self.preview_lines[:max_lines] if line)
+
+
+def stat_signature(st: os.stat_result) -> Tuple[int, int, int]:
+    """Build a stat signature from an `os.stat` result"""
+    return (st.st_size, st.st_mtime_ns, st.st_ino)
+
+
+class PromptCatalog:
+    """On-disk catalog of prompt file metadata
+
+    Only files whose stat signature (size, mtime, inode) changed since the
+    last refresh are re-read, so a warm listing touches metadata only.
+    """
+
+    def __init__(self, catalog_path: Path):
+        self.catalog_path = Path(catalog_path)
+        self.entries: Dict[str, CatalogEntry] = {}
+        self.parser = PromptParser()
+        self.last_refresh: Dict[str, int] = {"hits": 0, "misses": 0, "removed": 0}
+        self._saved_at_ns = 0
+        self._loaded = False
+        self._dirty = False
+
+    def load(self) -> None:
+        """加载目录文件，格式不兼容或损坏时从空目录开始"""
+        self._loaded = True
+        self.entries = {}
+        if not self.catalog_path.exists():
+            return
+
+        try:
+            with open(self.catalog_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != CATALOG_VERSION:
+                return
+            self._saved_at_ns = data.get("saved_at_ns", 0)
+            for item in data.get("entries", []):
+                entry = CatalogEntry(**item)
+                self.entries[entry.path] = entry
+        except Exception as e:
+            print(f"警告: 无法加载目录缓存 {self.catalog_path}: {e}")
+            self.entries = {}
+
+    def save(self) -> None:
+        """保存目录文件（仅在有变化时写入，先写临时文件再原子替换）"""
+        if not self._dirty:
+            return
+
+        try:
+            self.catalog_path.parent.mkdir(parents=True, exist_ok=True)
+            self._saved_at_ns = time.time_ns()
+            data = {
+                "version": CATALOG_VERSION,
+                "saved_at_ns": self._saved_at_ns,
+                "entries": [asdict(e) for e in self.entries.values()],
+            }
+            tmp_path = self.catalog_path.with_name(self.catalog_path.name + ".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.catalog_path)
+            self._dirty = False
+        except Exception as e:
+            print(f"警告: 无法保存目录缓存 {self.catalog_path}: {e}")
+
+    def get(self, file_path: Path) -> Optional[CatalogEntry]:
+        """Get the cached entry for a file, if any"""
+        return self.entries.get(str(file_path))
+
+    def refresh(self, files: List[Path]) -> List[Optional[CatalogEntry]]:
+        """Bring the catalog in sync with the given files
+
+        Returns one entry per input file, in order; unreadable files map to
+        None so callers can fall back to reading them directly.
+        """
+        if not self._loaded:
+            self.load()
+
+        hits = misses = 0
+        results: List[Optional[CatalogEntry]] = []
+        seen = set()
+
+        for file_path in files:
+            key = str(file_path)
+            seen.add(key)
+            try:
+                st = os.stat(file_path)
+            except OSError:
+                results.append(None)
+                continue
+
+            entry = self.entries.get(key)
+            if entry is not None and entry.signature() == stat_signature(st):
+                if not self._is_racy(entry):
+                    hits += 1
+                    results.append(entry)
+                    continue
+                # 重新校验后需要保存，推进保存时间戳使该条目不再可疑
+                self._dirty = True
+
+            misses += 1
+            new_entry = self._read_entry(file_path, st)
+            if new_entry is None:
+                if self.entries.pop(key, None) is not None:
+                    self._dirty = True
+            elif new_entry != entry:
+                self.entries[key] = new_entry
+                self._dirty = True
+            results.append(new_entry)
+
+        stale = [key for key in self.entries if key not in seen]
+        for key in stale:
+            del self.entries[key]
+        if stale:
+            self._dirty = True
+
+        self.last_refresh = {"hits": hits, "misses": misses, "removed": len(stale)}
+        return results
+
+    def _is_racy(self, entry: CatalogEntry) -> bool:
+        """文件在目录保存的同一时刻被修改时，stat 签名可能无法区分新旧内容"""
+        return entry.mtime_ns >= self._saved_at_ns
+
+    def _read_entry(self, file_path: Path, st: os.stat_result) -> Optional[CatalogEntry]:
+        """Read a file once and extract all cached metadata from it"""
+        try:
+            with open(file_path, "rb") as f:
+                raw = f.read()
+            content = raw.decode("utf-8")
+        except Exception:
+            return None
+
+        # 与文本模式读取保持一致的换行处理
+        lines = content.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+        if lines and lines[-1] == "":
+            lines.pop()
+        preview_lines = [line.strip() for line in lines[:PREVIEW_MAX_LINES]]
+
+        size, mtime_ns, inode = stat_signature(st)
+        return CatalogEntry(
+            path=str(file_path),
+            size=size,
+            mtime_ns=mtime_ns,
+            inode=inode,
+            sha256=hashlib.sha256(raw).hexdigest(),
+            summary=preview_lines[0] if preview_lines else "",
+            preview_lines=preview_lines,
+            variables=self.parser.extract_variables(content),
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取目录统计信息"""
+        return {
+            "entries": len(self.entries),
+            "catalog_path": str(self.catalog_path),
+            **self.last_refresh,
+        }
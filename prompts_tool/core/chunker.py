@@ -0,0 +1,43 @@
+"""Chunker module - splits long prompts into overlapping passages"""
+
+from typing import List, Tuple
+
+
+def split_passages(text: str, max_chars: int = 1000, overlap: int = 200) -> List[Tuple[int, int]]:
+    """Split text into overlapping (start, end) character spans
+
+    Spans end at a line break (or else a space) where possible, and the
+    overlap starts at a line boundary when there is one. Text no longer
+    than `max_chars` is a single passage; whitespace-only spans are
+    dropped. The split is deterministic, so spans can be recomputed from
+    the stored content instead of being persisted.
+    """
+    length = len(text)
+    if length <= max_chars:
+        return [(0, length)] if text.strip() else []
+
+    # 重叠不超过半个段落，保证每次至少前进半个段落
+    overlap = max(0, min(overlap, max_chars // 2 - 1))
+    spans = []
+    start = 0
+    while start < length:
+        end = min(start + max_chars, length)
+        if end < length:
+            floor = start + max_chars // 2
+            cut = text.rfind("\n", floor, end)
+            if cut == -1:
+                cut = text.rfind(" ", floor, end)
+            if cut != -1:
+                end = cut + 1
+
+        if text[start:end].strip():
+            spans.append((start, end))
+        if end >= length:
+            break
+
+        next_start = end - overlap
+        line_start = text.find("\n", next_start, end - 1)
+        if line_start != -1:
+            next_start = line_start + 1
+        start = next_start
+    return spans
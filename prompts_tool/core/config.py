@@ -15,6 +15,40 @@ class RepoConfig:
     url: str = "https://github.com/yourusername/prompts-repo.git"
     local_paths: List[str] = field(default_factory=lambda: ["~/.prompts/repo"])
     branch: str = "main"
+    max_depth: Optional[int] = None
+    load_workers: int = 8
+
+
+@dataclass
+class ModelConfig:
+    """Embedding model configuration"""
+    name: str = "all-MiniLM-L6-v2"
+    device: str = "cpu"
+    backend: str = "torch"  # "torch"（SentenceTransformer）或 "onnx"（ONNX Runtime，不导入 torch）
+    onnx_path: str = "~/.prompts/onnx"  # 导出的 ONNX 模型目录（每个模型一个子目录）
+    quantize: bool = True  # onnx 后端使用 int8 动态量化模型
+    batch_memory_mb: int = 1024  # 建索引时每个编码批次的激活内存预算
+    batch_tokens: int = 0  # 每批填充后的 token 上限，0 表示自动校准
+    workers: int = 1  # 建索引时的编码进程数，1 表示在当前进程内编码
+
+
+@dataclass
+class CacheConfig:
+    """Embedding cache configuration (shared across repositories)"""
+    enabled: bool = True
+    path: str = "~/.prompts/cache/embeddings"
+    max_entries: int = 200000
+    query_max_entries: int = 1000  # 查询嵌入 LRU 缓存大小，0 表示禁用
+    query_persist: bool = True  # 查询缓存保存到索引目录，进程重启后仍可命中
+    query_save_delay: float = 5.0  # 新查询缓存条目延迟多少秒后写入文件，期间的查询合并为一次写入
+
+
+@dataclass
+class DaemonConfig:
+    """Search daemon configuration"""
+    socket_path: str = "~/.prompts/daemon.sock"
+    refresh_interval: int = 30  # 秒，0 表示不自动刷新索引
+    timeout: float = 0.5  # 连接探测超时（秒）
 
 
 @dataclass
@@ -24,11 +58,56 @@ class UIConfig:
     host: str = "localhost"
 
 
+@dataclass
+class KeywordConfig:
+    """Keyword search configuration"""
+    segmenter: str = "bigram"  # "bigram" 或 "jieba"
+    refresh_interval: float = 5.0  # 搜索时最多每隔多少秒重新扫描文件同步关键词索引
+
+
+SEARCH_MODES = ("hybrid", "vector")
+
+
+@dataclass
+class SearchConfig:
+    """Search mode configuration"""
+    mode: str = "hybrid"  # "hybrid"（关键词 + 语义融合）或 "vector"
+    candidates: int = 50  # 每个检索器参与融合的候选数
+    rrf_k: int = 60  # 倒数排名融合的平滑常数
+
+
+@dataclass
+class IndexConfig:
+    """Vector index structure configuration"""
+    backend: str = "auto"  # "auto"（有 faiss 时使用 faiss）、"faiss"、"numpy" 或 "hnswlib"
+    type: str = "auto"  # "auto"、"flat"、"hnsw" 或 "ivfpq"
+    recall_target: float = 0.95
+    flat_max_vectors: int = 50000  # 少于该数量时使用精确的 flat 索引
+    hnsw_max_vectors: int = 1000000  # 少于该数量时使用 HNSW，否则使用 IVF-PQ
+    storage: str = "float32"  # flat / HNSW 的向量存储: "float32"、"float16" 或 "sq8"（8 位标量量化）
+    rescore: bool = True  # 有损存储时保留 float32 向量在磁盘上，对候选精确重新打分
+    chunk_chars: int = 1000  # 长 Prompt 按该长度（字符）切分为段落分别编码
+    chunk_overlap: int = 200  # 相邻段落重叠的字符数
+    pooling: str = "max"  # 段落得分汇总为文件得分: "max" 或 "topm"（前 m 个段落的平均）
+    pool_top_m: int = 3
+    reduce: str = "none"  # 降维: "none"、"pca"（建索引时学习）或 "truncate"（Matryoshka 模型前缀截断）
+    reduce_dim: int = 128  # 降维后的维度
+    build_lock_timeout: float = 30.0  # 其他进程正在构建时最多等待的秒数，超时后先使用关键词搜索
+    build_lock_stale: float = 30.0  # 构建锁心跳超过该秒数未更新视为失效
+    rebuild_deleted_ratio: float = 0.2  # 只能标记删除的索引（hnswlib）中已删除向量超过该比例时重建
+
+
 @dataclass
 class Config:
     """Main configuration class"""
     repo: RepoConfig = field(default_factory=RepoConfig)
+    model: ModelConfig = field(default_factory=ModelConfig)
+    cache: CacheConfig = field(default_factory=CacheConfig)
     ui: UIConfig = field(default_factory=UIConfig)
+    daemon: DaemonConfig = field(default_factory=DaemonConfig)
+    keyword: KeywordConfig = field(default_factory=KeywordConfig)
+    index: IndexConfig = field(default_factory=IndexConfig)
+    search: SearchConfig = field(default_factory=SearchConfig)
     
     def __post_init__(self):
         # Expand user paths
@@ -67,6 +146,46 @@ class Config:
                     config.repo.local_paths = [repo_data["local_path"]]
                 if "branch" in repo_data:
                     config.repo.branch = repo_data["branch"]
+                if "max_depth" in repo_data:
+                    config.repo.max_depth = repo_data["max_depth"]
+                if "load_workers" in repo_data:
+                    config.repo.load_workers = repo_data["load_workers"]
+            
+            # Update model configuration
+            if "model" in config_data:
+                model_data = config_data["model"]
+                if "name" in model_data:
+                    config.model.name = model_data["name"]
+                if "device" in model_data:
+                    config.model.device = model_data["device"]
+                if "backend" in model_data:
+                    config.model.backend = model_data["backend"]
+                if "onnx_path" in model_data:
+                    config.model.onnx_path = model_data["onnx_path"]
+                if "quantize" in model_data:
+                    config.model.quantize = model_data["quantize"]
+                if "batch_memory_mb" in model_data:
+                    config.model.batch_memory_mb = model_data["batch_memory_mb"]
+                if "batch_tokens" in model_data:
+                    config.model.batch_tokens = model_data["batch_tokens"]
+                if "workers" in model_data:
+                    config.model.workers = model_data["workers"]
+            
+            # Update embedding cache configuration
+            if "cache" in config_data:
+                cache_data = config_data["cache"]
+                if "enabled" in cache_data:
+                    config.cache.enabled = cache_data["enabled"]
+                if "path" in cache_data:
+                    config.cache.path = cache_data["path"]
+                if "max_entries" in cache_data:
+                    config.cache.max_entries = cache_data["max_entries"]
+                if "query_max_entries" in cache_data:
+                    config.cache.query_max_entries = cache_data["query_max_entries"]
+                if "query_persist" in cache_data:
+                    config.cache.query_persist = cache_data["query_persist"]
+                if "query_save_delay" in cache_data:
+                    config.cache.query_save_delay = cache_data["query_save_delay"]
             
             # Update UI configuration
             if "ui" in config_data:
@@ -75,6 +194,70 @@ class Config:
                     config.ui.port = ui_data["port"]
                 if "host" in ui_data:
                     config.ui.host = ui_data["host"]
+
+            # Update daemon configuration
+            if "daemon" in config_data:
+                daemon_data = config_data["daemon"]
+                if "socket_path" in daemon_data:
+                    config.daemon.socket_path = daemon_data["socket_path"]
+                if "refresh_interval" in daemon_data:
+                    config.daemon.refresh_interval = daemon_data["refresh_interval"]
+                if "timeout" in daemon_data:
+                    config.daemon.timeout = daemon_data["timeout"]
+
+            # Update keyword search configuration
+            if "keyword" in config_data:
+                keyword_data = config_data["keyword"]
+                if "segmenter" in keyword_data:
+                    config.keyword.segmenter = keyword_data["segmenter"]
+                if "refresh_interval" in keyword_data:
+                    config.keyword.refresh_interval = keyword_data["refresh_interval"]
+
+            # Update vector index configuration
+            if "index" in config_data:
+                index_data = config_data["index"]
+                if "type" in index_data:
+                    config.index.type = index_data["type"]
+                if "backend" in index_data:
+                    config.index.backend = index_data["backend"]
+                if "recall_target" in index_data:
+                    config.index.recall_target = index_data["recall_target"]
+                if "flat_max_vectors" in index_data:
+                    config.index.flat_max_vectors = index_data["flat_max_vectors"]
+                if "hnsw_max_vectors" in index_data:
+                    config.index.hnsw_max_vectors = index_data["hnsw_max_vectors"]
+                if "storage" in index_data:
+                    config.index.storage = index_data["storage"]
+                if "rescore" in index_data:
+                    config.index.rescore = index_data["rescore"]
+                if "chunk_chars" in index_data:
+                    config.index.chunk_chars = index_data["chunk_chars"]
+                if "chunk_overlap" in index_data:
+                    config.index.chunk_overlap = index_data["chunk_overlap"]
+                if "pooling" in index_data:
+                    config.index.pooling = index_data["pooling"]
+                if "pool_top_m" in index_data:
+                    config.index.pool_top_m = index_data["pool_top_m"]
+                if "reduce" in index_data:
+                    config.index.reduce = index_data["reduce"]
+                if "reduce_dim" in index_data:
+                    config.index.reduce_dim = index_data["reduce_dim"]
+                if "build_lock_timeout" in index_data:
+                    config.index.build_lock_timeout = index_data["build_lock_timeout"]
+                if "build_lock_stale" in index_data:
+                    config.index.build_lock_stale = index_data["build_lock_stale"]
+                if "rebuild_deleted_ratio" in index_data:
+                    config.index.rebuild_deleted_ratio = index_data["rebuild_deleted_ratio"]
+
+            # Update search configuration
+            if "search" in config_data:
+                search_data = config_data["search"]
+                if "mode" in search_data:
+                    config.search.mode = search_data["mode"]
+                if "candidates" in search_data:
+                    config.search.candidates = search_data["candidates"]
+                if "rrf_k" in search_data:
+                    config.search.rrf_k = search_data["rrf_k"]
             
             return config
             
@@ -95,11 +278,63 @@ class Config:
                 "url": self.repo.url,
                 "local_paths": self.repo.local_paths,
                 "branch": self.repo.branch,
+                "max_depth": self.repo.max_depth,
+                "load_workers": self.repo.load_workers,
+            },
+            "model": {
+                "name": self.model.name,
+                "device": self.model.device,
+                "backend": self.model.backend,
+                "onnx_path": self.model.onnx_path,
+                "quantize": self.model.quantize,
+                "batch_memory_mb": self.model.batch_memory_mb,
+                "batch_tokens": self.model.batch_tokens,
+                "workers": self.model.workers,
+            },
+            "cache": {
+                "enabled": self.cache.enabled,
+                "path": self.cache.path,
+                "max_entries": self.cache.max_entries,
+                "query_max_entries": self.cache.query_max_entries,
+                "query_persist": self.cache.query_persist,
+                "query_save_delay": self.cache.query_save_delay,
             },
             "ui": {
                 "port": self.ui.port,
                 "host": self.ui.host,
             },
+            "daemon": {
+                "socket_path": self.daemon.socket_path,
+                "refresh_interval": self.daemon.refresh_interval,
+                "timeout": self.daemon.timeout,
+            },
+            "keyword": {
+                "segmenter": self.keyword.segmenter,
+                "refresh_interval": self.keyword.refresh_interval,
+            },
+            "index": {
+                "backend": self.index.backend,
+                "type": self.index.type,
+                "recall_target": self.index.recall_target,
+                "flat_max_vectors": self.index.flat_max_vectors,
+                "hnsw_max_vectors": self.index.hnsw_max_vectors,
+                "storage": self.index.storage,
+                "rescore": self.index.rescore,
+                "chunk_chars": self.index.chunk_chars,
+                "chunk_overlap": self.index.chunk_overlap,
+                "pooling": self.index.pooling,
+                "pool_top_m": self.index.pool_top_m,
+                "reduce": self.index.reduce,
+                "reduce_dim": self.index.reduce_dim,
+                "build_lock_timeout": self.index.build_lock_timeout,
+                "build_lock_stale": self.index.build_lock_stale,
+                "rebuild_deleted_ratio": self.index.rebuild_deleted_ratio,
+            },
+            "search": {
+                "mode": self.search.mode,
+                "candidates": self.search.candidates,
+                "rrf_k": self.search.rrf_k,
+            },
         }
         
         try:
@@ -117,5 +352,33 @@ class Config:
         return [Path(p) for p in self.repo.local_paths]
 
     def get_index_path(self) -> Path:
-        """Get the index file path"""
-        return self.get_repo_path() / ".prompts_index"
+        """Get the index directory of the primary path (keyword index, query cache)"""
+        return self.get_shard_index_path(self.get_repo_path())
+
+    def get_shard_index_path(self, repo_path: Path) -> Path:
+        """Get the vector index directory of one configured path"""
+        return Path(repo_path) / ".prompts_index"
+
+    def get_embedding_cache_path(self) -> Path:
+        """Get the shared embedding cache directory"""
+        return Path(os.path.expanduser(self.cache.path))
+
+    def get_onnx_model_path(self) -> Path:
+        """Get the exported ONNX model directory for the configured model"""
+        return Path(os.path.expanduser(self.model.onnx_path)) / self.model.name.replace("/", "__")
+
+    def get_query_cache_path(self) -> Path:
+        """Get the persisted query embedding cache file"""
+        return self.get_index_path() / "query_cache.npz"
+
+    def get_daemon_socket_path(self) -> Path:
+        """Get the search daemon Unix socket path"""
+        return Path(os.path.expanduser(self.daemon.socket_path))
+
+    def get_keyword_index_path(self) -> Path:
+        """Get the BM25 keyword index database path"""
+        return self.get_index_path() / "keyword.sqlite"
+
+    def get_catalog_path(self) -> Path:
+        """Get the prompt catalog file path (next to the index)"""
+        return self.get_index_path().parent / ".prompts_catalog.json"
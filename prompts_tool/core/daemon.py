@@ -0,0 +1,292 @@
+"""Search daemon module - keeps the model and index resident behind a Unix socket
+
+Protocol: every message is a 4-byte big-endian length followed by a UTF-8
+JSON object. Requests look like `{"op": "search", "args": {...}}` and
+responses like `{"ok": true, "result": ...}` or `{"ok": false, "error": "..."}`.
+"""
+
+import json
+import os
+import socket
+import socketserver
+import struct
+import threading
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+from .config import Config
+from .parser import PromptParser
+
+PROTOCOL_VERSION = 1
+
+# 单条消息的长度上限，防止异常请求耗尽内存
+MAX_MESSAGE_BYTES = 64 * 1024 * 1024
+
+_HEADER = struct.Struct(">I")
+
+
+class DaemonError(Exception):
+    """Raised when the daemon reports an error or the connection breaks"""
+
+
+def send_message(sock: socket.socket, payload: Dict[str, Any]) -> None:
+    """Send one length-prefixed JSON message"""
+    data = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+    sock.sendall(_HEADER.pack(len(data)) + data)
+
+
+def recv_message(sock: socket.socket) -> Optional[Dict[str, Any]]:
+    """Receive one length-prefixed JSON message; None on a clean EOF"""
+    header = _recv_exact(sock, _HEADER.size)
+    if header is None:
+        return None
+    (length,) = _HEADER.unpack(header)
+    if length > MAX_MESSAGE_BYTES:
+        raise DaemonError(f"消息过大: {length} 字节")
+    data = _recv_exact(sock, length)
+    if data is None:
+        raise DaemonError("连接在消息中途关闭")
+    return json.loads(data.decode("utf-8"))
+
+
+def _recv_exact(sock: socket.socket, size: int) -> Optional[bytes]:
+    chunks = []
+    remaining = size
+    while remaining:
+        chunk = sock.recv(min(remaining, 1024 * 1024))
+        if not chunk:
+            if remaining == size:
+                return None
+            raise DaemonError("连接在消息中途关闭")
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+
+def _jsonable(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Convert Path values so results can be sent as JSON"""
+    return [
+        {key: str(value) if isinstance(value, Path) else value for key, value in item.items()}
+        for item in items
+    ]
+
+
+def _restore_paths(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    for item in items:
+        if "file_path" in item:
+            item["file_path"] = Path(item["file_path"])
+    return items
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Serve framed requests on one connection until the client closes it"""
+
+    def handle(self):
+        while True:
+            try:
+                request = recv_message(self.connection)
+            except (DaemonError, ValueError, OSError):
+                return
+            if request is None:
+                return
+
+            try:
+                result = self.server.search_daemon.dispatch(
+                    request.get("op", ""), request.get("args") or {}
+                )
+                response = {"ok": True, "result": result}
+            except Exception as e:
+                response = {"ok": False, "error": str(e)}
+
+            try:
+                send_message(self.connection, response)
+            except OSError:
+                return
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class SearchDaemon:
+    """Long-lived server holding a warm `PromptSearcher`"""
+
+    def __init__(self, config: Config, repo, searcher):
+        self.config = config
+        self.repo = repo
+        self.searcher = searcher
+        self.parser = PromptParser()
+        self.socket_path = config.get_daemon_socket_path()
+        # 搜索与索引刷新互斥，避免查询读到更新中的索引
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._server: Optional[_UnixServer] = None
+
+    def dispatch(self, op: str, args: Dict[str, Any]) -> Any:
+        """Execute a single request"""
+        if op == "ping":
+            return {
+                "protocol": PROTOCOL_VERSION,
+                "pid": os.getpid(),
+                "index_path": str(self.config.get_index_path()),
+            }
+        if op == "search":
+            with self._lock:
+                results = self.searcher.search(
+                    args["query"], top_k=int(args.get("top_k", 5)), mode=args.get("mode")
+                )
+            return _jsonable(results)
+        if op == "search_many":
+            with self._lock:
+                batches = self.searcher.search_many(
+                    args["queries"], top_k=int(args.get("top_k", 5)), mode=args.get("mode")
+                )
+            return [_jsonable(results) for results in batches]
+        if op == "list":
+            with self._lock:
+                results = self.repo.list_prompts(
+                    preview_lines=args.get("preview_lines"),
+                    filter_keyword=args.get("filter_keyword"),
+                )
+            return _jsonable(results)
+        if op == "fill":
+            content = args.get("content")
+            if content is None:
+                content = self.repo.get_prompt_content(Path(args["file_path"]))
+            variables = args.get("variables") or {}
+            return {
+                "content": self.parser.fill_variables(content, variables),
+                "missing": self.parser.validate_variables(content, variables),
+            }
+        if op == "rebuild":
+            with self._lock:
+                return self.searcher.rebuild_index()
+        if op == "info":
+            return self.searcher.get_index_info()
+        if op == "shutdown":
+            threading.Thread(target=self.stop, daemon=True).start()
+            return True
+        raise ValueError(f"未知的请求类型: {op}")
+
+    def _refresh_loop(self) -> None:
+        """定期同步索引，使常驻进程感知仓库变化"""
+        interval = self.config.daemon.refresh_interval
+        while not self._stop.wait(interval):
+            try:
+                with self._lock:
+                    self.searcher.refresh_index()
+            except Exception as e:
+                print(f"⚠️ 索引刷新失败: {e}")
+
+    def serve_forever(self) -> None:
+        """Bind the socket and serve until stopped"""
+        if DaemonClient.connect(self.config) is not None:
+            raise DaemonError(f"守护进程已在运行: {self.socket_path}")
+
+        # 清理上次异常退出留下的套接字文件
+        if self.socket_path.exists():
+            self.socket_path.unlink()
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self.searcher.ensure_index()
+
+        self._server = _UnixServer(str(self.socket_path), _RequestHandler)
+        self._server.search_daemon = self
+        os.chmod(self.socket_path, 0o600)
+
+        if self.config.daemon.refresh_interval > 0:
+            threading.Thread(target=self._refresh_loop, daemon=True).start()
+
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            try:
+                self.socket_path.unlink()
+            except FileNotFoundError:
+                pass
+            self.searcher.close()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+
+
+class DaemonClient:
+    """Client for `SearchDaemon`; one connection reused across requests"""
+
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+
+    @classmethod
+    def connect(cls, config: Config) -> Optional["DaemonClient"]:
+        """连接守护进程；不可用或服务于其他索引时返回 None"""
+        socket_path = config.get_daemon_socket_path()
+        if not socket_path.exists():
+            return None
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(config.daemon.timeout)
+        try:
+            sock.connect(str(socket_path))
+            client = cls(sock)
+            info = client.request("ping")
+        except (OSError, DaemonError, ValueError):
+            sock.close()
+            return None
+
+        if info.get("protocol") != PROTOCOL_VERSION \
+                or info.get("index_path") != str(config.get_index_path()):
+            client.close()
+            return None
+
+        # 握手超时只用于探测；搜索和重建可能耗时较长
+        sock.settimeout(None)
+        return client
+
+    def request(self, op: str, **args) -> Any:
+        """Send a request and wait for its response"""
+        try:
+            send_message(self.sock, {"op": op, "args": args})
+            response = recv_message(self.sock)
+        except OSError as e:
+            raise DaemonError(f"与守护进程通信失败: {e}")
+        if response is None:
+            raise DaemonError("守护进程关闭了连接")
+        if not response.get("ok"):
+            raise DaemonError(response.get("error", "未知错误"))
+        return response.get("result")
+
+    def search(self, query: str, top_k: int = 5, mode: Optional[str] = None) -> List[Dict[str, Any]]:
+        return _restore_paths(self.request("search", query=query, top_k=top_k, mode=mode))
+
+    def search_many(self, queries: List[str], top_k: int = 5,
+                    mode: Optional[str] = None) -> List[List[Dict[str, Any]]]:
+        batches = self.request("search_many", queries=queries, top_k=top_k, mode=mode)
+        return [_restore_paths(results) for results in batches]
+
+    def list_prompts(self, preview_lines: Optional[int] = None,
+                     filter_keyword: Optional[str] = None) -> List[Dict[str, Any]]:
+        return _restore_paths(self.request(
+            "list", preview_lines=preview_lines, filter_keyword=filter_keyword
+        ))
+
+    def fill(self, variables: Dict[str, str], content: Optional[str] = None,
+             file_path: Optional[Path] = None) -> Dict[str, Any]:
+        return self.request(
+            "fill", content=content,
+            file_path=str(file_path) if file_path else None, variables=variables,
+        )
+
+    def rebuild_index(self) -> bool:
+        return bool(self.request("rebuild"))
+
+    def get_index_info(self) -> Dict[str, Any]:
+        return self.request("info")
+
+    def close(self) -> None:
+        try:
+            self.sock.close()
+        except OSError:
+            pass
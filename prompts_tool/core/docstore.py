@@ -0,0 +1,214 @@
+"""Document store module - memory-mapped record table plus content blob
+
+Replaces the pickled metadata list: opening the store only maps two files,
+and prompt content is decoded lazily for the hits that are actually shown.
+"""
+
+import json
+import mmap
+import os
+from pathlib import Path
+from typing import Dict, Any, Optional, Iterable, Tuple
+
+import numpy as np
+
+# 记录表：每个文档一行，按向量 ID 排序以便二分查找
+RECORD_DTYPE = np.dtype([
+    ("id", "<i8"),
+    ("path_offset", "<u8"),
+    ("path_length", "<u4"),
+    ("content_offset", "<u8"),
+    ("content_length", "<u4"),
+])
+
+# 指针文件记录当前的记录表和内容文件，原子替换后新数据才对读者可见
+POINTER_FILE = "docs.json"
+DOCSTORE_VERSION = 1
+
+# 内容文件中失效数据超过该比例时压缩重写
+COMPACT_RATIO = 0.5
+
+
+class DocStore:
+    """Fixed-width record table + content blob, both opened with mmap
+
+    Updates append new content to the blob, write a new record table and
+    then atomically swap the `docs.json` pointer, so readers that already
+    mapped the old files keep a consistent view and a crash never leaves a
+    half-written store. The blob is rewritten once most of it is garbage.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.records = np.zeros(0, dtype=RECORD_DTYPE)
+        self.pointer: Dict[str, Any] = {}
+        self._blob: Optional[mmap.mmap] = None
+
+    @property
+    def blob_path(self) -> Optional[Path]:
+        if "blob" not in self.pointer:
+            return None
+        return self.directory / self.pointer["blob"]
+
+    def open(self) -> bool:
+        """映射已有的存储文件，文件缺失或格式不符时返回 False"""
+        try:
+            with open(self.directory / POINTER_FILE, "r", encoding="utf-8") as f:
+                pointer = json.load(f)
+            if pointer.get("version") != DOCSTORE_VERSION:
+                return False
+            records = np.load(self.directory / pointer["records"], mmap_mode="r")
+            if records.dtype != RECORD_DTYPE:
+                return False
+            blob_file = open(self.directory / pointer["blob"], "rb")
+        except (OSError, ValueError, KeyError):
+            return False
+
+        self.close()
+        self.pointer = pointer
+        self.records = records
+        with blob_file:
+            if os.fstat(blob_file.fileno()).st_size > 0:
+                self._blob = mmap.mmap(blob_file.fileno(), 0, access=mmap.ACCESS_READ)
+        return True
+
+    def close(self) -> None:
+        self.records = np.zeros(0, dtype=RECORD_DTYPE)
+        if self._blob is not None:
+            self._blob.close()
+            self._blob = None
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __contains__(self, vector_id: int) -> bool:
+        return self._find(vector_id) is not None
+
+    def _find(self, vector_id: int) -> Optional[int]:
+        ids = self.records["id"]
+        pos = int(np.searchsorted(ids, vector_id))
+        if pos < len(ids) and ids[pos] == vector_id:
+            return pos
+        return None
+
+    def _read(self, offset: int, length: int) -> str:
+        if length == 0:
+            return ""
+        return self._blob[offset:offset + length].decode("utf-8")
+
+    def get_path(self, vector_id: int) -> Optional[str]:
+        """Get the file path of a document without touching its content"""
+        pos = self._find(vector_id)
+        if pos is None:
+            return None
+        record = self.records[pos]
+        return self._read(int(record["path_offset"]), int(record["path_length"]))
+
+    def get(self, vector_id: int) -> Optional[Dict[str, Any]]:
+        """Materialize a single document (path and content)"""
+        pos = self._find(vector_id)
+        if pos is None:
+            return None
+        record = self.records[pos]
+        return {
+            "file_path": Path(self._read(int(record["path_offset"]), int(record["path_length"]))),
+            "content": self._read(int(record["content_offset"]), int(record["content_length"])),
+        }
+
+    def update(self, added: Iterable[Tuple[int, str, str]],
+               removed_ids: Iterable[int] = ()) -> None:
+        """Add (id, path, content) documents and drop removed IDs, then reopen"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        removed = np.fromiter(removed_ids, dtype="<i8")
+        keep = np.array(self.records)
+        if len(removed):
+            keep = keep[~np.isin(keep["id"], removed)]
+
+        generation = self.pointer.get("generation", 0) + 1
+        old_blob = self.blob_path
+        blob_size = old_blob.stat().st_size if old_blob and old_blob.exists() else 0
+        live_bytes = int(keep["path_length"].sum() + keep["content_length"].sum())
+
+        if old_blob is None or live_bytes < blob_size * COMPACT_RATIO:
+            # 失效数据过多（或首次写入）时写入新的内容文件
+            blob_path = self.directory / f"docs.{generation}.blob"
+            keep, blob_size = self._compact(keep, blob_path)
+        else:
+            # 追加写入不影响已映射旧长度的读者
+            blob_path = old_blob
+
+        new_records = []
+        with open(blob_path, "ab") as f:
+            offset = blob_size
+            for vector_id, path, content in added:
+                path_bytes = path.encode("utf-8")
+                content_bytes = content.encode("utf-8")
+                f.write(path_bytes)
+                f.write(content_bytes)
+                new_records.append((
+                    vector_id, offset, len(path_bytes),
+                    offset + len(path_bytes), len(content_bytes),
+                ))
+                offset += len(path_bytes) + len(content_bytes)
+            f.flush()
+            os.fsync(f.fileno())
+
+        records = np.concatenate([keep, np.array(new_records, dtype=RECORD_DTYPE)])
+        records = records[np.argsort(records["id"], kind="stable")]
+        records_path = self.directory / f"docs.records.{generation}.npy"
+        with open(records_path, "wb") as f:
+            np.save(f, records)
+            f.flush()
+            os.fsync(f.fileno())
+
+        old_files = {self.pointer.get("records"), self.pointer.get("blob")} - {None}
+        pointer = {
+            "version": DOCSTORE_VERSION,
+            "generation": generation,
+            "records": records_path.name,
+            "blob": blob_path.name,
+        }
+        tmp_path = self.directory / (POINTER_FILE + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(pointer, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.directory / POINTER_FILE)
+
+        # 已映射的旧文件在 POSIX 上删除后仍可读取
+        for name in old_files - {pointer["records"], pointer["blob"]}:
+            try:
+                (self.directory / name).unlink()
+            except OSError:
+                pass
+        self.open()
+
+    def _compact(self, keep: np.ndarray, blob_path: Path) -> Tuple[np.ndarray, int]:
+        """Copy live documents into a new blob, returning remapped records"""
+        compacted = keep.copy()
+        offset = 0
+        with open(blob_path, "wb") as f:
+            for i, record in enumerate(keep):
+                path_start, path_length = int(record["path_offset"]), int(record["path_length"])
+                content_start, content_length = int(record["content_offset"]), int(record["content_length"])
+                f.write(self._blob[path_start:path_start + path_length])
+                f.write(self._blob[content_start:content_start + content_length])
+                compacted[i]["path_offset"] = offset
+                compacted[i]["content_offset"] = offset + path_length
+                offset += path_length + content_length
+        return compacted, offset
+
+    def remove_files(self) -> None:
+        """Close the store and delete all of its files"""
+        self.close()
+        self.pointer = {}
+        for path in self.directory.glob("docs.*"):
+            path.unlink(missing_ok=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取存储统计信息"""
+        return {
+            "documents": len(self.records),
+            "content_bytes": int(self.records["content_length"].sum()) if len(self.records) else 0,
+            "blob_bytes": self.blob_path.stat().st_size if self.blob_path else 0,
+        }
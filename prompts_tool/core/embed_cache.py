@@ -0,0 +1,270 @@
+"""Embedding cache module - content-hash keyed, memory-mapped vector store"""
+
+import re
+import sqlite3
+import time
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Sequence
+
+import numpy as np
+
+# 向量文件每次扩容的最小行数
+_GROW_ROWS = 1024
+
+
+class EmbeddingCache:
+    """Persistent embedding cache keyed by (model name, content SHA-256)
+
+    Each model gets its own directory holding a float32 vector file opened
+    with `np.memmap` and a SQLite key index (hash -> slot, last use). The
+    cache is shared by every repository and rebuild, so only new text has
+    to be encoded. When more than `max_entries` vectors are stored, the
+    least recently used ones are evicted and their slots reused.
+    """
+
+    def __init__(self, cache_dir: Path, model_name: str, max_entries: int = 200000):
+        self.cache_dir = Path(cache_dir)
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.model_dir = self.cache_dir / _slugify(model_name)
+        self.vectors_path = self.model_dir / "vectors.f32"
+        self.hits = 0
+        self.misses = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._vectors: Optional[np.memmap] = None
+        self._dimension: Optional[int] = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = self._open()
+        return self._conn
+
+    def _open(self) -> sqlite3.Connection:
+        """打开键索引数据库，必要时创建表结构"""
+        self.model_dir.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.model_dir / "keys.sqlite"), timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " sha256 TEXT PRIMARY KEY,"
+                " slot INTEGER UNIQUE NOT NULL,"
+                " last_used REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS entries_lru ON entries (last_used)"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS free_slots (slot INTEGER PRIMARY KEY)")
+            conn.execute(
+                "INSERT OR IGNORE INTO meta (key, value) VALUES ('model_name', ?)",
+                (self.model_name,),
+            )
+        meta = dict(conn.execute("SELECT key, value FROM meta"))
+        if "dimension" in meta:
+            self._dimension = int(meta["dimension"])
+        return conn
+
+    def close(self) -> None:
+        """Flush counters and release the database and memory map"""
+        if self._conn is not None:
+            self.flush()
+            self._conn.close()
+            self._conn = None
+        self._vectors = None
+
+    def _map_vectors(self, min_rows: int = 0) -> np.memmap:
+        """Map the vector file, growing it to hold at least `min_rows` rows"""
+        row_bytes = self._dimension * 4
+        size = self.vectors_path.stat().st_size if self.vectors_path.exists() else 0
+        rows = size // row_bytes
+
+        if rows < min_rows:
+            rows = max(min_rows, rows + _GROW_ROWS, rows * 2)
+            self._vectors = None
+            with open(self.vectors_path, "ab") as f:
+                f.truncate(rows * row_bytes)
+        elif self._vectors is not None and len(self._vectors) >= min_rows:
+            return self._vectors
+
+        if rows == 0:
+            return np.empty((0, self._dimension), dtype="float32")
+        self._vectors = np.memmap(
+            self.vectors_path, dtype="float32", mode="r+", shape=(rows, self._dimension)
+        )
+        return self._vectors
+
+    def get_many(self, hashes: Sequence[str]) -> Dict[str, np.ndarray]:
+        """Look up cached embeddings; returns the hits keyed by hash"""
+        unique = list(dict.fromkeys(hashes))
+        found: Dict[str, np.ndarray] = {}
+        conn = self.conn
+        if not unique or self._dimension is None:
+            self.misses += len(unique)
+            return found
+
+        slots: Dict[str, int] = {}
+        for start in range(0, len(unique), 500):
+            chunk = unique[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            slots.update(conn.execute(
+                f"SELECT sha256, slot FROM entries WHERE sha256 IN ({placeholders})",
+                chunk,
+            ))
+
+        if slots:
+            vectors = self._map_vectors(max(slots.values()) + 1)
+            for sha256, slot in slots.items():
+                found[sha256] = np.array(vectors[slot])
+            now = time.time()
+            with conn:
+                conn.executemany(
+                    "UPDATE entries SET last_used = ? WHERE sha256 = ?",
+                    ((now, sha256) for sha256 in slots),
+                )
+
+        self.hits += len(found)
+        self.misses += len(unique) - len(found)
+        return found
+
+    def put_many(self, hashes: Sequence[str], embeddings: np.ndarray) -> None:
+        """Store embeddings (one row per hash), evicting LRU entries if needed"""
+        if len(hashes) == 0:
+            return
+        embeddings = np.asarray(embeddings, dtype="float32")
+        conn = self.conn
+
+        with conn:
+            # BEGIN IMMEDIATE 防止多个进程分配到同一个槽位
+            conn.execute("BEGIN IMMEDIATE")
+            if self._dimension is None:
+                self._dimension = int(embeddings.shape[1])
+                conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('dimension', ?)",
+                    (str(self._dimension),),
+                )
+            elif embeddings.shape[1] != self._dimension:
+                raise ValueError(
+                    f"嵌入维度 {embeddings.shape[1]} 与缓存维度 {self._dimension} 不一致"
+                )
+
+            next_slot = conn.execute(
+                "SELECT COALESCE(MAX(slot), -1) + 1 FROM entries"
+            ).fetchone()[0]
+            free = [row[0] for row in conn.execute("SELECT slot FROM free_slots ORDER BY slot")]
+            next_slot = max([next_slot] + [slot + 1 for slot in free])
+
+            now = time.time()
+            assignments = []
+            seen = set()
+            for row, sha256 in enumerate(hashes):
+                if sha256 in seen:
+                    continue
+                seen.add(sha256)
+                existing = conn.execute(
+                    "SELECT slot FROM entries WHERE sha256 = ?", (sha256,)
+                ).fetchone()
+                if existing is not None:
+                    slot = existing[0]
+                elif free:
+                    slot = free.pop(0)
+                    conn.execute("DELETE FROM free_slots WHERE slot = ?", (slot,))
+                else:
+                    slot = next_slot
+                    next_slot += 1
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries (sha256, slot, last_used) VALUES (?, ?, ?)",
+                    (sha256, slot, now),
+                )
+                assignments.append((slot, row))
+
+            vectors = self._map_vectors(max(slot for slot, _ in assignments) + 1)
+            for slot, row in assignments:
+                vectors[slot] = embeddings[row]
+            vectors.flush()
+
+            self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection) -> int:
+        """Evict least recently used entries above the size cap"""
+        count = conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        excess = count - self.max_entries
+        if excess <= 0:
+            return 0
+
+        victims = conn.execute(
+            "SELECT sha256, slot FROM entries ORDER BY last_used LIMIT ?", (excess,)
+        ).fetchall()
+        conn.executemany("DELETE FROM entries WHERE sha256 = ?", ((v[0],) for v in victims))
+        conn.executemany("INSERT OR IGNORE INTO free_slots (slot) VALUES (?)", ((v[1],) for v in victims))
+        self._bump("evictions", len(victims))
+        return len(victims)
+
+    def _bump(self, key: str, amount: int) -> None:
+        self.conn.execute(
+            "INSERT INTO meta (key, value) VALUES (?, ?)"
+            " ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + ?",
+            (key, str(amount), amount),
+        )
+
+    def flush(self) -> None:
+        """将本进程的命中统计累加到持久化计数器"""
+        if not self.hits and not self.misses:
+            return
+        with self.conn:
+            self._bump("hits", self.hits)
+            self._bump("misses", self.misses)
+        self.hits = self.misses = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息（包含本进程尚未写入的计数）"""
+        conn = self.conn
+        meta = dict(conn.execute("SELECT key, value FROM meta"))
+        entries = conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        hits = int(meta.get("hits", 0)) + self.hits
+        misses = int(meta.get("misses", 0)) + self.misses
+        size = self.vectors_path.stat().st_size if self.vectors_path.exists() else 0
+        return {
+            "model_name": self.model_name,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "dimension": self._dimension,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            "evictions": int(meta.get("evictions", 0)),
+            "size_bytes": size,
+            "path": str(self.model_dir),
+        }
+
+
+def _slugify(name: str) -> str:
+    """Turn a model name into a safe directory name"""
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", name).strip("_") or "model"
+
+
+def list_cache_stats(cache_dir: Path, max_entries: int = 200000) -> List[Dict[str, Any]]:
+    """Collect stats for every model cached under `cache_dir`"""
+    stats = []
+    cache_dir = Path(cache_dir)
+    if not cache_dir.exists():
+        return stats
+
+    for model_dir in sorted(p for p in cache_dir.iterdir() if (p / "keys.sqlite").exists()):
+        conn = sqlite3.connect(str(model_dir / "keys.sqlite"), timeout=30)
+        try:
+            model_name = dict(conn.execute("SELECT key, value FROM meta")).get(
+                "model_name", model_dir.name
+            )
+        finally:
+            conn.close()
+        cache = EmbeddingCache(cache_dir, model_name, max_entries)
+        try:
+            stats.append(cache.get_stats())
+        finally:
+            cache.close()
+    return stats
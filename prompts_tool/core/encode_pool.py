@@ -0,0 +1,156 @@
+"""Encode pool module - shards embedding work across worker processes
+
+Each worker loads its own model instance (with the configured encoder
+backend) and pins its math libraries to an equal share of the CPU cores,
+so N workers use the whole machine without oversubscribing it. Texts are cut into length-sorted shards of
+similar token counts; finished shards are streamed back and written into
+the output matrix as they arrive.
+"""
+
+import multiprocessing
+import os
+import time
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple, Callable
+
+import numpy as np
+
+from .batching import BatchEncoder, token_lengths
+from .config import ModelConfig
+from .encoders import load_encoder
+
+# 每个进程分到的分片数；分片越多负载越均衡，但每个分片都有固定开销
+SHARDS_PER_WORKER = 4
+
+# 文本数少于该值时不值得启动进程池（每个进程都要加载一次模型）
+PARALLEL_MIN_TEXTS = 512
+
+_THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+
+# 工作进程内的编码器（由 _init_worker 创建）
+_worker_encoder: Optional[BatchEncoder] = None
+
+
+def default_threads(workers: int) -> int:
+    """Get the number of math threads per worker so workers share the cores evenly"""
+    return max(1, (os.cpu_count() or 1) // max(workers, 1))
+
+
+def _init_worker(loader: Callable, model_config: ModelConfig, onnx_path: Optional[Path],
+                 threads: int, memory_mb: int) -> None:
+    """Load the model in a worker process with pinned thread counts"""
+    global _worker_encoder
+    # 在导入 torch 之前设置，OpenMP / MKL 在初始化时读取
+    for name in _THREAD_ENV_VARS:
+        os.environ[name] = str(threads)
+    if model_config.backend != "onnx":
+        try:
+            import torch
+            torch.set_num_threads(threads)
+            torch.set_num_interop_threads(1)
+        except (ImportError, RuntimeError):
+            pass
+
+    model = loader(model_config, onnx_path, threads)
+    _worker_encoder = BatchEncoder(model, memory_mb, model_config.batch_tokens)
+
+
+def _encode_shard(task: Tuple[int, List[str]]) -> Tuple[int, np.ndarray, float]:
+    shard, texts = task
+    embeddings = _worker_encoder.encode(texts)
+    return shard, embeddings, _worker_encoder.stats["seconds"]
+
+
+def plan_shards(lengths: List[int], count: int) -> List[List[int]]:
+    """Split text indexes into up to `count` length-sorted shards of similar token totals"""
+    order = sorted(range(len(lengths)), key=lambda i: -lengths[i])
+    target = sum(lengths) / max(count, 1)
+    shards: List[List[int]] = [[]]
+    tokens = 0
+    for i in order:
+        if shards[-1] and tokens + lengths[i] > target and len(shards) < count:
+            shards.append([])
+            tokens = 0
+        shards[-1].append(i)
+        tokens += lengths[i]
+    return shards
+
+
+class EncodePool:
+    """Process pool that encodes texts with one model instance per worker
+
+    Use as a context manager; the workers (and their models) exist only
+    inside the `with` block. The memory budget per batch is divided
+    between the workers. `stats` has the same keys as `BatchEncoder.stats`
+    plus the worker count. `loader` creates the model in each worker (it
+    must be importable, the workers are spawned).
+    """
+
+    def __init__(self, model_config: ModelConfig, workers: int = 2,
+                 threads: Optional[int] = None, onnx_path: Optional[Path] = None,
+                 loader: Callable = load_encoder):
+        self.model_config = model_config
+        self.loader = loader
+        self.onnx_path = onnx_path
+        self.workers = max(workers, 1)
+        self.memory_mb = max(model_config.batch_memory_mb // self.workers, 1)
+        self.threads = threads or default_threads(self.workers)
+        self.stats: Dict[str, Any] = {}
+        self._pool = None
+
+    def __enter__(self) -> "EncodePool":
+        # spawn：fork 会复制父进程中已初始化的 torch 线程池，可能死锁
+        context = multiprocessing.get_context("spawn")
+        self._pool = context.Pool(
+            self.workers,
+            initializer=_init_worker,
+            initargs=(self.loader, self.model_config, self.onnx_path, self.threads, self.memory_mb),
+        )
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+
+    def encode(self, texts: List[str], lengths: Optional[List[int]] = None) -> np.ndarray:
+        """Encode `texts` across the workers, returning embeddings in the original order
+
+        `lengths` are token lengths used to balance the shards; a character
+        estimate is used when they are not given.
+        """
+        if self._pool is None:
+            raise RuntimeError("EncodePool 需要在 with 语句中使用")
+        if lengths is None:
+            lengths = token_lengths(None, texts)
+        start = time.perf_counter()
+        shards = plan_shards(lengths, self.workers * SHARDS_PER_WORKER)
+        tasks = [(n, [texts[i] for i in rows]) for n, rows in enumerate(shards) if rows]
+
+        embeddings: Optional[np.ndarray] = None
+        busy = 0.0
+        for shard, vectors, seconds in self._pool.imap_unordered(_encode_shard, tasks):
+            if embeddings is None:
+                embeddings = np.zeros((len(texts), vectors.shape[1]), dtype="float32")
+            embeddings[shards[shard]] = vectors
+            busy += seconds
+
+        elapsed = time.perf_counter() - start
+        tokens = sum(lengths)
+        self.stats = {
+            "texts": len(texts),
+            "tokens": tokens,
+            "workers": self.workers,
+            "threads_per_worker": self.threads,
+            "shards": len(tasks),
+            "seconds": elapsed,
+            "utilization": busy / (elapsed * self.workers) if elapsed > 0 else 0.0,
+            "tokens_per_second": tokens / elapsed if elapsed > 0 else 0.0,
+        }
+        if embeddings is None:
+            embeddings = np.zeros((0, 0), dtype="float32")
+        return embeddings
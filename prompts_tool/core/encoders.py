@@ -0,0 +1,225 @@
+"""Encoders module - sentence embedding backends
+
+The "torch" backend is SentenceTransformer. The "onnx" backend runs a
+model exported with `export_onnx` on ONNX Runtime with the `tokenizers`
+library, optionally with dynamic int8 weights, and never imports torch.
+Both expose the subset of the SentenceTransformer interface the searcher
+uses: `encode`, `get_sentence_embedding_dimension` and `max_seq_length`.
+"""
+
+import json
+import shutil
+import tempfile
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+from .config import ModelConfig
+
+BACKENDS = ("torch", "onnx")
+
+ONNX_MODEL_FILE = "model.onnx"
+ONNX_INT8_MODEL_FILE = "model.int8.onnx"
+ONNX_TOKENIZER_FILE = "tokenizer.json"
+ONNX_META_FILE = "encoder.json"
+
+POOLING_MODES = ("mean", "cls", "max")
+
+_INPUT_NAMES = ("input_ids", "attention_mask", "token_type_ids")
+
+# 交叉校验用的默认文本
+CROSS_CHECK_TEXTS = [
+    "Write a concise docstring for a Python function",
+    "帮我写一个 Python 函数的文档字符串",
+    "Summarize the following meeting notes as bullet points",
+    "Translate the text into formal English and keep the tone friendly",
+    "Review this pull request for bugs, style issues and missing tests",
+    "生成一条符合规范的 git 提交信息",
+]
+
+
+def load_encoder(config: ModelConfig, onnx_path: Optional[Path] = None,
+                 threads: Optional[int] = None):
+    """Load the encoder selected by `config.backend`
+
+    The ONNX backend falls back to SentenceTransformer (with a warning)
+    when onnxruntime / tokenizers are missing or the model has not been
+    exported yet. An ImportError is raised if sentence-transformers is
+    needed but not installed.
+    """
+    backend = config.backend
+    if backend not in BACKENDS:
+        print(f"警告: 未知的编码后端 {backend}，使用 torch")
+        backend = "torch"
+
+    if backend == "onnx":
+        try:
+            return OnnxEncoder(onnx_path, quantized=config.quantize, threads=threads)
+        except ImportError:
+            print("⚠️  未安装 onnxruntime 或 tokenizers，使用 torch 后端（pip install onnxruntime tokenizers）")
+        except FileNotFoundError as e:
+            print(f"⚠️  未找到 ONNX 模型（{e}），使用 torch 后端（先运行 prompts --export-onnx）")
+
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(config.name, device=config.device)
+
+
+def pool_embeddings(hidden: np.ndarray, mask: np.ndarray, mode: str = "mean",
+                    normalize: bool = True) -> np.ndarray:
+    """Pool token states (batch, tokens, dim) into sentence embeddings like SentenceTransformer"""
+    mask = mask[:, :, None].astype("float32")
+    if mode == "cls":
+        pooled = hidden[:, 0]
+    elif mode == "max":
+        pooled = np.where(mask > 0, hidden, -1e9).max(axis=1)
+    else:
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+    pooled = pooled.astype("float32")
+    if normalize:
+        pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+    return pooled
+
+
+class OnnxEncoder:
+    """Sentence encoder running an exported transformer on ONNX Runtime
+
+    `path` is a directory written by `export_onnx`. With `quantized`, the
+    dynamically quantized int8 model is used.
+    """
+
+    def __init__(self, path: Path, quantized: bool = True, threads: Optional[int] = None):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self.path = Path(path)
+        model_file = self.path / (ONNX_INT8_MODEL_FILE if quantized else ONNX_MODEL_FILE)
+        meta_file = self.path / ONNX_META_FILE
+        for required in (model_file, meta_file, self.path / ONNX_TOKENIZER_FILE):
+            if not required.exists():
+                raise FileNotFoundError(str(required))
+
+        with open(meta_file, "r", encoding="utf-8") as f:
+            self.meta: Dict[str, Any] = json.load(f)
+        self.max_seq_length = self.meta["max_seq_length"]
+        self.quantized = quantized
+
+        self._tokenizer = Tokenizer.from_file(str(self.path / ONNX_TOKENIZER_FILE))
+        self._tokenizer.enable_truncation(self.max_seq_length)
+        self._tokenizer.enable_padding(pad_id=self.meta["pad_id"], pad_token=self.meta["pad_token"])
+
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+        self._session = ort.InferenceSession(
+            str(model_file), options, providers=["CPUExecutionProvider"]
+        )
+        self._inputs = [i.name for i in self._session.get_inputs()]
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.meta["dimension"]
+
+    def token_lengths(self, texts: List[str]) -> List[int]:
+        """Get the truncated token length of each text (without padding)"""
+        self._tokenizer.no_padding()
+        try:
+            return [len(e.ids) for e in self._tokenizer.encode_batch(texts)]
+        finally:
+            self._tokenizer.enable_padding(pad_id=self.meta["pad_id"], pad_token=self.meta["pad_token"])
+
+    def encode(self, texts: List[str], batch_size: int = 32, show_progress_bar: bool = False,
+               **kwargs) -> np.ndarray:
+        """Encode texts into (normalized) float32 embeddings"""
+        if isinstance(texts, str):
+            texts = [texts]
+        outputs = []
+        for start in range(0, len(texts), batch_size):
+            encodings = self._tokenizer.encode_batch(texts[start:start + batch_size])
+            feed = {
+                "input_ids": np.array([e.ids for e in encodings], dtype="int64"),
+                "attention_mask": np.array([e.attention_mask for e in encodings], dtype="int64"),
+                "token_type_ids": np.array([e.type_ids for e in encodings], dtype="int64"),
+            }
+            hidden = self._session.run(None, {name: feed[name] for name in self._inputs})[0]
+            outputs.append(pool_embeddings(
+                hidden, feed["attention_mask"], self.meta["pooling"], self.meta["normalize"]
+            ))
+        if not outputs:
+            return np.zeros((0, self.get_sentence_embedding_dimension()), dtype="float32")
+        return np.concatenate(outputs)
+
+
+def export_onnx(model_name: str, path: Path, quantize: bool = True) -> Path:
+    """Export a SentenceTransformer model to an ONNX directory usable by `OnnxEncoder`
+
+    Needs torch and sentence-transformers (once, at export time). With
+    `quantize`, an int8 copy with dynamically quantized weights is written
+    next to the float32 model.
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+    from sentence_transformers.models import Normalize, Pooling
+
+    model = SentenceTransformer(model_name, device="cpu")
+    transformer, hf_tokenizer = model[0].auto_model.eval(), model[0].tokenizer
+    pooling = next((m for m in model if isinstance(m, Pooling)), None)
+    pooling_mode = pooling.get_pooling_mode_str() if pooling is not None else "mean"
+    if pooling_mode not in POOLING_MODES:
+        raise ValueError(f"不支持的池化方式: {pooling_mode}")
+
+    dummy = hf_tokenizer(["hello world"], return_tensors="pt")
+    input_names = [name for name in _INPUT_NAMES if name in dummy]
+
+    class HiddenStates(torch.nn.Module):
+        """Return only the last hidden state so the graph has one output"""
+
+        def __init__(self):
+            super().__init__()
+            self.model = transformer
+
+        def forward(self, *inputs):
+            return self.model(**dict(zip(input_names, inputs)))[0]
+
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    axes = {name: {0: "batch", 1: "tokens"} for name in input_names + ["last_hidden_state"]}
+    with torch.no_grad():
+        torch.onnx.export(
+            HiddenStates(), tuple(dummy[name] for name in input_names), str(path / ONNX_MODEL_FILE),
+            input_names=input_names, output_names=["last_hidden_state"],
+            dynamic_axes=axes, opset_version=14,
+        )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        hf_tokenizer.save_pretrained(tmp)
+        shutil.copy(Path(tmp) / ONNX_TOKENIZER_FILE, path / ONNX_TOKENIZER_FILE)
+
+    meta = {
+        "model_name": model_name,
+        "dimension": model.get_sentence_embedding_dimension(),
+        "max_seq_length": model.max_seq_length,
+        "pooling": pooling_mode,
+        "normalize": any(isinstance(m, Normalize) for m in model),
+        "pad_id": hf_tokenizer.pad_token_id,
+        "pad_token": hf_tokenizer.pad_token,
+    }
+    with open(path / ONNX_META_FILE, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(str(path / ONNX_MODEL_FILE), str(path / ONNX_INT8_MODEL_FILE),
+                         weight_type=QuantType.QInt8)
+    return path
+
+
+def cross_check(reference, candidate, texts: Optional[List[str]] = None) -> Dict[str, float]:
+    """Compare two encoders on `texts`; returns the min / mean cosine similarity"""
+    texts = texts or CROSS_CHECK_TEXTS
+    a = np.asarray(reference.encode(texts), dtype="float32")
+    b = np.asarray(candidate.encode(texts), dtype="float32")
+    cosine = np.sum(a * b, axis=1) / np.clip(
+        np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1), 1e-12, None
+    )
+    return {"min_cosine": float(cosine.min()), "mean_cosine": float(cosine.mean())}
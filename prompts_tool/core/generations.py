@@ -0,0 +1,198 @@
+"""Generation module - versioned index directories published through an atomic pointer
+
+Every index update is written into a fresh `gen-NNNNNN` directory (files
+of the previous generation are hard-linked in, so incremental updates do
+not copy unchanged data), fsynced, and published by atomically replacing
+the `CURRENT` file. Readers always see either the old or the new
+generation, and a crash mid-build leaves the published one untouched.
+
+Readers hold a shared `flock` on the generation's `.lock` file while they
+use it; an old generation is deleted once an exclusive lock succeeds,
+i.e. when no process holds it any more.
+"""
+
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Callable, IO, Optional
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+CURRENT_FILE = "CURRENT"
+GENERATION_PREFIX = "gen-"
+LOCK_FILE = ".lock"
+
+# 没有锁文件的目录（创建后立即崩溃）超过该时间后回收
+ORPHAN_SECONDS = 3600
+
+
+def fsync_directory(path: Path) -> None:
+    """Persist directory entries (renames, new files); no-op where unsupported"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class GenerationStore:
+    """Generation directories of one index, with a read lease on one of them"""
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        # 当前持有共享锁的代（读取中）和正在构建的代
+        self.leased: Optional[Path] = None
+        self._lease: Optional[IO] = None
+        self._building: Optional[IO] = None
+
+    def current(self) -> Optional[Path]:
+        """Get the published generation directory, or None"""
+        try:
+            name = (self.directory / CURRENT_FILE).read_text(encoding="utf-8").strip()
+        except OSError:
+            return None
+        path = self.directory / name
+        if not name.startswith(GENERATION_PREFIX) or not path.is_dir():
+            return None
+        return path
+
+    def acquire(self) -> Optional[Path]:
+        """Lease the published generation for reading and return its directory"""
+        for _ in range(3):
+            path = self.current()
+            if path is None:
+                return None
+            if path == self.leased:
+                return path
+            lock = self._lock(path, exclusive=False, blocking=True)
+            if lock is None:
+                # 读取指针后该代已被回收，重新读取
+                continue
+            self.release()
+            self._lease, self.leased = lock, path
+            return path
+        return None
+
+    def release(self) -> None:
+        """Drop the read lease"""
+        if self._lease is not None:
+            self._lease.close()
+        self._lease, self.leased = None, None
+
+    def begin(self, source: Optional[Path] = None,
+              include: Optional[Callable[[str], bool]] = None) -> Path:
+        """Create a new generation directory, hard-linking the files of `source`
+
+        Only files accepted by `include` are carried over. Files must be
+        replaced (write + rename) rather than modified in place, except
+        for appends that readers of the old generation never look at.
+        """
+        number = self._latest_number() + 1
+        while True:
+            path = self.directory / f"{GENERATION_PREFIX}{number:06d}"
+            try:
+                path.mkdir(parents=True)
+                break
+            except FileExistsError:
+                number += 1
+        (path / LOCK_FILE).touch()
+        self._building = self._lock(path, exclusive=False, blocking=True)
+
+        if source is not None:
+            for entry in source.iterdir():
+                if entry.name == LOCK_FILE or not entry.is_file():
+                    continue
+                if include is not None and not include(entry.name):
+                    continue
+                try:
+                    os.link(entry, path / entry.name)
+                except OSError:
+                    shutil.copy2(entry, path / entry.name)
+        return path
+
+    def publish(self, path: Path) -> None:
+        """fsync a built generation, point CURRENT at it and collect old generations"""
+        for entry in path.iterdir():
+            if entry.is_file():
+                with open(entry, "rb") as f:
+                    os.fsync(f.fileno())
+        fsync_directory(path)
+
+        tmp_path = self.directory / (CURRENT_FILE + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(path.name)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.directory / CURRENT_FILE)
+        fsync_directory(self.directory)
+
+        # 构建时持有的锁转为新代的读取租约
+        self.release()
+        self._lease, self.leased, self._building = self._building, path, None
+        self.collect()
+
+    def abort(self, path: Path) -> None:
+        """Discard an unpublished generation"""
+        if self._building is not None:
+            self._building.close()
+            self._building = None
+        shutil.rmtree(path, ignore_errors=True)
+
+    def collect(self) -> int:
+        """Delete generations that are neither published nor held by any process"""
+        current = self.current()
+        removed = 0
+        for path in self.directory.glob(GENERATION_PREFIX + "*"):
+            if path in (current, self.leased) or not path.is_dir():
+                continue
+            if not (path / LOCK_FILE).exists():
+                if time.time() - path.stat().st_mtime > ORPHAN_SECONDS:
+                    shutil.rmtree(path, ignore_errors=True)
+                    removed += 1
+                continue
+            lock = self._lock(path, exclusive=True, blocking=False)
+            if lock is None:
+                continue
+            with lock:
+                shutil.rmtree(path, ignore_errors=True)
+            removed += 1
+        return removed
+
+    def _latest_number(self) -> int:
+        numbers = [
+            int(path.name[len(GENERATION_PREFIX):])
+            for path in self.directory.glob(GENERATION_PREFIX + "*")
+            if path.name[len(GENERATION_PREFIX):].isdigit()
+        ]
+        return max(numbers, default=0)
+
+    @staticmethod
+    def _lock(path: Path, exclusive: bool, blocking: bool) -> Optional[IO]:
+        """Lock a generation's lock file; None if it is gone or (non-blocking) busy"""
+        try:
+            lock = open(path / LOCK_FILE, "rb")
+        except OSError:
+            return None
+        if fcntl is not None:
+            flags = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+            if not blocking:
+                flags |= fcntl.LOCK_NB
+            try:
+                fcntl.flock(lock.fileno(), flags)
+            except OSError:
+                lock.close()
+                return None
+        # 等待期间该代可能已被回收
+        if not (path / LOCK_FILE).exists():
+            lock.close()
+            return None
+        return lock
@@ -0,0 +1,267 @@
+"""Keyword search module - persisted BM25 inverted index"""
+
+import heapq
+import math
+import sqlite3
+from collections import Counter
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Set, Tuple, Iterable
+
+from .tokenizer import Tokenizer
+
+# 索引格式变化时递增，旧索引会被自动清空重建
+KEYWORD_INDEX_VERSION = 2
+
+# BM25 参数
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# 出现在超过该比例文档中的词几乎不影响排序（idf 接近 0），查询时跳过；
+# 倒排列表短于 MIN_SKIPPED_DF 的词读取成本很低，总是参与打分
+MAX_DF_RATIO = 0.1
+MIN_SKIPPED_DF = 1000
+# 每个查询最多读取的词数，按文档频率从低到高选取
+MAX_QUERY_TERMS = 32
+
+
+class KeywordIndex:
+    """BM25 inverted index stored in SQLite
+
+    Postings (term -> document, term frequency, document length) and
+    document frequencies are persisted, so only added or changed documents need
+    to be tokenized and a query only reads the postings of its own, rarest
+    terms.
+    """
+
+    def __init__(self, db_path: Path, tokenizer: Optional[Tokenizer] = None):
+        self.db_path = Path(db_path)
+        self.tokenizer = tokenizer or Tokenizer()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = self._open()
+        return self._conn
+
+    def _open(self) -> sqlite3.Connection:
+        """打开数据库，必要时创建表结构"""
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # 混合搜索在工作线程中查询；调用方保证同一时刻只有一个线程使用连接
+        conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        # 较大的页缓存显著加快批量写入倒排表
+        conn.execute("PRAGMA cache_size=-65536")
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)"
+            )
+            meta = dict(conn.execute(
+                "SELECT key, value FROM meta WHERE key IN ('version', 'tokenizer')"
+            ))
+            expected = {
+                "version": str(KEYWORD_INDEX_VERSION),
+                "tokenizer": self.tokenizer.name,
+            }
+            if meta != expected:
+                # 格式或分词方式变化，清空后由下一次刷新重新建立
+                conn.execute("DROP TABLE IF EXISTS postings")
+                conn.execute("DROP TABLE IF EXISTS docs")
+                conn.execute("DROP TABLE IF EXISTS terms")
+                conn.execute("DELETE FROM meta")
+                conn.executemany(
+                    "INSERT INTO meta (key, value) VALUES (?, ?)",
+                    expected.items(),
+                )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS docs ("
+                " id INTEGER PRIMARY KEY,"
+                " path TEXT UNIQUE NOT NULL,"
+                " sha256 TEXT NOT NULL,"
+                " length INTEGER NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS postings ("
+                " term TEXT NOT NULL,"
+                " doc_id INTEGER NOT NULL,"
+                " tf INTEGER NOT NULL,"
+                " length INTEGER NOT NULL,"
+                " PRIMARY KEY (term, doc_id)) WITHOUT ROWID"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc_id)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS terms ("
+                " term TEXT PRIMARY KEY,"
+                " df INTEGER NOT NULL) WITHOUT ROWID"
+            )
+        return conn
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def get_document_hashes(self) -> Dict[str, str]:
+        """Get the content hash of every indexed document, keyed by path"""
+        return dict(self.conn.execute("SELECT path, sha256 FROM docs"))
+
+    def update(self, documents: Iterable[Tuple[str, str, List[str]]],
+               removed: Iterable[str] = ()) -> int:
+        """Add or replace documents and drop removed ones in one transaction
+
+        `documents` yields (path, sha256, tokens) tuples. Returns the number
+        of documents written.
+        """
+        written = 0
+        deleted = False
+        with self.conn as conn:
+            for path in removed:
+                deleted |= self._delete(conn, path)
+
+            for path, sha256, tokens in documents:
+                deleted |= self._delete(conn, path)
+                cursor = conn.execute(
+                    "INSERT INTO docs (path, sha256, length) VALUES (?, ?, ?)",
+                    (path, sha256, len(tokens)),
+                )
+                doc_id = cursor.lastrowid
+                counts = Counter(tokens)
+                conn.executemany(
+                    "INSERT INTO postings (term, doc_id, tf, length) VALUES (?, ?, ?, ?)",
+                    ((term, doc_id, tf, len(tokens)) for term, tf in counts.items()),
+                )
+                conn.executemany(
+                    "INSERT INTO terms (term, df) VALUES (?, 1)"
+                    " ON CONFLICT (term) DO UPDATE SET df = df + 1",
+                    ((term,) for term in counts),
+                )
+                written += 1
+
+            if deleted:
+                conn.execute("DELETE FROM terms WHERE df <= 0")
+
+            # 维护文档数和总长度，查询时无需扫描 docs 表
+            conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value)"
+                " SELECT 'doc_count', COUNT(*) FROM docs"
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value)"
+                " SELECT 'total_length', COALESCE(SUM(length), 0) FROM docs"
+            )
+        return written
+
+    def _corpus_stats(self) -> Tuple[int, int]:
+        """Get (document count, total token count)"""
+        meta = dict(self.conn.execute(
+            "SELECT key, value FROM meta WHERE key IN ('doc_count', 'total_length')"
+        ))
+        return int(meta.get("doc_count", 0)), int(meta.get("total_length", 0))
+
+    @staticmethod
+    def _delete(conn: sqlite3.Connection, path: str) -> bool:
+        row = conn.execute("SELECT id FROM docs WHERE path = ?", (path,)).fetchone()
+        if row is None:
+            return False
+        conn.execute(
+            "UPDATE terms SET df = df - 1"
+            " WHERE term IN (SELECT term FROM postings WHERE doc_id = ?)",
+            (row[0],),
+        )
+        conn.execute("DELETE FROM postings WHERE doc_id = ?", (row[0],))
+        conn.execute("DELETE FROM docs WHERE id = ?", (row[0],))
+        return True
+
+    def _query_terms(self, terms: List[str], doc_count: int) -> List[Tuple[str, int]]:
+        """Select the (term, df) pairs worth scoring, rarest first
+
+        Terms found in more than `MAX_DF_RATIO` (and at least
+        `MIN_SKIPPED_DF`) of the documents are skipped: their postings are
+        the longest and their idf is close to zero. If nothing else
+        matched, the rarest term is kept.
+        """
+        found = []
+        # 分批查询，避免超过 SQLite 的参数个数上限
+        for start in range(0, len(terms), 500):
+            batch = terms[start:start + 500]
+            found.extend(self.conn.execute(
+                f"SELECT term, df FROM terms WHERE term IN ({','.join('?' * len(batch))})",
+                batch,
+            ))
+        found.sort(key=lambda item: item[1])
+        limit = max(MAX_DF_RATIO * doc_count, MIN_SKIPPED_DF)
+        selected = [item for item in found if item[1] <= limit]
+        return (selected or found[:1])[:MAX_QUERY_TERMS]
+
+    def search(self, query: str, top_k: int = 5) -> List[Tuple[str, float]]:
+        """BM25 search returning the top-k (path, score) pairs"""
+        terms = list(set(self.tokenizer.tokenize(query)))
+        if not terms or top_k <= 0:
+            return []
+
+        conn = self.conn
+        doc_count, total_length = self._corpus_stats()
+        if doc_count == 0:
+            return []
+        avg_length = total_length / doc_count
+
+        scores: Dict[int, float] = {}
+        for term, df in self._query_terms(terms, doc_count):
+            idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+            # 倒排表中冗余存储文档长度，无需关联 docs 表；逐行读取，不把整个倒排列表载入内存
+            for doc_id, tf, length in conn.execute(
+                "SELECT doc_id, tf, length FROM postings WHERE term = ?", (term,)
+            ):
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+        # 堆选择 top-k，避免对全部命中排序
+        top = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+        results = []
+        for doc_id, score in top:
+            row = conn.execute("SELECT path FROM docs WHERE id = ?", (doc_id,)).fetchone()
+            if row is not None:
+                results.append((row[0], score))
+        return results
+
+    def substring_candidates(self, text: str) -> Optional[Set[str]]:
+        """Get the paths of the indexed documents that may contain `text`
+
+        Every other indexed document certainly does not contain it (see
+        `Tokenizer.substring_terms`). Returns None when `text` has no usable
+        token and nothing can be ruled out.
+        """
+        terms = set(self.tokenizer.substring_terms(text))
+        if not terms:
+            return None
+        conn = self.conn
+        doc_ids: Optional[Set[int]] = None
+        for term in sorted(terms, key=len, reverse=True):
+            # 包含该片段的词（词表扫描），再取出含这些词的文档
+            matches = {
+                row[0] for row in conn.execute(
+                    "SELECT DISTINCT p.doc_id FROM terms t"
+                    " JOIN postings p ON p.term = t.term WHERE instr(t.term, ?) > 0",
+                    (term,),
+                )
+            }
+            doc_ids = matches if doc_ids is None else doc_ids & matches
+            if not doc_ids:
+                return set()
+        return {path for path, doc_id in conn.execute("SELECT path, id FROM docs") if doc_id in doc_ids}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取索引统计信息"""
+        conn = self.conn
+        doc_count, total_length = self._corpus_stats()
+        term_count = conn.execute("SELECT COUNT(*) FROM terms").fetchone()[0]
+        return {
+            "documents": doc_count,
+            "terms": term_count,
+            "avg_length": total_length / doc_count if doc_count else 0.0,
+            "tokenizer": self.tokenizer.name,
+            "db_path": str(self.db_path),
+        }
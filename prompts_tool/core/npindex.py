@@ -0,0 +1,141 @@
+"""NumPy index module - exact inner-product search without FAISS
+
+`NumpyIndex` answers top-k queries with one matrix product plus
+`argpartition` over normalized vectors. It reads and writes the FAISS
+binary layout of an `IDMap,Flat` inner-product index, so the same
+`prompts.index` file works on hosts with and without the faiss wheel;
+the vector block is memory-mapped straight from the file.
+"""
+
+import os
+import struct
+from pathlib import Path
+from typing import Tuple, Optional
+
+import numpy as np
+
+# FAISS 序列化格式中的类型标识
+IDMAP_FOURCC = b"IxMp"
+FLAT_IP_FOURCC = b"IxFI"
+
+# 索引头：维度、向量数、两个保留字段、是否已训练、距离类型
+_HEADER = struct.Struct("<iqqqBi")
+_HEADER_DUMMY = 1 << 20
+_METRIC_INNER_PRODUCT = 0
+_COUNT = struct.Struct("<Q")
+
+# 每次矩阵乘法处理的查询数，限制得分矩阵的内存
+_QUERY_BLOCK = 64
+
+
+class UnsupportedIndexFormat(ValueError):
+    """The index file is not an IDMap,Flat inner-product index"""
+
+
+def normalize_L2(x: np.ndarray) -> None:
+    """Normalize rows of a float32 matrix in place (like `faiss.normalize_L2`)"""
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    np.divide(x, np.clip(norms, 1e-12, None), out=x)
+
+
+class NumpyIndex:
+    """Flat inner-product index over (vectors, ids) arrays
+
+    Implements the part of the FAISS index interface the searcher uses:
+    `d`, `ntotal`, `search`, `add_with_ids` and `remove_ids`. The arrays
+    may be read-only memory maps; use `copy` before mutating.
+    """
+
+    def __init__(self, d: int, vectors: Optional[np.ndarray] = None,
+                 ids: Optional[np.ndarray] = None):
+        self.d = d
+        self.vectors = vectors if vectors is not None else np.zeros((0, d), dtype="float32")
+        self.ids = ids if ids is not None else np.zeros(0, dtype="int64")
+
+    @property
+    def ntotal(self) -> int:
+        return len(self.ids)
+
+    def copy(self) -> "NumpyIndex":
+        """Get an in-memory, writable copy"""
+        return NumpyIndex(self.d, np.array(self.vectors, dtype="float32"), np.array(self.ids, dtype="int64"))
+
+    def add_with_ids(self, vectors: np.ndarray, ids: np.ndarray) -> None:
+        self.vectors = np.concatenate([self.vectors, np.asarray(vectors, dtype="float32")])
+        self.ids = np.concatenate([self.ids, np.asarray(ids, dtype="int64")])
+
+    def remove_ids(self, ids: np.ndarray) -> int:
+        keep = ~np.isin(self.ids, np.asarray(ids, dtype="int64"))
+        removed = int(len(keep) - keep.sum())
+        self.vectors, self.ids = self.vectors[keep], self.ids[keep]
+        return removed
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Get (scores, ids) of the top-k vectors per query, padded with -1 like FAISS"""
+        queries = np.asarray(queries, dtype="float32")
+        scores = np.full((len(queries), k), -np.finfo("float32").max, dtype="float32")
+        labels = np.full((len(queries), k), -1, dtype="int64")
+        n = min(k, self.ntotal)
+        if n == 0:
+            return scores, labels
+
+        for start in range(0, len(queries), _QUERY_BLOCK):
+            block = self.vectors @ queries[start:start + _QUERY_BLOCK].T  # (ntotal, q)
+            if n < self.ntotal:
+                top = np.argpartition(-block, n - 1, axis=0)[:n]
+            else:
+                top = np.broadcast_to(np.arange(self.ntotal)[:, None], block.shape)
+            top_scores = np.take_along_axis(block, top, axis=0)
+            order = np.argsort(-top_scores, axis=0, kind="stable")
+            rows = slice(start, start + block.shape[1])
+            scores[rows, :n] = np.take_along_axis(top_scores, order, axis=0).T
+            labels[rows, :n] = self.ids[np.take_along_axis(top, order, axis=0)].T
+        return scores, labels
+
+
+def write_index(index: NumpyIndex, path: Path) -> None:
+    """Write `index` in the FAISS `IDMap,Flat` (inner product) layout"""
+    header = _HEADER.pack(index.d, index.ntotal, _HEADER_DUMMY, _HEADER_DUMMY, 1, _METRIC_INNER_PRODUCT)
+    with open(path, "wb") as f:
+        f.write(IDMAP_FOURCC + header)
+        f.write(FLAT_IP_FOURCC + header)
+        f.write(_COUNT.pack(index.ntotal * index.d))
+        f.write(np.ascontiguousarray(index.vectors, dtype="<f4").tobytes())
+        f.write(_COUNT.pack(index.ntotal))
+        f.write(np.ascontiguousarray(index.ids, dtype="<i8").tobytes())
+
+
+def read_index(path: Path, mmap: bool = True) -> NumpyIndex:
+    """Read a FAISS `IDMap,Flat` inner-product index file
+
+    With `mmap`, the vectors and ids are read-only memory maps of the file.
+    Raises `UnsupportedIndexFormat` for any other index structure.
+    """
+    path = Path(path)
+    head_size = 4 + _HEADER.size
+    with open(path, "rb") as f:
+        outer = f.read(head_size)
+        inner = f.read(head_size)
+        count = f.read(_COUNT.size)
+    if len(count) < _COUNT.size or outer[:4] != IDMAP_FOURCC or inner[:4] != FLAT_IP_FOURCC:
+        raise UnsupportedIndexFormat(f"不是 IDMap,Flat 索引: {path}")
+    d, ntotal, _, _, _, metric = _HEADER.unpack(inner[4:])
+    if metric != _METRIC_INNER_PRODUCT or _COUNT.unpack(count)[0] != ntotal * d:
+        raise UnsupportedIndexFormat(f"不支持的 flat 索引: {path}")
+
+    vectors_offset = 2 * head_size + _COUNT.size
+    ids_offset = vectors_offset + ntotal * d * 4 + _COUNT.size
+    if os.path.getsize(path) != ids_offset + ntotal * 8:
+        raise UnsupportedIndexFormat(f"索引文件长度不符: {path}")
+    if ntotal == 0:
+        return NumpyIndex(d)
+    if mmap:
+        vectors = np.memmap(path, dtype="<f4", mode="r", offset=vectors_offset, shape=(ntotal, d))
+        ids = np.memmap(path, dtype="<i8", mode="r", offset=ids_offset, shape=(ntotal,))
+    else:
+        with open(path, "rb") as f:
+            f.seek(vectors_offset)
+            vectors = np.frombuffer(f.read(ntotal * d * 4), dtype="<f4").reshape(ntotal, d).copy()
+            f.seek(ids_offset)
+            ids = np.frombuffer(f.read(ntotal * 8), dtype="<i8").copy()
+    return NumpyIndex(d, vectors, ids)
@@ -0,0 +1,130 @@
+"""Projection module - reduce embedding dimensions before indexing
+
+"pca" learns a PCA basis from the document embeddings at build time;
+"truncate" keeps the leading dimensions, which is what Matryoshka-trained
+models are designed for. Projected vectors are re-normalized so inner
+product stays cosine similarity. The projection is saved with the index
+and applied to both documents and queries.
+
+A PCA basis learned from a small corpus is refit (by rebuilding the
+shard) once the corpus has doubled, until it was fit on enough vectors.
+"""
+
+import os
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+import numpy as np
+
+REDUCTION_METHODS = ("none", "pca", "truncate")
+
+PROJECTION_FILE = "projection.npz"
+
+# 拟合 PCA 使用的最大样本数
+_PCA_SAMPLE = 65536
+
+# 向量数增长到拟合时的该倍数后重新拟合 PCA
+REFIT_GROWTH = 2
+
+# 拟合样本数达到目标维度的该倍数后不再重新拟合
+REFIT_SAMPLES_PER_DIM = 10
+
+
+class Projection:
+    """Linear map from model dimensions to index dimensions
+
+    For PCA, vectors are centered with `mean` and multiplied by
+    `components` (input_dim × dim). Truncation keeps the first `dim`
+    coordinates. With fewer training vectors than `dim`, the missing PCA
+    components are zero so the output dimension stays fixed; `fit_count`
+    records the number of training vectors so the basis can be refit.
+    """
+
+    def __init__(self, method: str, input_dim: int, dim: int,
+                 mean: Optional[np.ndarray] = None, components: Optional[np.ndarray] = None,
+                 fit_count: int = 0):
+        self.method = method
+        self.input_dim = input_dim
+        self.dim = dim
+        self.mean = mean
+        self.components = components
+        self.fit_count = fit_count
+
+    @classmethod
+    def fit(cls, method: str, vectors: np.ndarray, dim: int) -> "Projection":
+        """Create a projection to `dim` dimensions (learning PCA from `vectors`)"""
+        input_dim = vectors.shape[1]
+        dim = min(dim, input_dim)
+        if method == "truncate":
+            return cls(method, input_dim, dim)
+
+        fit_count = len(vectors)
+        if len(vectors) > _PCA_SAMPLE:
+            rng = np.random.default_rng(0)
+            vectors = vectors[np.sort(rng.choice(len(vectors), _PCA_SAMPLE, replace=False))]
+        vectors = np.asarray(vectors, dtype="float64")
+        mean = vectors.mean(axis=0)
+        # 右奇异向量按方差从大到小排列
+        _, _, vt = np.linalg.svd(vectors - mean, full_matrices=False)
+        components = np.zeros((input_dim, dim), dtype="float32")
+        kept = min(dim, len(vt))
+        components[:, :kept] = vt[:kept].T
+        return cls(method, input_dim, dim, mean.astype("float32"), components, fit_count)
+
+    def needs_refit(self, ntotal: int) -> bool:
+        """Check whether a PCA basis fit on few vectors should be relearned for `ntotal` vectors"""
+        if self.method != "pca":
+            return False
+        if self.fit_count >= min(REFIT_SAMPLES_PER_DIM * self.dim, _PCA_SAMPLE):
+            return False
+        return ntotal >= REFIT_GROWTH * max(self.fit_count, 1)
+
+    def apply(self, vectors: np.ndarray) -> np.ndarray:
+        """Project and re-normalize (batch × input_dim) vectors"""
+        if self.method == "truncate":
+            projected = np.array(vectors[:, :self.dim], dtype="float32")
+        else:
+            projected = (np.asarray(vectors, dtype="float32") - self.mean) @ self.components
+        norms = np.linalg.norm(projected, axis=1, keepdims=True)
+        return np.ascontiguousarray(projected / np.clip(norms, 1e-12, None), dtype="float32")
+
+    def explained_variance(self, vectors: np.ndarray) -> float:
+        """Get the fraction of the variance of `vectors` kept by the projection"""
+        centered = np.asarray(vectors, dtype="float32") - vectors.mean(axis=0)
+        total = float((centered ** 2).sum())
+        if self.method == "truncate":
+            kept = float((centered[:, :self.dim] ** 2).sum())
+        else:
+            kept = float(((centered @ self.components) ** 2).sum())
+        return kept / total if total > 0 else 1.0
+
+    def describe(self) -> Dict[str, Any]:
+        """Get the settings recorded in the index manifest"""
+        return {"method": self.method, "input_dim": self.input_dim, "dim": self.dim}
+
+    def save(self, path: Path) -> None:
+        """Write the projection (atomic replace)"""
+        arrays = {"method": np.array(self.method), "input_dim": np.array(self.input_dim),
+                  "dim": np.array(self.dim)}
+        if self.method == "pca":
+            arrays.update(mean=self.mean, components=self.components,
+                          fit_count=np.array(self.fit_count))
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["Projection"]:
+        """Read a saved projection; returns None if the file is missing or invalid"""
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                method = str(data["method"])
+                if method == "pca":
+                    # 旧版本未记录拟合样本数，按 0 处理（下次同步时重新拟合）
+                    fit_count = int(data["fit_count"]) if "fit_count" in data else 0
+                    return cls(method, int(data["input_dim"]), int(data["dim"]),
+                               data["mean"], data["components"], fit_count)
+                return cls(method, int(data["input_dim"]), int(data["dim"]))
+        except (OSError, KeyError, ValueError):
+            return None
@@ -0,0 +1,139 @@
+"""Query cache module - LRU cache of query embeddings, optionally persisted"""
+
+import os
+import threading
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+import numpy as np
+
+
+def normalize_query(query: str) -> str:
+    """Normalize query text so trivially different spellings share an entry"""
+    return " ".join(unicodedata.normalize("NFKC", query).casefold().split())
+
+
+class QueryCache:
+    """Bounded LRU map from normalized query text to its embedding
+
+    Entries belong to one model. With a `path`, the cache is loaded from
+    and saved to a small `.npz` file so hits survive process restarts; a
+    file written for another model is ignored. New entries are written
+    `save_delay` seconds after the first unsaved one (`schedule_save`), so
+    a burst of queries costs one write; `flush` writes them immediately.
+    """
+
+    def __init__(self, model_name: str, max_entries: int = 1000, path: Optional[Path] = None,
+                 save_delay: float = 5.0):
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.path = Path(path) if path else None
+        self.save_delay = save_delay
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._dirty = False
+        self._loaded = False
+        # 延迟保存的定时器在后台线程中写文件，与查询线程互斥
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def load(self) -> None:
+        """加载持久化的缓存文件（只加载一次）"""
+        self._loaded = True
+        if self.path is None or not self.path.exists():
+            return
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                if str(data["model_name"]) != self.model_name:
+                    return
+                for text, vector in zip(data["queries"], data["vectors"]):
+                    self._entries[str(text)] = vector
+        except (OSError, KeyError, ValueError) as e:
+            print(f"警告: 无法加载查询缓存 {self.path}: {e}")
+            self._entries.clear()
+            return
+        self._trim()
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """Look up a normalized query, counting the hit or miss"""
+        with self._lock:
+            if not self._loaded:
+                self.load()
+            vector = self._entries.get(key)
+            if vector is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return vector
+
+    def put(self, key: str, vector: np.ndarray) -> None:
+        with self._lock:
+            self._entries[key] = np.asarray(vector, dtype="float32")
+            self._entries.move_to_end(key)
+            self._trim()
+            self._dirty = True
+
+    def _trim(self) -> None:
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def schedule_save(self) -> None:
+        """Save unsaved entries after `save_delay` seconds, unless a save is already pending"""
+        if self.path is None or not self._dirty:
+            return
+        if self.save_delay <= 0:
+            self.save()
+            return
+        with self._lock:
+            if self._timer is not None and self._timer.is_alive():
+                return
+            self._timer = threading.Timer(self.save_delay, self.save)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self) -> None:
+        """Cancel a pending delayed save and write unsaved entries now"""
+        timer = self._timer
+        if timer is not None:
+            timer.cancel()
+        self.save()
+
+    def save(self) -> None:
+        """Write the cache file if entries changed (atomic replace)"""
+        with self._lock:
+            if self.path is None or not self._dirty or not self._entries:
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            try:
+                with open(tmp_path, "wb") as f:
+                    np.savez(
+                        f,
+                        model_name=np.array(self.model_name),
+                        queries=np.array(list(self._entries)),
+                        vectors=np.stack(list(self._entries.values())),
+                    )
+                os.replace(tmp_path, self.path)
+                self._dirty = False
+            except OSError as e:
+                print(f"警告: 无法保存查询缓存 {self.path}: {e}")
+                tmp_path.unlink(missing_ok=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "persistent": self.path is not None,
+        }
@@ -3,9 +3,42 @@
 import os
 import subprocess
 import shutil
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Tuple
 from .config import Config
+from .catalog import CatalogEntry, PromptCatalog, PREVIEW_MAX_LINES
+from .walker import walk_prompt_files
+from .keyword import KeywordIndex
+from .tokenizer import Tokenizer
+
+
+@dataclass
+class LoadStats:
+    """Throughput statistics for a content loading run"""
+    files: int = 0
+    bytes: int = 0
+    elapsed: float = 0.0
+    workers: int = 1
+
+    @property
+    def files_per_sec(self) -> float:
+        return self.files / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def bytes_per_sec(self) -> float:
+        return self.bytes / self.elapsed if self.elapsed > 0 else 0.0
+
+    def summary(self) -> str:
+        """格式化的吞吐量摘要"""
+        return (
+            f"{self.files} 个文件, {self.bytes / 1024 / 1024:.1f} MB, "
+            f"{self.elapsed:.2f}s ({self.files_per_sec:.0f} files/s, "
+            f"{self.bytes_per_sec / 1024 / 1024:.1f} MB/s, {self.workers} 线程)"
+        )
 
 
 class PromptRepo:
@@ -16,6 +49,13 @@ class PromptRepo:
         self.repo_paths = config.get_repo_paths()
         self.repo_path = config.get_repo_path()
         self.index_path = config.get_index_path()
+        self.catalog = PromptCatalog(config.get_catalog_path())
+        self.last_load_stats = LoadStats()
+        self.keyword_index = KeywordIndex(
+            config.get_keyword_index_path(), Tokenizer(config.keyword.segmenter)
+        )
+        # 关键词索引最近一次与文件同步的时间（time.monotonic），None 表示尚未同步
+        self.keyword_synced_at: Optional[float] = None
     
     def exists(self) -> bool:
         """Check if any local repository exists"""
@@ -100,33 +140,97 @@ class PromptRepo:
             print("📁 本地仓库不存在，正在克隆...")
             return self.clone()
     
-    def get_prompt_files(self, extensions: Optional[List[str]] = None) -> List[Path]:
+    def get_prompt_files(self, extensions: Optional[List[str]] = None,
+                         max_depth: Optional[int] = None) -> List[Path]:
         """Get all prompt files from configured paths"""
+        files_by_path = self.get_prompt_files_by_path(extensions, max_depth)
+        return sorted(f for files in files_by_path.values() for f in files)
+
+    def get_prompt_files_by_path(self, extensions: Optional[List[str]] = None,
+                                 max_depth: Optional[int] = None) -> Dict[Path, List[Path]]:
+        """Get the prompt files of each configured path (each file under its first path)"""
         if extensions is None:
             extensions = [".txt", ".md", ".prompt"]
+        if max_depth is None:
+            max_depth = self.config.repo.max_depth
 
-        prompt_files: List[Path] = []
+        # 每个根目录只遍历一次，同时匹配所有扩展名
+        files_by_path: Dict[Path, List[Path]] = {}
+        seen = set()
         for repo_path in self.repo_paths:
-            if not repo_path.exists():
+            if repo_path in files_by_path or not repo_path.is_dir():
                 continue
-            for ext in extensions:
-                prompt_files.extend(repo_path.rglob(f"*{ext}"))
-
-        prompt_files = [
-            f for f in prompt_files
-            if not f.name.startswith(".") and ".git" not in f.parts
-        ]
+            files = [f for f in walk_prompt_files(repo_path, extensions, max_depth) if f not in seen]
+            seen.update(files)
+            files_by_path[repo_path] = sorted(files)
 
-        return sorted(prompt_files)
+        return files_by_path
     
     def get_prompt_content(self, file_path: Path) -> str:
         """获取 Prompt 文件内容"""
+        return self._read_prompt_file(file_path)[0]
+
+    def _read_prompt_file(self, file_path: Path) -> Tuple[str, int]:
+        """Read a prompt file, returning its content and size in bytes"""
         try:
             with open(file_path, "r", encoding="utf-8") as f:
-                return f.read()
+                content = f.read()
+                return content, os.fstat(f.fileno()).st_size
         except Exception as e:
             print(f"警告: 无法读取文件 {file_path}: {e}")
-            return ""
+            return "", 0
+
+    def iter_prompt_contents(self, files: Iterable[Path],
+                             workers: Optional[int] = None) -> Iterator[Tuple[Path, str]]:
+        """Stream (path, content) pairs in input order, reading on a thread pool
+
+        At most `workers * 4` reads are in flight at once, so memory stays
+        bounded for large repositories. Unreadable files yield empty content,
+        as with `get_prompt_content`. Throughput is recorded in
+        `last_load_stats`.
+        """
+        if workers is None:
+            workers = self.config.repo.load_workers
+        workers = max(1, workers)
+
+        stats = LoadStats(workers=workers)
+        self.last_load_stats = stats
+        start = time.perf_counter()
+
+        try:
+            if workers == 1:
+                for file_path in files:
+                    content, size = self._read_prompt_file(file_path)
+                    stats.files += 1
+                    stats.bytes += size
+                    yield file_path, content
+                return
+
+            file_iter = iter(files)
+            pending: deque = deque()
+            with ThreadPoolExecutor(max_workers=workers,
+                                    thread_name_prefix="prompt-loader") as pool:
+                try:
+                    for file_path in file_iter:
+                        pending.append((file_path, pool.submit(self._read_prompt_file, file_path)))
+                        if len(pending) >= workers * 4:
+                            break
+
+                    while pending:
+                        file_path, future = pending.popleft()
+                        content, size = future.result()
+                        next_path = next(file_iter, None)
+                        if next_path is not None:
+                            pending.append((next_path, pool.submit(self._read_prompt_file, next_path)))
+                        stats.files += 1
+                        stats.bytes += size
+                        yield file_path, content
+                finally:
+                    # 调用方提前停止迭代时取消尚未开始的读取
+                    for _, future in pending:
+                        future.cancel()
+        finally:
+            stats.elapsed = time.perf_counter() - start
     
     def get_prompt_summary(self, file_path: Path, max_lines: int = 3) -> str:
         """获取 Prompt 文件摘要（前几行）"""
@@ -146,46 +250,149 @@ class PromptRepo:
     def list_prompts(self, preview_lines: Optional[int] = None, 
                      filter_keyword: Optional[str] = None) -> List[Dict[str, Any]]:
         """列出所有 Prompt 文件"""
-        if not self.exists():
+        prompt_files = self.get_prompt_files()
+
+        if not prompt_files:
             print("❌ 本地仓库不存在，请先运行 `prompts --update`")
             return []
 
-        prompt_files = self.get_prompt_files()
-        
+        # 通过目录缓存获取摘要，只有 stat 签名变化的文件才会被重新读取
+        entries = self.catalog.refresh(prompt_files)
+        self.catalog.save()
+        listing = list(zip(prompt_files, entries))
+
         if filter_keyword:
-            prompt_files = [
-                f for f in prompt_files 
-                if filter_keyword.lower() in f.name.lower() or 
-                   filter_keyword.lower() in self.get_prompt_content(f).lower()
+            keyword = filter_keyword.lower()
+            name_matches = {f for f, _ in listing if keyword in f.name.lower()}
+            to_scan = [(f, entry) for f, entry in listing if f not in name_matches]
+            to_scan = [f for f, _ in self._rule_out_by_keyword_index(filter_keyword, to_scan)]
+            content_matches = {
+                f for f, content in self.iter_prompt_contents(to_scan)
+                if keyword in content.lower()
+            }
+            listing = [
+                (f, entry) for f, entry in listing
+                if f in name_matches or f in content_matches
             ]
-        
+
         results = []
-        for file_path in prompt_files:
-            relative_path = file_path
-            for repo_path in self.repo_paths:
-                try:
-                    relative_path = file_path.relative_to(repo_path)
-                    break
-                except ValueError:
-                    continue
-            
+        for file_path, entry in listing:
             result = {
                 "file_path": file_path,
-                "relative_path": str(relative_path),
+                "relative_path": self.get_relative_path(file_path),
                 "name": file_path.name,
-                "summary": self.get_prompt_summary(file_path, 1)
             }
-            
+
+            if entry is not None:
+                result["summary"] = entry.summary
+                result["variables"] = entry.variables
+            else:
+                result["summary"] = self.get_prompt_summary(file_path, 1)
+
             if preview_lines:
-                result["preview"] = self.get_prompt_summary(file_path, preview_lines)
+                if entry is not None and preview_lines <= PREVIEW_MAX_LINES:
+                    result["preview"] = entry.preview(preview_lines)
+                else:
+                    result["preview"] = self.get_prompt_summary(file_path, preview_lines)
             
             results.append(result)
         
         return results
+
+    def _rule_out_by_keyword_index(self, text: str,
+                                   listing: List[Tuple[Path, Optional[CatalogEntry]]]
+                                   ) -> List[Tuple[Path, Optional[CatalogEntry]]]:
+        """Drop files the keyword index shows cannot contain `text`
+
+        Only files indexed with their current content hash are ruled out;
+        the rest (and the remaining candidates) still have to be read.
+        """
+        if not self.keyword_index.db_path.exists():
+            return listing
+        candidates = self.keyword_index.substring_candidates(text)
+        if candidates is None:
+            return listing
+        indexed = self.keyword_index.get_document_hashes()
+        return [
+            (f, entry) for f, entry in listing
+            if entry is None or indexed.get(str(f)) != entry.sha256 or str(f) in candidates
+        ]
+
+    def get_relative_path(self, file_path: Path) -> str:
+        """Get a file path relative to the configured path that contains it"""
+        for repo_path in self.repo_paths:
+            try:
+                return str(file_path.relative_to(repo_path))
+            except ValueError:
+                continue
+        return str(file_path)
     
+    def refresh_keyword_index(self, prompt_files: Optional[List[Path]] = None,
+                              entries: Optional[List[Optional[CatalogEntry]]] = None) -> Dict[str, int]:
+        """Bring the BM25 keyword index in sync with the prompt files
+
+        Content hashes come from the catalog, so only added or changed files
+        are read and tokenized. Callers that just refreshed the catalog can
+        pass the files and entries to skip a second scan.
+        """
+        if prompt_files is None or entries is None:
+            prompt_files = self.get_prompt_files()
+            entries = self.catalog.refresh(prompt_files)
+            self.catalog.save()
+        self.keyword_synced_at = time.monotonic()
+
+        indexed = self.keyword_index.get_document_hashes()
+        current = {
+            str(f): entry.sha256
+            for f, entry in zip(prompt_files, entries) if entry is not None
+        }
+        changed = [
+            f for f in prompt_files
+            if str(f) in current and indexed.get(str(f)) != current[str(f)]
+        ]
+        removed = [path for path in indexed if path not in current]
+
+        if not changed and not removed:
+            return {"updated": 0, "removed": 0}
+
+        def documents():
+            for file_path, content in self.iter_prompt_contents(changed):
+                yield str(file_path), current[str(file_path)], self._keyword_tokens(file_path, content)
+
+        updated = self.keyword_index.update(documents(), removed)
+        return {"updated": updated, "removed": len(removed)}
+
+    def _keyword_tokens(self, file_path: Path, content: str) -> List[str]:
+        """Tokens indexed for a prompt: content, relative path and name (boosted)"""
+        tokenize = self.keyword_index.tokenizer.tokenize
+        return (
+            tokenize(content)
+            + tokenize(self.get_relative_path(file_path))
+            + tokenize(file_path.stem)
+        )
+
     def search_prompts(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
-        """Search prompts (placeholder for future implementation)"""
-        pass
+        """Search prompts by keyword using the BM25 index
+
+        The files are rescanned at most every `keyword.refresh_interval`
+        seconds, so consecutive searches reuse the last scan.
+        """
+        if self.keyword_synced_at is None or \
+                time.monotonic() - self.keyword_synced_at >= self.config.keyword.refresh_interval:
+            self.refresh_keyword_index()
+
+        results = []
+        for rank, (path, score) in enumerate(self.keyword_index.search(query, top_k), 1):
+            file_path = Path(path)
+            results.append({
+                "file_path": file_path,
+                "relative_path": self.get_relative_path(file_path),
+                "name": file_path.name,
+                "content": self.get_prompt_content(file_path),
+                "score": score,
+                "rank": rank,
+            })
+        return results
     
     def get_file_info(self, file_path: Path) -> Dict[str, Any]:
         """Get file information"""
@@ -0,0 +1,272 @@
+"""Rescore store module - exact float32 vectors kept on disk next to a quantized index
+
+When the FAISS index stores float16 / SQ8 codes or IVF-PQ codes, the
+original vectors are written to a memory-mapped table sorted by vector
+ID. Searches over-fetch candidates from the compact index and re-score
+them exactly; only the candidate rows are paged in, so the float32 copy
+costs disk space rather than RAM.
+
+Incremental updates never rewrite the table: added rows go to a small
+delta table and removed IDs to a tombstone list. Once those grow past a
+fraction of the table, it is compacted chunk by chunk.
+"""
+
+import os
+from pathlib import Path
+from typing import Dict, Any, Optional, Iterable, Iterator, Tuple
+
+import numpy as np
+
+RESCORE_FILE = "vectors.f32.npy"
+RESCORE_DELTA_FILE = "vectors.f32.delta.npy"
+RESCORE_DELETED_FILE = "vectors.f32.deleted.npy"
+RESCORE_FILES = (RESCORE_FILE, RESCORE_DELTA_FILE, RESCORE_DELETED_FILE)
+
+# 增量表和删除列表合计超过主表的该比例时合并重写
+COMPACT_RATIO = 0.25
+
+# 分块读写的行数，内存占用与总行数无关
+CHUNK_ROWS = 65536
+
+
+def _row_dtype(dimension: int) -> np.dtype:
+    return np.dtype([("id", "<i8"), ("vector", "<f4", (dimension,))])
+
+
+def _save(path: Path, array: np.ndarray) -> None:
+    """Write an .npy file through a temporary file and an atomic rename"""
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        np.save(f, array)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class RescoreStore:
+    """ID-sorted table of (vector ID, float32 vector) rows, opened with mmap
+
+    The table (`rows`) is only replaced as a whole, atomically, so a
+    reader that mapped the previous file keeps a consistent view. Rows
+    added since the last compaction live in the sorted `delta` table;
+    `deleted` lists removed IDs of the main table.
+    """
+
+    def __init__(self, directory: Path):
+        self.path = Path(directory) / RESCORE_FILE
+        self.rows: Optional[np.ndarray] = None
+        self.delta: Optional[np.ndarray] = None
+        self.deleted = np.zeros(0, dtype="<i8")
+
+    @property
+    def delta_path(self) -> Path:
+        return self.path.with_name(RESCORE_DELTA_FILE)
+
+    @property
+    def deleted_path(self) -> Path:
+        return self.path.with_name(RESCORE_DELETED_FILE)
+
+    def __len__(self) -> int:
+        if self.rows is None:
+            return 0
+        return len(self.rows) - len(self.deleted) + len(self.delta)
+
+    @property
+    def is_open(self) -> bool:
+        return self.rows is not None
+
+    @property
+    def dimension(self) -> int:
+        return self.rows.dtype["vector"].shape[0]
+
+    def open(self) -> bool:
+        """映射已有的向量文件，文件缺失或格式不符时返回 False"""
+        try:
+            rows = np.load(self.path, mmap_mode="r")
+            if rows.dtype.names != ("id", "vector") or rows.ndim != 1:
+                return False
+            delta = np.zeros(0, dtype=rows.dtype)
+            if self.delta_path.exists():
+                delta = np.load(self.delta_path, mmap_mode="r")
+            deleted = np.zeros(0, dtype="<i8")
+            if self.deleted_path.exists():
+                deleted = np.load(self.deleted_path)
+        except (OSError, ValueError):
+            return False
+        if delta.dtype != rows.dtype:
+            return False
+        self.rows, self.delta, self.deleted = rows, delta, deleted
+        return True
+
+    def close(self) -> None:
+        self.rows = None
+        self.delta = None
+        self.deleted = np.zeros(0, dtype="<i8")
+
+    @staticmethod
+    def _find(table: np.ndarray, vector_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Get (row positions, found mask) of `vector_ids` in an ID-sorted table"""
+        ids = table["id"]
+        if not len(ids):
+            return np.zeros(len(vector_ids), dtype="int64"), np.zeros(len(vector_ids), dtype=bool)
+        positions = np.clip(np.searchsorted(ids, vector_ids), 0, len(ids) - 1)
+        return positions, ids[positions] == vector_ids
+
+    def lookup(self, vector_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Get (vectors, found mask) for `vector_ids`; missing rows are zero"""
+        vector_ids = np.asarray(vector_ids, dtype="int64")
+        vectors = np.zeros((len(vector_ids), self.dimension), dtype="float32")
+
+        positions, found = self._find(self.rows, vector_ids)
+        if len(self.deleted):
+            found &= ~np.isin(vector_ids, self.deleted)
+        vectors[found] = self.rows["vector"][positions[found]]
+
+        if len(self.delta):
+            positions, in_delta = self._find(self.delta, vector_ids)
+            in_delta &= ~found
+            vectors[in_delta] = self.delta["vector"][positions[in_delta]]
+            found |= in_delta
+        return vectors, found
+
+    def rerank(self, queries: np.ndarray, indices: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Re-score candidate IDs (one row per query, -1 = none) exactly; return the top k
+
+        The result has the same layout as `faiss.Index.search`.
+        """
+        vectors, found = self.lookup(indices.ravel())
+        vectors = vectors.reshape(indices.shape[0], indices.shape[1], -1)
+        scores = np.einsum("qcd,qd->qc", vectors, queries)
+        scores[(indices < 0) | ~found.reshape(indices.shape)] = -np.inf
+
+        order = np.argsort(-scores, axis=1, kind="stable")[:, :k]
+        scores = np.take_along_axis(scores, order, axis=1)
+        indices = np.take_along_axis(indices, order, axis=1)
+        indices[np.isinf(scores)] = -1
+        return scores, indices
+
+    def iter_chunks(self, chunk_rows: int = CHUNK_ROWS) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """Yield all live (vectors, ids) in chunks, e.g. to rebuild the index
+
+        At least one (possibly empty) chunk is yielded.
+        """
+        yielded = False
+        for table, filtered in ((self.rows, True), (self.delta, False)):
+            for start in range(0, len(table), chunk_rows):
+                chunk = table[start:start + chunk_rows]
+                if filtered and len(self.deleted):
+                    chunk = chunk[~np.isin(chunk["id"], self.deleted)]
+                yield np.array(chunk["vector"], dtype="float32"), np.array(chunk["id"])
+                yielded = True
+        if not yielded:
+            yield np.zeros((0, self.dimension), dtype="float32"), np.zeros(0, dtype="int64")
+
+    def sample(self, count: int, seed: int = 0) -> np.ndarray:
+        """Get up to `count` random live vectors, e.g. to train a quantizer"""
+        live = len(self)
+        if live <= count:
+            return np.concatenate([vectors for vectors, _ in self.iter_chunks()])
+        rows = np.sort(np.random.default_rng(seed).choice(live, count, replace=False))
+        vectors = np.zeros((len(rows), self.dimension), dtype="float32")
+        offset = filled = 0
+        for chunk, _ in self.iter_chunks():
+            selected = rows[(rows >= offset) & (rows < offset + len(chunk))] - offset
+            vectors[filled:filled + len(selected)] = chunk[selected]
+            filled += len(selected)
+            offset += len(chunk)
+        return vectors
+
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Get all live (vectors, ids); the mapped table itself when there are no pending changes"""
+        if not len(self.delta) and not len(self.deleted):
+            return self.rows["vector"], self.rows["id"]
+        chunks = list(self.iter_chunks())
+        return np.concatenate([c[0] for c in chunks]), np.concatenate([c[1] for c in chunks])
+
+    def write(self, vectors: np.ndarray, vector_ids: np.ndarray) -> None:
+        """Replace the table with `vectors` / `vector_ids` and reopen it"""
+        vectors = np.asarray(vectors, dtype="float32")
+        rows = np.zeros(len(vector_ids), dtype=_row_dtype(vectors.shape[1]))
+        rows["id"] = vector_ids
+        rows["vector"] = vectors
+        rows = rows[np.argsort(rows["id"], kind="stable")]
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        _save(self.path, rows)
+        self.delta_path.unlink(missing_ok=True)
+        self.deleted_path.unlink(missing_ok=True)
+        self.open()
+
+    def update(self, vectors: Optional[np.ndarray], vector_ids: Iterable[int],
+               removed_ids: Iterable[int] = ()) -> None:
+        """Add rows and drop removed IDs, then reopen
+
+        Only the delta table and the tombstone list are rewritten; the
+        table is compacted once they outgrow `COMPACT_RATIO` of it.
+        """
+        removed = np.fromiter(removed_ids, dtype="<i8")
+        delta = np.array(self.delta)
+        if len(removed):
+            delta = delta[~np.isin(delta["id"], removed)]
+            _, in_rows = self._find(self.rows, removed)
+            deleted = np.union1d(self.deleted, removed[in_rows])
+        else:
+            deleted = self.deleted
+        if vectors is not None and len(vectors):
+            added = np.zeros(len(vectors), dtype=self.rows.dtype)
+            added["id"] = np.fromiter(vector_ids, dtype="<i8")
+            added["vector"] = vectors
+            delta = np.concatenate([delta, added])
+            delta = delta[np.argsort(delta["id"], kind="stable")]
+
+        if len(delta) + len(deleted) > COMPACT_RATIO * len(self.rows):
+            self.delta, self.deleted = delta, deleted
+            self.compact()
+            return
+
+        _save(self.delta_path, delta)
+        _save(self.deleted_path, deleted)
+        self.open()
+
+    def compact(self) -> None:
+        """Merge the delta table and tombstones into a new table, chunk by chunk"""
+        keep = np.ones(len(self.rows), dtype=bool)
+        if len(self.deleted):
+            keep = ~np.isin(self.rows["id"], self.deleted)
+        # 只把 ID 和行号载入内存，向量按块读取
+        sources = np.concatenate([np.flatnonzero(keep), -1 - np.arange(len(self.delta))])
+        ids = np.concatenate([self.rows["id"][keep], self.delta["id"]])
+        sources = sources[np.argsort(ids, kind="stable")]
+
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        merged = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=self.rows.dtype,
+                                           shape=(len(sources),))
+        for start in range(0, len(sources), CHUNK_ROWS):
+            chunk = sources[start:start + CHUNK_ROWS]
+            from_rows = chunk >= 0
+            out = merged[start:start + len(chunk)]
+            out[from_rows] = self.rows[chunk[from_rows]]
+            out[~from_rows] = self.delta[-1 - chunk[~from_rows]]
+        merged.flush()
+        with open(tmp_path, "rb") as f:
+            os.fsync(f.fileno())
+        del merged
+        os.replace(tmp_path, self.path)
+        self.delta_path.unlink(missing_ok=True)
+        self.deleted_path.unlink(missing_ok=True)
+        self.open()
+
+    def remove_files(self) -> None:
+        """Close the store and delete its files"""
+        self.close()
+        for path in (self.path, self.delta_path, self.deleted_path):
+            path.unlink(missing_ok=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取存储统计信息"""
+        return {
+            "vectors": len(self),
+            "pending": 0 if self.rows is None else len(self.delta) + len(self.deleted),
+            "bytes": sum(path.stat().st_size for path in (self.path, self.delta_path, self.deleted_path)
+                         if path.exists()),
+        }
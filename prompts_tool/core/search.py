@@ -1,15 +1,22 @@
-"""Search module using SentenceTransformers and FAISS for semantic search"""
+"""Search module using sentence embeddings (SentenceTransformers or ONNX) and a vector backend (FAISS, NumPy or hnswlib) for semantic search"""
 
-import os
-import pickle
+import heapq
+import itertools
 import numpy as np
 from pathlib import Path
 from typing import List, Dict, Any, Optional, Tuple
-from sentence_transformers import SentenceTransformer
-import faiss
+from concurrent.futures import ThreadPoolExecutor
 
-from .config import Config
+from .config import Config, SEARCH_MODES
 from .repo import PromptRepo
+from .embed_cache import EmbeddingCache
+from .query_cache import QueryCache, normalize_query
+from .batching import BatchEncoder, token_lengths
+from .encoders import load_encoder
+from .encode_pool import EncodePool, PARALLEL_MIN_TEXTS
+from .backends import select_backend
+from .shard import IndexShard
+from . import npindex
 
 
 class PromptSearcher:
@@ -19,210 +26,396 @@ class PromptSearcher:
         self.config = config
         self.repo = repo
         self.model = None
-        self.index = None
-        self.prompt_data = []
+        self.batch_encoder: Optional[BatchEncoder] = None
+        # 最近一次文档编码的吞吐量统计
+        self.encode_stats: Dict[str, Any] = {}
+        # 配置的向量索引后端，依赖缺失时自动回退
+        self.backend = select_backend(config.index.backend)
         self.index_path = config.get_index_path()
+        # 每个配置的路径一个索引分片，独立加载、更新和重建
+        self.shards = [
+            IndexShard(config, repo, repo_path, self.backend, self._encode_documents)
+            for repo_path in dict.fromkeys(config.get_repo_paths())
+        ]
+        self._shard_executor: Optional[ThreadPoolExecutor] = None
+        # 关键词索引是否已与仓库同步（混合搜索使用）
+        self._keyword_synced = False
+        self._keyword_executor: Optional[ThreadPoolExecutor] = None
+        self.embedding_cache: Optional[EmbeddingCache] = None
+        if config.cache.enabled:
+            self.embedding_cache = EmbeddingCache(
+                config.get_embedding_cache_path(),
+                config.model.name,
+                config.cache.max_entries,
+            )
+        self.query_cache: Optional[QueryCache] = None
+        if config.cache.query_max_entries > 0:
+            self.query_cache = QueryCache(
+                config.model.name,
+                config.cache.query_max_entries,
+                config.get_query_cache_path() if config.cache.query_persist else None,
+                config.cache.query_save_delay,
+            )
         
         # 初始化模型
         self._init_model()
     
     def _init_model(self):
-        """Initialize SentenceTransformer model"""
+        """Initialize the embedding model with the configured backend"""
         try:
-            print(f"🔄 正在加载模型: {self.config.model.name}")
-            self.model = SentenceTransformer(self.config.model.name, device=self.config.model.device)
+            print(f"🔄 正在加载模型: {self.config.model.name}（{self.config.model.backend}）")
+            self.model = load_encoder(self.config.model, self.config.get_onnx_model_path())
             print(f"✅ 模型加载完成")
+        except ImportError:
+            # 缺少 sentence-transformers 时由调用方回退到关键词搜索
+            raise
         except Exception as e:
             print(f"❌ 模型加载失败: {e}")
             print("请检查网络连接或模型名称是否正确")
             self.model = None
     
-    def _build_index(self) -> bool:
-        """Build FAISS index"""
+    def _load_index(self) -> bool:
+        """Load every shard; returns True if all shards loaded"""
+        loaded = True
+        for shard in self.shards:
+            if not shard.load():
+                # 加载失败的分片在下次同步时从头构建
+                shard.reset()
+                loaded = False
+        return loaded
+
+    @property
+    def is_ready(self) -> bool:
+        return any(shard.index is not None for shard in self.shards)
+
+    def refresh_index(self) -> bool:
+        """Incrementally sync every shard with its prompt files
+
+        Each configured path has its own shard (see `IndexShard.refresh`);
+        only shards whose files changed are re-encoded and saved.
+        """
         if not self.model:
             print("❌ 模型未加载，无法构建索引")
             return False
-        
-        if not self.repo.exists():
-            print("❌ 仓库不存在，无法构建索引")
+
+        files_by_path = self.repo.get_prompt_files_by_path()
+        prompt_files = sorted(f for files in files_by_path.values() for f in files)
+        if not prompt_files:
+            print("❌ 没有找到 Prompt 文件")
             return False
-        
-        print("🔄 正在构建搜索索引...")
-        
+
         try:
-            # Get all prompt files
-            prompt_files = self.repo.get_prompt_files()
-            
-            if not prompt_files:
-                print("❌ 没有找到 Prompt 文件")
-                return False
-            
-            print(f"📁 找到 {len(prompt_files)} 个 Prompt 文件")
-
-            # Extract text and metadata
-            texts = []
-            self.prompt_data = []
-
-            for file_path in prompt_files:
-                content = self.repo.get_prompt_content(file_path)
-                if content.strip():
-                    texts.append(content)
-                    relative = file_path
-                    for rp in self.repo.repo_paths:
-                        try:
-                            relative = file_path.relative_to(rp)
-                            break
-                        except ValueError:
-                            continue
-                    self.prompt_data.append({
-                        "file_path": file_path,
-                        "relative_path": str(relative),
-                        "name": file_path.name,
-                        "content": content
-                    })
-            
-            if not texts:
-                print("❌ 没有有效的 Prompt 内容")
-                return False
-            
-            print(f"📝 处理了 {len(texts)} 个有效 Prompt")
-            
-            # 生成 embeddings
-            print("🧠 正在生成文本嵌入...")
-            embeddings = self.model.encode(texts, show_progress_bar=True)
-            
-            # 构建 FAISS 索引
-            print("🔍 正在构建 FAISS 索引...")
-            dimension = embeddings.shape[1]
-            self.index = faiss.IndexFlatIP(dimension)  # 内积索引，用于余弦相似度
-            
-            # 归一化向量（余弦相似度）
-            faiss.normalize_L2(embeddings)
-            self.index.add(embeddings.astype('float32'))
-            
-            # 保存索引和元数据
-            self._save_index()
-            
-            print(f"✅ 索引构建完成，包含 {len(texts)} 个 Prompt")
-            return True
-            
+            # 内容哈希来自目录缓存，未变化的文件只需 stat
+            entries = self.repo.catalog.refresh(prompt_files)
+            self.repo.catalog.save()
+
+            # 混合搜索的关键词索引与向量索引同步更新
+            if self.config.search.mode == "hybrid":
+                self.repo.refresh_keyword_index(prompt_files, entries)
+            self._keyword_synced = self.config.search.mode == "hybrid"
+
+            current = {
+                str(f): entry.sha256
+                for f, entry in zip(prompt_files, entries) if entry is not None
+            }
+            for shard in self.shards:
+                files = files_by_path.get(shard.repo_path, [])
+                shard.refresh(files, {str(f): current[str(f)] for f in files if str(f) in current})
+            return self.is_ready
+
         except Exception as e:
             print(f"❌ 构建索引失败: {e}")
             return False
-    
-    def _save_index(self):
-        """保存索引和元数据"""
-        try:
-            self.index_path.mkdir(parents=True, exist_ok=True)
-            
-            # 保存 FAISS 索引
-            faiss.write_index(self.index, str(self.index_path / "prompts.index"))
-            
-            # 保存元数据
-            with open(self.index_path / "prompts_metadata.pkl", "wb") as f:
-                pickle.dump(self.prompt_data, f)
-            
-            print(f"💾 索引已保存到: {self.index_path}")
-            
-        except Exception as e:
-            print(f"❌ 保存索引失败: {e}")
-    
-    def _load_index(self) -> bool:
-        """加载已存在的索引"""
-        try:
-            index_file = self.index_path / "prompts.index"
-            metadata_file = self.index_path / "prompts_metadata.pkl"
-            
-            if not index_file.exists() or not metadata_file.exists():
-                return False
-            
-            # 加载 FAISS 索引
-            self.index = faiss.read_index(str(index_file))
-            
-            # 加载元数据
-            with open(metadata_file, "rb") as f:
-                self.prompt_data = pickle.load(f)
-            
-            print(f"✅ 索引加载完成，包含 {len(self.prompt_data)} 个 Prompt")
-            return True
-            
-        except Exception as e:
-            print(f"❌ 加载索引失败: {e}")
-            return False
-    
+
+    def _encode_documents(self, texts: List[str], hashes: List[str]) -> np.ndarray:
+        """Encode documents, reusing cached embeddings for known content hashes"""
+        if self.embedding_cache is None:
+            return self._encode_texts(texts)
+
+        cached = self.embedding_cache.get_many(hashes)
+
+        # 相同内容（例如多个仓库中的同一文件）只编码一次
+        pending: Dict[str, str] = {}
+        for text, sha256 in zip(texts, hashes):
+            if sha256 not in cached and sha256 not in pending:
+                pending[sha256] = text
+        print(f"♻️ 嵌入缓存命中 {len(texts) - len(pending)}/{len(texts)}")
+
+        if pending:
+            new_embeddings = self._encode_texts(list(pending.values()))
+            self.embedding_cache.put_many(list(pending), new_embeddings)
+            cached.update(zip(pending, new_embeddings))
+        self.embedding_cache.flush()
+
+        return np.ascontiguousarray(
+            np.stack([cached[sha256] for sha256 in hashes]), dtype="float32"
+        )
+
+    def _encode_texts(self, texts: List[str]) -> np.ndarray:
+        """Encode texts in length-sorted batches and report the throughput
+
+        With `model.workers` > 1 and enough texts, the work is sharded
+        across a process pool (one model per worker) for this call only.
+        """
+        workers = self.config.model.workers
+        if workers > 1 and len(texts) >= PARALLEL_MIN_TEXTS:
+            print(f"🧠 正在使用 {workers} 个进程生成 {len(texts)} 个文本嵌入...")
+            pool = EncodePool(self.config.model, workers, onnx_path=self.config.get_onnx_model_path())
+            with pool:
+                embeddings = pool.encode(texts, token_lengths(self.model, texts))
+            stats = self.encode_stats = pool.stats
+            print(f"⚡ {stats['tokens']} 个 token，{stats['tokens_per_second']:.0f} token/秒"
+                  f"（{stats['workers']} 个进程 × {stats['threads_per_worker']} 线程，"
+                  f"{stats['shards']} 个分片，利用率 {stats['utilization']:.0%}）")
+            return embeddings
+
+        if self.batch_encoder is None:
+            # 校准得到的批次大小在本进程内复用
+            self.batch_encoder = BatchEncoder(
+                self.model, self.config.model.batch_memory_mb, self.config.model.batch_tokens
+            )
+        print(f"🧠 正在生成 {len(texts)} 个文本嵌入...")
+        embeddings = self.batch_encoder.encode(texts)
+        stats = self.encode_stats = self.batch_encoder.stats
+        print(f"⚡ {stats['tokens']} 个 token，{stats['tokens_per_second']:.0f} token/秒"
+              f"（{stats['batches']} 个批次，每批 ≤ {stats['batch_tokens']} token，"
+              f"填充 {stats['padding']:.0%}）")
+        return embeddings
+
     def ensure_index(self) -> bool:
-        """确保索引存在，如果不存在则构建"""
-        if self.index is not None:
+        """确保索引存在且与仓库同步，如果不存在则构建"""
+        if self.is_ready:
             return True
         
-        # 尝试加载现有索引
-        if self._load_index():
-            return True
-        
-        # 构建新索引
-        return self._build_index()
+        # 加载现有分片后只更新变化的文件，缺失的分片从头构建
+        self._load_index()
+        return self.refresh_index()
     
-    def search(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
-        """搜索最相关的 Prompt"""
-        if not self.ensure_index():
-            print("❌ 索引不可用，无法进行搜索")
+    def search(self, query: str, top_k: int = 5, mode: Optional[str] = None) -> List[Dict[str, Any]]:
+        """搜索最相关的 Prompt
+
+        `mode` is "vector" (semantic only) or "hybrid" (BM25 and vector
+        retrievers fused with reciprocal rank fusion); defaults to the config.
+        """
+        return self.search_many([query], top_k=top_k, mode=mode)[0]
+
+    def search_many(self, queries: List[str], top_k: int = 5,
+                    mode: Optional[str] = None) -> List[List[Dict[str, Any]]]:
+        """Search several queries at once; results are aligned with `queries`
+
+        All queries are embedded in one batched forward pass and the vector
+        index is searched once with the query matrix.
+        """
+        mode = mode or self.config.search.mode
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"未知的搜索模式: {mode}（可选: {'、'.join(SEARCH_MODES)}）")
+        if not queries:
             return []
+
+        # 其他进程的构建尚未发布时直接使用关键词搜索，不再扫描文件或等待构建锁
+        waiting = not self.is_ready and any(shard.build_in_progress() for shard in self.shards)
+        if waiting or not self.ensure_index():
+            if waiting or any(shard.build_pending for shard in self.shards):
+                print("⏳ 其他进程正在构建索引，暂时使用关键词搜索结果")
+                return [self.repo.search_prompts(query, top_k) for query in queries]
+            print("❌ 索引不可用，无法进行搜索")
+            return [[] for _ in queries]
         
         if not self.model:
             print("❌ 模型未加载，无法进行搜索")
-            return []
+            return [[] for _ in queries]
         
         try:
-            # 生成查询的 embedding
-            query_embedding = self.model.encode([query])
-            
-            # 归一化查询向量
-            faiss.normalize_L2(query_embedding)
-            
-            # 搜索最相似的向量
-            scores, indices = self.index.search(query_embedding.astype('float32'), top_k)
-            
+            if mode == "hybrid":
+                return self._hybrid_search_many(queries, top_k)
+
             # 构建结果
-            results = []
-            for i, (score, idx) in enumerate(zip(scores[0], indices[0])):
-                if idx < len(self.prompt_data):
-                    prompt_info = self.prompt_data[idx].copy()
-                    prompt_info["score"] = float(score)
-                    prompt_info["rank"] = i + 1
-                    results.append(prompt_info)
+            all_results = []
+            for hits in self._vector_candidates(queries, top_k):
+                results = []
+                for i, (shard, doc_id, score, passage) in enumerate(hits):
+                    prompt_info = shard.get_document(doc_id, passage)
+                    if prompt_info is not None:
+                        prompt_info["score"] = score
+                        prompt_info["rank"] = i + 1
+                        results.append(prompt_info)
+                all_results.append(results)
             
-            return results
+            return all_results
             
         except Exception as e:
             print(f"❌ 搜索失败: {e}")
-            return []
+            return [[] for _ in queries]
+
+    def _vector_candidates(self, queries: List[str], n: int) -> List[List[Tuple[IndexShard, int, float, int]]]:
+        """Get the top-n (shard, document ID, pooled score, best passage) hits for each query
+
+        Queries are embedded once; every shard is searched in parallel and
+        the per-shard top-n lists are merged with a heap.
+        """
+        query_embeddings = self._encode_queries(queries)
+        shards = [shard for shard in self.shards if shard.index is not None]
+        if len(shards) == 1:
+            per_shard = [shards[0].candidates(query_embeddings, n)]
+        else:
+            if self._shard_executor is None:
+                self._shard_executor = ThreadPoolExecutor(max_workers=len(self.shards))
+            per_shard = list(self._shard_executor.map(
+                lambda shard: shard.candidates(query_embeddings, n), shards
+            ))
+
+        all_hits = []
+        for row in range(len(queries)):
+            merged = heapq.merge(
+                *[[(shard, *hit) for hit in hits[row]] for shard, hits in zip(shards, per_shard)],
+                key=lambda hit: -hit[2],
+            )
+            all_hits.append(list(itertools.islice(merged, n)))
+        return all_hits
+
+    def _encode_queries(self, queries: List[str]) -> np.ndarray:
+        """Embed and normalize queries, serving repeated ones from the query cache"""
+        if self.query_cache is None:
+            embeddings = np.ascontiguousarray(
+                self.model.encode(queries, show_progress_bar=False), dtype="float32"
+            )
+            npindex.normalize_L2(embeddings)
+            return embeddings
+
+        keys = [normalize_query(query) for query in queries]
+        vectors: Dict[str, np.ndarray] = {}
+        for key in dict.fromkeys(keys):
+            vector = self.query_cache.get(key)
+            if vector is not None:
+                vectors[key] = vector
+
+        # 未命中的查询一次批量编码
+        pending = [key for key in dict.fromkeys(keys) if key not in vectors]
+        if pending:
+            embeddings = np.ascontiguousarray(
+                self.model.encode(pending, show_progress_bar=False), dtype="float32"
+            )
+            npindex.normalize_L2(embeddings)
+            for key, vector in zip(pending, embeddings):
+                vectors[key] = vector
+                self.query_cache.put(key, vector)
+            # 延迟写入，连续的查询只写一次文件
+            self.query_cache.schedule_save()
+
+        return np.ascontiguousarray(np.stack([vectors[key] for key in keys]), dtype="float32")
+
+    def _hybrid_search_many(self, queries: List[str], top_k: int) -> List[List[Dict[str, Any]]]:
+        """Run BM25 and vector retrieval concurrently and fuse them with RRF
+
+        Each retriever contributes at most `search.candidates` hits; a hit
+        scores sum(1 / (rrf_k + rank)) over the retrievers that found it.
+        """
+        if not self._keyword_synced:
+            self.repo.refresh_keyword_index()
+            self._keyword_synced = True
+
+        candidates = max(top_k, self.config.search.candidates)
+        if self._keyword_executor is None:
+            self._keyword_executor = ThreadPoolExecutor(max_workers=1)
+        # BM25 查询在工作线程中执行，与查询编码和向量检索并行
+        keyword_future = self._keyword_executor.submit(
+            lambda: [self.repo.keyword_index.search(query, candidates) for query in queries]
+        )
+        vector_hits = self._vector_candidates(queries, candidates)
+        keyword_hits = keyword_future.result()
+
+        return [
+            self._fuse(query_vector_hits, query_keyword_hits, top_k)
+            for query_vector_hits, query_keyword_hits in zip(vector_hits, keyword_hits)
+        ]
+
+    def _fuse(self, vector_hits: List[Tuple[IndexShard, int, float, int]], keyword_hits: List[Tuple[str, float]],
+              top_k: int) -> List[Dict[str, Any]]:
+        """Fuse one query's vector and keyword hits with reciprocal rank fusion"""
+        rrf_k = self.config.search.rrf_k
+        fused: Dict[str, Dict[str, Any]] = {}
+        best_passage: Dict[str, Tuple[IndexShard, int]] = {}
+
+        def hit(path: str) -> Dict[str, Any]:
+            return fused.setdefault(path, {
+                "score": 0.0,
+                "vector_score": None, "vector_rank": None,
+                "keyword_score": None, "keyword_rank": None,
+            })
+
+        for rank, (shard, doc_id, score, passage) in enumerate(vector_hits, 1):
+            path = shard.docstore.get_path(doc_id)
+            if path is not None:
+                entry = hit(path)
+                entry.update(score=entry["score"] + 1 / (rrf_k + rank),
+                             vector_score=score, vector_rank=rank)
+                best_passage[path] = (shard, passage)
+        for rank, (path, score) in enumerate(keyword_hits, 1):
+            entry = hit(path)
+            entry.update(score=entry["score"] + 1 / (rrf_k + rank),
+                         keyword_score=score, keyword_rank=rank)
+
+        results = []
+        top = heapq.nlargest(top_k, fused.items(), key=lambda item: item[1]["score"])
+        for rank, (path, entry) in enumerate(top, 1):
+            shard, passage = best_passage.get(path, (self._shard_for(path), None))
+            doc_id = shard.manifest["files"].get(path, {}).get("id") if shard is not None else None
+            prompt_info = shard.get_document(doc_id, passage) if doc_id is not None else None
+            if prompt_info is None:
+                # 只被关键词检索命中且没有向量（例如索引尚未同步）
+                file_path = Path(path)
+                prompt_info = {
+                    "file_path": file_path,
+                    "content": self.repo.get_prompt_content(file_path),
+                    "relative_path": self.repo.get_relative_path(file_path),
+                    "name": file_path.name,
+                    "match_start": None,
+                    "match_end": None,
+                }
+            prompt_info.update(entry)
+            prompt_info["rank"] = rank
+            results.append(prompt_info)
+        return results
     
+    def _shard_for(self, path: str) -> Optional[IndexShard]:
+        """Get the shard that indexes `path`"""
+        for shard in self.shards:
+            if path in shard.manifest["files"]:
+                return shard
+        return None
+
     def rebuild_index(self) -> bool:
         """重建索引"""
         print("🔄 正在重建搜索索引...")
-        self.index = None
-        self.prompt_data = []
         
-        # 删除旧的索引文件
-        if self.index_path.exists():
-            try:
-                import shutil
-                shutil.rmtree(self.index_path)
-                print("🗑️ 已删除旧索引")
-            except Exception as e:
-                print(f"警告: 无法删除旧索引: {e}")
+        # 从头构建新的一代，旧索引在新索引发布前继续服务（关键词索引可增量更新，予以保留）
+        for shard in self.shards:
+            shard.remove_files()
         
-        return self._build_index()
+        return self.refresh_index()
     
+    def close(self) -> None:
+        """Write pending query cache entries (call before the process exits)"""
+        if self.query_cache is not None:
+            self.query_cache.flush()
+
     def get_index_info(self) -> Dict[str, Any]:
         """获取索引信息"""
-        if not self.index:
-            return {"status": "not_built"}
+        if not self.is_ready:
+            # 其他进程持有构建锁时索引正在构建
+            building = any(shard.build_lock.holder() is not None for shard in self.shards)
+            return {"status": "building" if building else "not_built"}
         
+        shards = [shard.get_info() for shard in self.shards]
+        ready = [info for info in shards if info["status"] == "ready"]
         return {
             "status": "ready",
-            "total_prompts": len(self.prompt_data),
-            "index_type": "FAISS",
+            "total_prompts": sum(info["prompts"] for info in ready),
+            "index_type": self.backend.name,
+            "mmap": all(info["mmap"] for info in ready),
+            "shards": shards,
+            "query_cache": self.query_cache.get_stats() if self.query_cache else None,
+            "last_encode": dict(self.encode_stats) or None,
             "model_name": self.config.model.name,
             "device": self.config.model.device
         }
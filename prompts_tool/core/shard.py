@@ -0,0 +1,622 @@
+"""Index shard module - the vector index of one configured prompt path
+
+Each entry of `repo.local_paths` gets its own shard in
+`<path>/.prompts_index`: manifest, vector index, document store,
+rescore vectors and projection. Shards are loaded, refreshed and rebuilt
+independently, so changing one repository never re-encodes another.
+
+Every update is written to a new generation directory and published
+atomically (see `generations`), so readers never see a half-built index.
+Builds are serialized across processes with a build lock (see `buildlock`).
+"""
+
+import os
+import json
+import heapq
+import hashlib
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple, Callable
+
+import numpy as np
+
+from .config import Config
+from .repo import PromptRepo
+from .docstore import DocStore
+from .rescore import RescoreStore, RESCORE_FILE, RESCORE_FILES
+from .projection import Projection, PROJECTION_FILE, REDUCTION_METHODS
+from .chunker import split_passages
+from .backends import VectorBackend, NumpyBackend, FAISS_FORMAT
+from .generations import GenerationStore
+from .buildlock import BuildLock, BUILD_LOCK_FILE
+from . import ann, npindex
+
+# 索引清单格式版本，变化时需要重建索引
+MANIFEST_VERSION = 4
+
+# 向量 ID = 文档 ID × PASSAGE_ID_STRIDE + 段落序号
+PASSAGE_ID_STRIDE = 1 << 16
+
+# 段落级检索时多取的候选倍数，汇总到文件后仍能凑满 top-k
+PASSAGE_OVERSAMPLE = 4
+
+# 有损存储的索引多取的候选倍数，再用 float32 向量精确重新打分
+RESCORE_OVERSAMPLE = 4
+
+# 向量索引的文件（文档存储的文件由 DocStore 管理）
+VECTOR_INDEX_FILES = ("manifest.json", "prompts.index")
+
+# 旧版本使用的 pickle 元数据文件
+LEGACY_METADATA_FILE = "prompts_metadata.pkl"
+
+
+def is_index_file(name: str) -> bool:
+    """Check whether a file belongs to a shard generation (not the keyword index / query cache)"""
+    if name.endswith(".tmp"):
+        return False
+    return name in VECTOR_INDEX_FILES + RESCORE_FILES + (PROJECTION_FILE,) or name.startswith("docs.")
+
+
+class IndexShard:
+    """Vector index, manifest and document store of one prompt path
+
+    `encode` embeds passages (texts, content hashes) for new documents;
+    the searcher passes its cached, batched encoder.
+    """
+
+    def __init__(self, config: Config, repo: PromptRepo, repo_path: Path,
+                 backend: type, encode: Callable[[List[str], List[str]], np.ndarray]):
+        self.config = config
+        self.repo = repo
+        self.repo_path = repo_path
+        self.index_path = config.get_shard_index_path(repo_path)
+        self.backend = backend
+        self.encode = encode
+        self.index: Optional[VectorBackend] = None
+        self.manifest: Dict[str, Any] = self._new_manifest()
+        # 已发布的各代索引目录；directory 为当前读取 / 写入的目录
+        self.generations = GenerationStore(self.index_path)
+        self.directory = self.index_path
+        self.build_lock = BuildLock(self.index_path / BUILD_LOCK_FILE, config.index.build_lock_stale)
+        # 其他进程持有构建锁、本分片的变化尚未同步时为 True
+        self.build_pending = False
+        self.docstore = DocStore(self.index_path)
+        # 量化索引的原始 float32 向量（映射读取，用于重新打分和重建）
+        self.rescore_store = RescoreStore(self.index_path)
+        # 降维投影（未配置降维时为 None）
+        self.projection: Optional[Projection] = None
+
+    def reset(self) -> None:
+        """Forget the loaded index so the next refresh builds it from scratch"""
+        self.index = None
+        self.docstore.close()
+        self.rescore_store.close()
+        self.projection = None
+        self.manifest = self._new_manifest()
+        self.generations.release()
+        self._bind(self.index_path)
+
+    def _bind(self, directory: Path) -> None:
+        """Point the stores at a generation directory; mapped files stay valid"""
+        self.directory = directory
+        self.docstore.directory = directory
+        self.rescore_store.path = directory / RESCORE_FILE
+
+    def _new_manifest(self) -> Dict[str, Any]:
+        """Create an empty manifest for the current model"""
+        return {
+            "version": MANIFEST_VERSION,
+            "model_name": self.config.model.name,
+            "next_id": 0,
+            "index": None,
+            "chunking": self._chunking(),
+            "reduction": self._reduction(),
+            "files": {},
+        }
+
+    def _chunking(self) -> Dict[str, int]:
+        """Passage split settings; a change requires a rebuild"""
+        return {
+            "chunk_chars": self.config.index.chunk_chars,
+            "chunk_overlap": self.config.index.chunk_overlap,
+        }
+
+    def _reduction(self) -> Optional[Dict[str, Any]]:
+        """Dimension reduction settings; a change requires a rebuild"""
+        method = self.config.index.reduce
+        if method not in REDUCTION_METHODS:
+            print(f"警告: 未知的降维方式 {method}，不降维")
+            return None
+        if method == "none":
+            return None
+        return {"method": method, "dim": self.config.index.reduce_dim}
+
+    def _project_documents(self, embeddings: np.ndarray) -> np.ndarray:
+        """Apply the index projection, fitting it on the first build"""
+        reduction = self.manifest.get("reduction")
+        if reduction is None:
+            return embeddings
+        if self.projection is None:
+            self.projection = Projection.fit(reduction["method"], embeddings, reduction["dim"])
+            print(f"📉 降维: {self.projection.input_dim} → {self.projection.dim} 维"
+                  f"（{reduction['method']}，保留 {self.projection.explained_variance(embeddings):.0%} 方差）")
+        return self.projection.apply(embeddings)
+
+    def passages(self, content: str) -> List[Tuple[int, int]]:
+        chunking = self.manifest["chunking"]
+        spans = split_passages(content, chunking["chunk_chars"], chunking["chunk_overlap"])
+        # 超长文件只索引前 PASSAGE_ID_STRIDE 个段落
+        return spans[:PASSAGE_ID_STRIDE]
+
+    @staticmethod
+    def _vector_ids(doc_id: int, passages: int) -> List[int]:
+        return [doc_id * PASSAGE_ID_STRIDE + p for p in range(passages)]
+
+    def refresh(self, prompt_files: List[Path], current: Dict[str, str]) -> bool:
+        """Incrementally sync the shard with its prompt files
+
+        `current` maps every prompt file to its content hash. The manifest
+        records a stable document ID, passage count and content hash per
+        file. Each file is split into overlapping passages that are
+        embedded individually. Only added or changed files are read and
+        encoded; vectors of changed and deleted files are removed from the
+        index. The index structure follows the number of passages, see
+        the backend's `choose_spec`.
+
+        Changes are written to a new generation that is published only
+        once it is complete; a failed update leaves the published one as is.
+        Only the holder of the build lock writes a generation. A process
+        that waited for another builder continues from the generation it
+        published instead of encoding the same files again; if the lock is
+        not acquired within `build_lock_timeout`, the current index (if
+        any) is kept and `build_pending` is set. While it is set, later
+        refreshes only try the lock without waiting.
+
+        Returns False if the shard has no index (e.g. no prompt files).
+        """
+        # 已知其他进程在构建时不再等待，在其发布前调用方先使用现有索引或关键词搜索
+        timeout = 0.0 if self.build_pending else self.config.index.build_lock_timeout
+        self.build_pending = False
+        published = self.generations.current()
+        if self.index is not None and published is not None and published != self.directory:
+            self._reload()
+
+        changed, removed = self._pending_changes(prompt_files, current)
+        if not changed and not removed:
+            if self.index is None:
+                return False
+            if not self._structure_outdated() and not self._projection_outdated():
+                return True
+
+        if not self.build_lock.acquire(timeout):
+            print(f"⏳ 其他进程正在构建索引，暂不更新: {self.repo_path}")
+            self.build_pending = True
+            return self.index is not None
+        try:
+            if self.generations.current() != published:
+                # 等待期间其他进程已发布新的一代，只同步其后的变化
+                self._reload()
+                changed, removed = self._pending_changes(prompt_files, current)
+                if not changed and not removed and self.index is not None \
+                        and not self._structure_outdated() and not self._projection_outdated():
+                    return True
+            if self._projection_outdated():
+                changed, removed = self._reset_for_refit(prompt_files, current)
+            built = self._build(prompt_files, current, changed, removed)
+            if built and self._projection_outdated():
+                changed, removed = self._reset_for_refit(prompt_files, current)
+                built = self._build(prompt_files, current, changed, removed)
+            return built
+        finally:
+            self.build_lock.release()
+
+    def build_in_progress(self) -> bool:
+        """Check without waiting whether the build this shard deferred to is still running
+
+        Clears `build_pending` once the holder released the lock (or it
+        turned stale), so the next refresh loads or builds the index.
+        """
+        if not self.build_pending:
+            return False
+        if self.build_lock.acquire(0):
+            self.build_lock.release()
+            self.build_pending = False
+            return False
+        return True
+
+    def _projection_outdated(self) -> bool:
+        """Check whether the corpus outgrew the vectors the PCA projection was fit on"""
+        return self.index is not None and self.projection is not None \
+            and self.projection.needs_refit(self.index.ntotal)
+
+    def _reset_for_refit(self, prompt_files: List[Path],
+                         current: Dict[str, str]) -> Tuple[List[Path], List[str]]:
+        """Drop the index so it is rebuilt with a PCA basis fit on the whole corpus"""
+        print(f"📉 语料已从 {self.projection.fit_count} 增长到 {self.index.ntotal} 个段落，"
+              f"重新拟合降维投影: {self.repo_path}")
+        self.reset()
+        return self._pending_changes(prompt_files, current)
+
+    def _reload(self) -> None:
+        """Switch to the generation another process published"""
+        print(f"🔁 索引已被其他进程更新，重新加载: {self.repo_path}")
+        self.reset()
+        self.load()
+
+    def _pending_changes(self, prompt_files: List[Path],
+                         current: Dict[str, str]) -> Tuple[List[Path], List[str]]:
+        """Get the added / changed files and the removed paths not yet in the manifest"""
+        indexed = self.manifest["files"]
+        changed = [
+            f for f in prompt_files
+            if str(f) in current
+            and indexed.get(str(f), {}).get("sha256") != current[str(f)]
+        ]
+        removed = [path for path in indexed if path not in current]
+        return changed, removed
+
+    def _build(self, prompt_files: List[Path], current: Dict[str, str],
+               changed: List[Path], removed: List[str]) -> bool:
+        """Write and publish a new generation with the pending changes (build lock held)"""
+        if self.index is None:
+            print(f"🔄 正在构建搜索索引: {self.repo_path}")
+            print(f"📁 找到 {len(prompt_files)} 个 Prompt 文件")
+        else:
+            print(f"🔄 正在更新索引 {self.repo_path}: {len(changed)} 个新增/修改, {len(removed)} 个删除")
+
+        source = self.directory if self.index is not None else None
+        generation = self.generations.begin(source, include=is_index_file)
+        self._bind(generation)
+        try:
+            built = self._update(prompt_files, current, changed, removed) and self.save()
+        except BaseException:
+            self.generations.abort(generation)
+            self.reset()
+            raise
+        if not built:
+            self.generations.abort(generation)
+            self.reset()
+            return False
+
+        self.generations.publish(generation)
+        if source == self.index_path:
+            self._remove_legacy_files()
+        print(f"✅ 索引就绪，包含 {len(self.docstore)} 个 Prompt（{self.index.ntotal} 个段落）")
+        return True
+
+    def _update(self, prompt_files: List[Path], current: Dict[str, str],
+                changed: List[Path], removed: List[str]) -> bool:
+        """Apply changed and removed files to the index in the new generation directory"""
+        indexed = self.manifest["files"]
+        self._ensure_writable_index()
+
+        # 删除已修改和已删除文件的旧向量
+        stale_docs = [
+            indexed[path]
+            for path in removed + [str(f) for f in changed if str(f) in indexed]
+            if indexed[path]["id"] is not None
+        ]
+        stale_doc_ids = [doc["id"] for doc in stale_docs]
+        stale_ids = [
+            vector_id for doc in stale_docs
+            for vector_id in self._vector_ids(doc["id"], doc["passages"])
+        ]
+        for path in removed:
+            del indexed[path]
+        spec = self.manifest["index"]
+        if stale_ids and self.index is not None \
+                and self.index.remove(np.array(stale_ids, dtype="int64")):
+            stale_pending = []
+        else:
+            # 不支持删除的索引在下面重建时过滤旧向量
+            stale_pending = stale_ids
+
+        # 读取新增/修改的文件并切分段落
+        texts, hashes, ids, new_docs = [], [], [], []
+        for file_path, content in self.repo.iter_prompt_contents(changed):
+            key = str(file_path)
+            spans = self.passages(content)
+            if not spans:
+                indexed[key] = {"id": None, "sha256": current[key], "passages": 0}
+                continue
+
+            doc_id = self.manifest["next_id"]
+            self.manifest["next_id"] += 1
+            indexed[key] = {"id": doc_id, "sha256": current[key], "passages": len(spans)}
+            new_docs.append((doc_id, key, content))
+            for vector_id, (start, end) in zip(self._vector_ids(doc_id, len(spans)), spans):
+                passage = content[start:end]
+                texts.append(passage)
+                hashes.append(hashlib.sha256(passage.encode("utf-8")).hexdigest())
+                ids.append(vector_id)
+
+        if changed:
+            print(f"📖 已读取 {self.repo.last_load_stats.summary()}")
+
+        embeddings = None
+        if texts:
+            embeddings = self.encode(texts, hashes)
+
+            # 归一化向量（余弦相似度）
+            npindex.normalize_L2(embeddings)
+            embeddings = self._project_documents(embeddings)
+
+        if self.index is None and embeddings is None:
+            print(f"❌ 没有有效的 Prompt 内容: {self.repo_path}")
+            return False
+
+        dimension = self.index.d if self.index is not None else embeddings.shape[1]
+        ntotal = (self.index.ntotal if self.index is not None else 0) \
+            - len(stale_pending) + len(ids)
+        target = self.backend.choose_spec(ntotal, dimension, self.config.index)
+
+        # 先更新原始向量：重建结构时从中读取精确向量
+        if target["rescore"]:
+            self._sync_rescore_store(stale_ids, embeddings, ids)
+        else:
+            self.rescore_store.remove_files()
+
+        if self.index is None or stale_pending or not ann.same_structure(target, spec) \
+                or self._too_many_deleted():
+            self._rebuild_structure(target, stale_pending, embeddings, ids)
+        elif embeddings is not None:
+            self.index.add(embeddings, np.array(ids, dtype="int64"))
+        self.manifest["index"]["rescore"] = target["rescore"]
+
+        self.docstore.update(new_docs, stale_doc_ids)
+        return True
+
+    def _rebuild_structure(self, spec: Dict[str, Any], stale_ids: List[int],
+                           embeddings: Optional[np.ndarray], ids: List[int]) -> None:
+        """Rebuild the index with `spec` from its current vectors plus new ones
+
+        Used for the first build, when the corpus size calls for another
+        index structure, to drop vectors from a FAISS HNSW graph, and to
+        compact an hnswlib graph holding too many deleted vectors.
+        """
+        if self.index is not None and not ann.same_structure(spec, self.manifest["index"]):
+            print(f"🔀 索引结构切换: {self.manifest['index']['factory']} → {spec['factory']}")
+
+        if self.rescore_store.is_open:
+            # 保存的原始向量已包含本次增删，避免量化误差在重建时累积；分块读取，不整体载入内存
+            training = None
+            if ann.training_size(spec):
+                training = self.rescore_store.sample(ann.training_size(spec))
+            self.index = None
+            for vectors, vector_ids in self.rescore_store.iter_chunks():
+                if self.index is None:
+                    self.index = self.backend.build(spec, vectors, vector_ids, training)
+                else:
+                    self.index.add(vectors, vector_ids)
+            self.manifest["index"] = spec
+            return
+
+        if self.index is not None:
+            vectors, vector_ids = self.index.vectors()
+            if stale_ids:
+                keep = ~np.isin(vector_ids, np.array(stale_ids, dtype="int64"))
+                vectors, vector_ids = vectors[keep], vector_ids[keep]
+        else:
+            vectors = np.zeros((0, embeddings.shape[1]), dtype="float32")
+            vector_ids = np.zeros(0, dtype="int64")
+        if embeddings is not None:
+            vectors = np.concatenate([vectors, embeddings])
+            vector_ids = np.concatenate([vector_ids, np.array(ids, dtype="int64")])
+
+        self.index = self.backend.build(spec, vectors, vector_ids)
+        self.manifest["index"] = spec
+
+    def _too_many_deleted(self) -> bool:
+        """Check whether marked-deleted vectors exceed `rebuild_deleted_ratio` of the index"""
+        deleted = self.index.deleted_count
+        if not deleted or deleted <= self.config.index.rebuild_deleted_ratio * (self.index.ntotal + deleted):
+            return False
+        print(f"🧹 索引中 {deleted} 个已删除向量（共 {self.index.ntotal + deleted} 个），重建以回收空间")
+        return True
+
+    def _structure_outdated(self) -> bool:
+        """Check whether the configured structure / storage differs from the built index"""
+        spec = self.manifest["index"]
+        target = self.backend.choose_spec(self.index.ntotal, self.index.d, self.config.index)
+        return not ann.same_structure(target, spec) or target["rescore"] != bool(spec.get("rescore"))
+
+    def _sync_rescore_store(self, stale_ids: List[int], embeddings: Optional[np.ndarray],
+                            ids: List[int]) -> None:
+        """Apply this update's removals and additions to the float32 rescore vectors"""
+        if not self.rescore_store.is_open:
+            # 首次启用：已有向量从当前索引中取出
+            if self.index is not None:
+                vectors, vector_ids = self.index.vectors()
+            else:
+                vectors = np.zeros((0, embeddings.shape[1]), dtype="float32")
+                vector_ids = np.zeros(0, dtype="int64")
+            self.rescore_store.write(vectors, vector_ids)
+        self.rescore_store.update(embeddings, ids, stale_ids)
+
+    def _ensure_writable_index(self) -> None:
+        """Replace a read-only mapped index with an in-memory copy"""
+        if self.index is not None:
+            self.index.make_writable(self.directory / "prompts.index")
+
+    def save(self) -> bool:
+        """保存索引和清单到当前目录（文档存储在更新时已写入）"""
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+            # 写入临时文件后替换：硬链接自上一代的文件保持不变
+            index_file = self.directory / "prompts.index"
+            tmp_index = index_file.with_name(index_file.name + ".tmp")
+            self.index.save(tmp_index)
+            os.replace(tmp_index, index_file)
+
+            if self.projection is not None:
+                self.projection.save(self.directory / PROJECTION_FILE)
+            else:
+                (self.directory / PROJECTION_FILE).unlink(missing_ok=True)
+
+            manifest_file = self.directory / "manifest.json"
+            tmp_file = manifest_file.with_name(manifest_file.name + ".tmp")
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump(self.manifest, f, ensure_ascii=False)
+            os.replace(tmp_file, manifest_file)
+
+            print(f"💾 索引已保存到: {self.directory}")
+            return True
+
+        except Exception as e:
+            print(f"❌ 保存索引失败: {e}")
+            return False
+
+    def _remove_legacy_files(self) -> None:
+        """Delete index files written directly into the index directory by older versions"""
+        for name in VECTOR_INDEX_FILES + RESCORE_FILES + (LEGACY_METADATA_FILE, PROJECTION_FILE):
+            (self.index_path / name).unlink(missing_ok=True)
+        for path in self.index_path.glob("docs.*"):
+            path.unlink(missing_ok=True)
+
+    def load(self) -> bool:
+        """加载已发布的索引（同时持有该代的读取租约）"""
+        try:
+            directory = self.generations.acquire()
+            if directory is None:
+                # 旧版本直接写在索引目录中的索引
+                directory = self.index_path
+            self._bind(directory)
+            manifest_file, index_file = (
+                directory / name for name in VECTOR_INDEX_FILES
+            )
+
+            if not manifest_file.exists() or not index_file.exists():
+                return False
+
+            with open(manifest_file, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest.get("version") != MANIFEST_VERSION \
+                    or manifest.get("model_name") != self.config.model.name \
+                    or manifest.get("chunking") != self._chunking() \
+                    or manifest.get("reduction") != self._reduction():
+                print(f"⚠️ 索引格式或模型已变化，需要重建索引: {self.repo_path}")
+                return False
+            if manifest["index"].get("format", FAISS_FORMAT) != self.backend.file_format:
+                print(f"⚠️ 索引后端已变化（{self.backend.name}），需要重建索引: {self.repo_path}")
+                return False
+
+            # 映射索引文件，向量数据按需从页缓存读取
+            try:
+                self.index = self.backend.open(index_file, manifest["index"])
+            except npindex.UnsupportedIndexFormat:
+                # NumPy 后端无法读取 HNSW / 量化索引，改用保存的 float32 向量精确检索
+                if self.backend is not NumpyBackend or not self.rescore_store.open():
+                    print(f"⚠️ {self.backend.name} 无法读取该索引结构，需要重建索引: {self.repo_path}")
+                    return False
+                vectors, vector_ids = self.rescore_store.arrays()
+                spec = self.backend.choose_spec(len(vector_ids), vectors.shape[1], self.config.index)
+                self.index = NumpyBackend.from_arrays(spec, vectors, vector_ids)
+                manifest["index"] = spec
+                self.rescore_store.close()
+
+            # 映射文档存储，内容在命中时才解码
+            if not self.docstore.open():
+                print(f"⚠️ 文档存储缺失或已损坏，需要重建索引: {self.repo_path}")
+                self.index = None
+                return False
+
+            self.projection = None
+            if manifest.get("reduction") is not None:
+                self.projection = Projection.load(directory / PROJECTION_FILE)
+                if self.projection is None:
+                    print(f"⚠️ 降维投影缺失，需要重建索引: {self.repo_path}")
+                    self.index = None
+                    return False
+
+            self.rescore_store.close()
+            if manifest["index"].get("rescore") and not self.rescore_store.open():
+                print(f"⚠️ 重新打分向量缺失，需要重建索引: {self.repo_path}")
+                self.index = None
+                return False
+
+            self.manifest = manifest
+            print(f"✅ 索引加载完成，包含 {len(self.docstore)} 个 Prompt（{self.repo_path}）")
+            return True
+
+        except Exception as e:
+            print(f"❌ 加载索引失败: {e}")
+            self.index = None
+            return False
+
+    def remove_files(self) -> None:
+        """Close the shard so the next refresh builds a new generation from scratch
+
+        The published generation keeps serving other processes until the
+        rebuilt one replaces it; it is then collected once released.
+        """
+        self.reset()
+
+    def candidates(self, query_embeddings: np.ndarray, n: int) -> List[List[Tuple[int, float, int]]]:
+        """Get the top-n (document ID, pooled score, best passage) hits for each query
+
+        Passages are retrieved with some oversampling and pooled per file:
+        "max" keeps the best passage score, "topm" averages the best
+        `pool_top_m` retrieved passages.
+        """
+        if self.projection is not None:
+            query_embeddings = self.projection.apply(query_embeddings)
+        k = min(n * PASSAGE_OVERSAMPLE, self.index.ntotal)
+        if self.manifest["index"].get("rescore") and self.rescore_store.is_open:
+            scores, indices = self._rescored_search(query_embeddings, k)
+        else:
+            scores, indices = self.index.search(query_embeddings, k)
+
+        top_m = self.config.index.pool_top_m if self.config.index.pooling == "topm" else 1
+        all_hits = []
+        for row_scores, row_indices in zip(scores, indices):
+            # 结果按得分降序，每个文件的第一个段落即最佳段落
+            passages: Dict[int, List[Tuple[float, int]]] = {}
+            for score, idx in zip(row_scores, row_indices):
+                if idx >= 0:
+                    doc_id, passage = divmod(int(idx), PASSAGE_ID_STRIDE)
+                    passages.setdefault(doc_id, []).append((float(score), passage))
+            pooled = [
+                (doc_id, sum(score for score, _ in hits[:top_m]) / len(hits[:top_m]), hits[0][1])
+                for doc_id, hits in passages.items()
+            ]
+            all_hits.append(heapq.nlargest(n, pooled, key=lambda hit: hit[1]))
+        return all_hits
+
+    def _rescored_search(self, query_embeddings: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Over-fetch candidates from the quantized index and re-rank them with float32 vectors"""
+        candidates = min(k * RESCORE_OVERSAMPLE, self.index.ntotal)
+        _, indices = self.index.search(query_embeddings, candidates)
+        return self.rescore_store.rerank(query_embeddings, indices, k)
+
+    def get_document(self, doc_id: int, passage: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Materialize a document with the character span of its matching passage"""
+        prompt_info = self.docstore.get(doc_id)
+        if prompt_info is None:
+            return None
+        prompt_info["relative_path"] = self.repo.get_relative_path(prompt_info["file_path"])
+        prompt_info["name"] = prompt_info["file_path"].name
+        prompt_info["match_start"] = prompt_info["match_end"] = None
+        if passage is not None:
+            spans = self.passages(prompt_info["content"])
+            if passage < len(spans):
+                prompt_info["match_start"], prompt_info["match_end"] = spans[passage]
+        return prompt_info
+
+    def get_info(self) -> Dict[str, Any]:
+        """获取分片信息"""
+        if self.index is None:
+            return {"path": str(self.repo_path), "status": "building" if self.build_pending else "not_built"}
+        spec = self.manifest["index"]
+        return {
+            "path": str(self.repo_path),
+            "status": "ready",
+            "generation": self.generations.leased.name if self.generations.leased else None,
+            "prompts": len(self.docstore),
+            "passages": self.index.ntotal,
+            "mmap": self.index.mapped,
+            "structure": spec["type"],
+            "structure_params": dict(spec["params"]),
+            "storage": spec.get("storage", "float32"),
+            "rescore": bool(spec.get("rescore")),
+            "reduction": self.projection.describe() if self.projection else None,
+        }
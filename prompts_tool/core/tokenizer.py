@@ -0,0 +1,79 @@
+"""Tokenizer module - CJK-aware tokenization for keyword search"""
+
+import re
+from typing import List
+
+# CJK 字符范围：日文假名、CJK 扩展 A、CJK 统一表意文字、兼容表意文字、韩文音节
+_CJK = "぀-ヿ㐀-䶿一-鿿豈-﫿가-힯"
+
+# 非 CJK 的单词（拉丁字母、数字、下划线及其他文字）
+_WORD_PATTERN = re.compile(f"[^\\W{_CJK}]+")
+# 相邻 CJK 字符二元组（零宽前瞻，一次 findall 得到所有重叠的二元组）
+_BIGRAM_PATTERN = re.compile(f"(?=([{_CJK}]{{2}}))")
+# 孤立的单个 CJK 字符
+_SINGLE_PATTERN = re.compile(f"(?<![{_CJK}])[{_CJK}](?![{_CJK}])")
+# 连续的 CJK 字符串
+_CJK_RUN_PATTERN = re.compile(f"[{_CJK}]+")
+
+SEGMENTERS = ("bigram", "jieba")
+
+
+class Tokenizer:
+    """Keyword tokenizer producing Latin word tokens and CJK tokens
+
+    CJK runs are split into overlapping character bigrams (a single isolated
+    character becomes a unigram). With the `jieba` segmenter, CJK runs are
+    segmented with the jieba dictionary instead, falling back to bigrams if
+    jieba is not installed. Token order is not preserved; the keyword index
+    only needs term frequencies.
+    """
+
+    def __init__(self, segmenter: str = "bigram"):
+        if segmenter not in SEGMENTERS:
+            print(f"警告: 未知的分词方式 {segmenter}，使用 bigram")
+            segmenter = "bigram"
+
+        self._jieba = None
+        if segmenter == "jieba":
+            try:
+                import jieba
+                jieba.setLogLevel(60)
+                self._jieba = jieba
+            except ImportError:
+                print("⚠️  未安装 jieba，使用 bigram 分词（pip install jieba）")
+                segmenter = "bigram"
+
+        self.segmenter = segmenter
+
+    @property
+    def name(self) -> str:
+        """Identifier stored with the index; a change forces a rebuild"""
+        return f"{self.segmenter}-v1"
+
+    def tokenize(self, text: str) -> List[str]:
+        """Split text into lowercase word tokens and CJK tokens"""
+        tokens = _WORD_PATTERN.findall(text.lower())
+        if self._jieba is None:
+            tokens.extend(_BIGRAM_PATTERN.findall(text))
+            tokens.extend(_SINGLE_PATTERN.findall(text))
+        else:
+            for run in _CJK_RUN_PATTERN.findall(text):
+                tokens.extend(
+                    word for word in self._jieba.cut_for_search(run) if word.strip()
+                )
+        return tokens
+
+    def substring_terms(self, text: str) -> List[str]:
+        """Tokens of `text` that some indexed token of any text containing it must contain
+
+        A text containing `text` as a (case-insensitive) substring has, for
+        each returned token, an indexed token containing it; the keyword
+        index uses this to rule out files for substring filters. CJK tokens
+        are only reliable with bigram segmentation (jieba may cut the
+        surrounding text differently).
+        """
+        terms = _WORD_PATTERN.findall(text.lower())
+        if self._jieba is None:
+            terms.extend(_BIGRAM_PATTERN.findall(text))
+            terms.extend(_SINGLE_PATTERN.findall(text))
+        return terms
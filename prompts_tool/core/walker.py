@@ -0,0 +1,115 @@
+"""File walker module - single-pass directory scan with ignore rules"""
+
+import os
+from fnmatch import fnmatchcase
+from pathlib import Path
+from typing import List, Iterator, Optional, Sequence, Tuple
+
+# 仓库根目录下的忽略规则文件
+IGNORE_FILE_NAME = ".promptsignore"
+
+
+class IgnoreRules:
+    """Ignore patterns loaded from a `.promptsignore` file
+
+    Supports a gitignore-style subset: `#` comments, a trailing `/` to match
+    directories only, a leading `/` to anchor to the root, and patterns with
+    a `/` matched against the relative path instead of the name.
+    """
+
+    def __init__(self, patterns: Optional[Sequence[str]] = None):
+        # (pattern, dir_only, match_path)
+        self.rules: List[Tuple[str, bool, bool]] = []
+        for pattern in patterns or []:
+            self.add(pattern)
+
+    @classmethod
+    def from_file(cls, ignore_file: Path) -> "IgnoreRules":
+        """从忽略文件加载规则，文件不存在时返回空规则"""
+        rules = cls()
+        try:
+            with open(ignore_file, "r", encoding="utf-8") as f:
+                for line in f:
+                    rules.add(line)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"警告: 无法读取忽略文件 {ignore_file}: {e}")
+        return rules
+
+    def add(self, pattern: str) -> None:
+        """Add a single pattern line"""
+        pattern = pattern.strip()
+        if not pattern or pattern.startswith("#"):
+            return
+
+        dir_only = pattern.endswith("/")
+        pattern = pattern.rstrip("/")
+        match_path = "/" in pattern
+        pattern = pattern.lstrip("/")
+        if pattern:
+            self.rules.append((pattern, dir_only, match_path))
+
+    def __bool__(self) -> bool:
+        return bool(self.rules)
+
+    def is_ignored(self, relative_path: str, name: str, is_dir: bool) -> bool:
+        """Check whether a path (relative to the root, `/`-separated) is ignored"""
+        for pattern, dir_only, match_path in self.rules:
+            if dir_only and not is_dir:
+                continue
+            target = relative_path if match_path else name
+            if fnmatchcase(target, pattern):
+                return True
+        return False
+
+
+def walk_prompt_files(
+    root: Path,
+    extensions: Sequence[str],
+    max_depth: Optional[int] = None,
+    ignore: Optional[IgnoreRules] = None,
+) -> Iterator[Path]:
+    """Walk a directory tree once, yielding files with any of the extensions
+
+    Hidden directories (including `.git`) and ignored directories are
+    pruned before descending; hidden files are matched like any other. `max_depth` limits how many directory levels below
+    the root are entered (0 = root only). Directory symlinks are not
+    followed to avoid cycles.
+    """
+    suffixes = tuple(extensions)
+    if ignore is None:
+        ignore = IgnoreRules.from_file(root / IGNORE_FILE_NAME)
+
+    # (目录路径, 相对路径前缀, 深度)
+    stack: List[Tuple[str, str, int]] = [(str(root), "", 0)]
+    while stack:
+        dir_path, prefix, depth = stack.pop()
+        try:
+            with os.scandir(dir_path) as it:
+                entries = list(it)
+        except OSError:
+            continue
+
+        for entry in entries:
+            name = entry.name
+            relative = prefix + name
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+            except OSError:
+                continue
+
+            if is_dir and name.startswith("."):
+                continue
+            if ignore and ignore.is_ignored(relative, name, is_dir):
+                continue
+
+            if is_dir:
+                if max_depth is None or depth < max_depth:
+                    stack.append((entry.path, relative + "/", depth + 1))
+            elif name.endswith(suffixes):
+                try:
+                    if entry.is_file():
+                        yield Path(entry.path)
+                except OSError:
+                    continue
@@ -122,6 +122,8 @@ def create_app():
                 st.success("✅ Index ready")
                 st.info(f"Prompts: {index_info['total_prompts']}")
                 st.info(f"Model: {index_info['model_name']}")
+            elif index_info["status"] == "building":
+                st.info("⏳ Index is being built by another process")
             else:
                 st.warning("⚠️ Index not built")
 
@@ -171,11 +173,13 @@ def create_app():
                     st.success(f"Found {len(results)} related prompts")
 
                     for i, result in enumerate(results):
+                        # 混合搜索的得分是倒数排名融合得分，不是余弦相似度
+                        label = "fused score (RRF)" if "keyword_rank" in result else "similarity"
                         with st.expander(
-                            f"#{result['rank']} {result['name']} (score: {result['score']:.3f})"
+                            f"#{result['rank']} {result['name']} ({label}: {result['score']:.3f})"
                         ):
                             st.markdown(f"**Path:** `{result['relative_path']}`")
-                            st.markdown(f"**Score:** {result['score']:.3f}")
+                            st.markdown(f"**{label.capitalize()}:** {result['score']:.3f}")
                             st.markdown("**Content:**")
                             st.code(result["content"])
 
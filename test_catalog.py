@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""Prompt catalog tests."""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Add project root to Python path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from test_fixtures import make_config, make_repo
+
+
+def test_catalog_warm_listing():
+    """Test that a warm listing does not re-read unchanged files."""
+    try:
+        from prompts_tool.core.repo import PromptRepo
+
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            make_repo(root)
+            config = make_config(root)
+
+            cold = PromptRepo(config).list_prompts(preview_lines=3)
+            assert config.get_catalog_path().exists()
+
+            repo = PromptRepo(config)
+            warm = repo.list_prompts(preview_lines=3)
+            stats = repo.catalog.get_stats()
+            assert stats["hits"] == 2 and stats["misses"] == 0, stats
+            assert [p["summary"] for p in warm] == [p["summary"] for p in cold]
+            assert warm[0]["preview"] == "First line | Write about {{topic}}"
+            assert warm[0]["variables"] == ["topic"]
+            print("✅ Warm listing served from catalog")
+
+            # Filtered listings read only files the keyword index cannot rule out
+            (root / "new.md").write_text("Not indexed yet, says hello\n", encoding="utf-8")
+            repo.refresh_keyword_index()
+            (root / "later.md").write_text("Also says hello\n", encoding="utf-8")
+            read = []
+            scan = repo.iter_prompt_contents
+
+            def recording_scan(files, *args, **kwargs):
+                files = list(files)
+                read.extend(f.name for f in files)
+                return scan(files, *args, **kwargs)
+
+            repo.iter_prompt_contents = recording_scan
+            found = [p["name"] for p in repo.list_prompts(filter_keyword="Hello")]
+            assert sorted(found) == ["b.md", "later.md", "new.md"], found
+            assert sorted(read) == ["b.md", "later.md", "new.md"], read
+            read.clear()
+            found = [p["name"] for p in repo.list_prompts(filter_keyword="RITE ABO")]
+            # b.md and new.md are ruled out; later.md is not indexed yet
+            assert found == ["a.txt"] and sorted(read) == ["a.txt", "later.md"], (found, read)
+            repo.iter_prompt_contents = scan
+            os.remove(root / "new.md")
+            os.remove(root / "later.md")
+            repo.list_prompts()
+            print("✅ Filtered listing skipped files ruled out by the keyword index")
+
+            # Changed files are re-read, deleted files are dropped
+            (root / "a.txt").write_text("Changed\n", encoding="utf-8")
+            os.remove(root / "sub" / "b.md")
+            repo = PromptRepo(config)
+            listing = repo.list_prompts()
+            stats = repo.catalog.get_stats()
+            assert stats["misses"] == 1 and stats["removed"] == 1, stats
+            assert listing[0]["summary"] == "Changed"
+            print("✅ Changed and deleted files detected")
+
+        return True
+    except Exception as e:
+        print(f"❌ Catalog test failed: {e}")
+        raise
+
+
+def main():
+    """Run all tests."""
+    print("🧪 Starting catalog tests...\n")
+
+    tests = [
+        ("Catalog warm listing", test_catalog_warm_listing),
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        print(f"🔍 Testing: {test_name}")
+        try:
+            if test_func():
+                passed += 1
+                print(f"✅ {test_name} passed\n")
+            else:
+                print(f"❌ {test_name} failed\n")
+        except Exception as e:
+            print(f"❌ {test_name} raised an exception: {e}\n")
+
+    print("=" * 50)
+    print(f"📊 Results: {passed}/{total} passed")
+
+    if passed == total:
+        print("🎉 All tests passed!")
+        return 0
+    else:
+        print("⚠️ Some tests failed")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
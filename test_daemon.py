@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Search daemon tests."""
+
+import sys
+import tempfile
+from pathlib import Path
+
+# Add project root to Python path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+
+def test_daemon_roundtrip():
+    """Test search, list and fill requests against a running daemon."""
+    try:
+        import threading
+        from test_fixtures import make_repo, make_config, make_searcher
+        from prompts_tool.core.daemon import SearchDaemon, DaemonClient
+
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            make_repo(root)
+            config = make_config(root)
+            config.daemon.socket_path = str(root / "d.sock")
+            config.daemon.refresh_interval = 0
+
+            assert DaemonClient.connect(config) is None
+            searcher = make_searcher(config)
+            daemon = SearchDaemon(config, searcher.repo, searcher)
+            thread = threading.Thread(target=daemon.serve_forever, daemon=True)
+            thread.start()
+
+            client = None
+            for _ in range(100):
+                client = DaemonClient.connect(config)
+                if client:
+                    break
+                threading.Event().wait(0.05)
+            assert client is not None, "daemon did not start"
+
+            results = client.search("topic", top_k=1)
+            assert results[0]["name"] == "a.txt" and isinstance(results[0]["file_path"], Path)
+            batched = client.search_many(["topic", "hello name"], top_k=1)
+            assert [r[0]["name"] for r in batched] == ["a.txt", "b.md"], batched
+            listing = client.list_prompts(preview_lines=2)
+            assert [p["name"] for p in listing] == ["a.txt", "b.md"]
+            filled = client.fill({"name": "Ada"}, file_path=root / "sub" / "b.md")
+            assert filled == {"content": "# Title\nHello Ada\n", "missing": []}
+            print("✅ Search, batched search, list and fill served by daemon")
+
+            client.request("shutdown")
+            client.close()
+            thread.join(timeout=5)
+            assert not thread.is_alive() and not (root / "d.sock").exists()
+            print("✅ Daemon shut down cleanly")
+
+        return True
+    except Exception as e:
+        print(f"❌ Daemon test failed: {e}")
+        raise
+
+
+def main():
+    """Run all tests."""
+    print("🧪 Starting daemon tests...\n")
+
+    tests = [
+        ("Daemon roundtrip", test_daemon_roundtrip),
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        print(f"🔍 Testing: {test_name}")
+        try:
+            if test_func():
+                passed += 1
+                print(f"✅ {test_name} passed\n")
+            else:
+                print(f"❌ {test_name} failed\n")
+        except Exception as e:
+            print(f"❌ {test_name} raised an exception: {e}\n")
+
+    print("=" * 50)
+    print(f"📊 Results: {passed}/{total} passed")
+
+    if passed == total:
+        print("🎉 All tests passed!")
+        return 0
+    else:
+        print("⚠️ Some tests failed")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""Shared fixtures for the test scripts: a small prompt repository and a stub encoder."""
+
+from pathlib import Path
+
+
+def make_repo(root: Path):
+    """Create a small prompt repository."""
+    (root / "sub").mkdir(parents=True)
+    (root / "a.txt").write_text("First line\n\nWrite about {{topic}}\n", encoding="utf-8")
+    (root / "sub" / "b.md").write_text("# Title\nHello {{name}}\n", encoding="utf-8")
+
+
+def make_config(root: Path):
+    from prompts_tool.core.config import Config, RepoConfig, CacheConfig
+    return Config(
+        repo=RepoConfig(local_paths=[str(root)]),
+        cache=CacheConfig(path=str(root / ".cache")),
+    )
+
+
+class HashingModel:
+    """Tiny deterministic encoder so tests do not download a real model."""
+
+    def __init__(self, dimension: int = 32):
+        self.dimension = dimension
+        self.encoded = 0
+
+    def get_sentence_embedding_dimension(self):
+        return self.dimension
+
+    def encode(self, texts, **kwargs):
+        import re
+        import zlib
+        import numpy as np
+
+        self.encoded += len(texts)
+        vectors = np.zeros((len(texts), self.dimension), dtype="float32")
+        for i, text in enumerate(texts):
+            for word in re.findall(r"\w+", text.lower()):
+                vectors[i, zlib.crc32(word.encode()) % self.dimension] += 1.0
+            vectors[i, 0] += 0.01
+        return vectors
+
+
+def load_hashing_model(config, onnx_path=None, threads=None):
+    """Encoder loader for spawned encode pool workers."""
+    return HashingModel()
+
+
+def make_searcher(config):
+    """Create a searcher using the hashing model."""
+    from prompts_tool.core.repo import PromptRepo
+    from prompts_tool.core.search import PromptSearcher
+
+    class TestSearcher(PromptSearcher):
+        def _init_model(self):
+            self.model = HashingModel()
+
+    return TestSearcher(config, PromptRepo(config))
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""BM25 keyword search tests."""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Add project root to Python path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from test_fixtures import make_config, make_repo
+
+
+def test_keyword_search():
+    """Test BM25 ranking and incremental index updates."""
+    try:
+        from prompts_tool.core.repo import PromptRepo
+
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            make_repo(root)
+            (root / "pytest-fixture.md").write_text(
+                "Write a pytest fixture for {{resource}}\npytest fixture scope\n",
+                encoding="utf-8",
+            )
+            config = make_config(root)
+
+            repo = PromptRepo(config)
+            results = repo.search_prompts("pytest fixture", top_k=2)
+            assert results and results[0]["name"] == "pytest-fixture.md", results
+            assert "{{resource}}" in results[0]["content"]
+            print(f"✅ Top hit: {results[0]['name']} ({results[0]['score']:.3f})")
+
+            # Warm refresh does not re-index unchanged files
+            repo = PromptRepo(config)
+            assert repo.refresh_keyword_index() == {"updated": 0, "removed": 0}
+
+            (root / "a.txt").write_text("pytest pytest pytest fixture\n", encoding="utf-8")
+            os.remove(root / "sub" / "b.md")
+            assert repo.refresh_keyword_index() == {"updated": 1, "removed": 1}
+            assert repo.search_prompts("hello", top_k=5) == []
+            assert repo.keyword_index.get_stats()["documents"] == 2
+            print("✅ Incremental keyword index update")
+
+        return True
+    except Exception as e:
+        print(f"❌ Keyword search test failed: {e}")
+        raise
+
+
+def test_cjk_tokenization():
+    """Test CJK bigram tokenization and Chinese natural-language queries."""
+    try:
+        from prompts_tool.core.repo import PromptRepo
+        from prompts_tool.core.tokenizer import Tokenizer
+
+        tokens = Tokenizer().tokenize("请为 Python 函数编写文档字符串。好")
+        for expected in ["python", "函数", "文档", "字符", "符串", "好"]:
+            assert expected in tokens, (expected, tokens)
+        assert "函数编写文档字符串" not in tokens
+        print(f"✅ Tokens: {tokens}")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            make_repo(root)
+            (root / "docstring.txt").write_text(
+                "请为以下 Python 函数编写一个清晰的文档字符串：\n函数名：{{function_name}}\n",
+                encoding="utf-8",
+            )
+            (root / "review.md").write_text("请对以下代码进行全面的代码审查\n", encoding="utf-8")
+
+            repo = PromptRepo(make_config(root))
+            results = repo.search_prompts("帮我写一个 Python 函数的文档字符串", top_k=3)
+            assert results and results[0]["name"] == "docstring.txt", results
+            print(f"✅ Chinese query top hit: {results[0]['name']}")
+
+        return True
+    except Exception as e:
+        print(f"❌ CJK tokenization test failed: {e}")
+        raise
+
+
+def test_query_pruning():
+    """Test skipping of very common terms and throttled index refreshes."""
+    try:
+        from prompts_tool.core.keyword import KeywordIndex, MIN_SKIPPED_DF
+        from prompts_tool.core.repo import PromptRepo
+
+        with tempfile.TemporaryDirectory() as tmp:
+            index = KeywordIndex(Path(tmp) / "keyword.sqlite")
+            count = MIN_SKIPPED_DF + 200
+            index.update(
+                (f"doc{i}.md", str(i), ["common", f"word{i}"]) for i in range(count)
+            )
+            assert index.get_stats()["terms"] == count + 1
+
+            # "common" is in every document: only the rare term is scored
+            results = index.search("common word7", top_k=10)
+            assert [path for path, _ in results] == ["doc7.md"], results
+            # A query made only of common terms still matches
+            assert len(index.search("common", top_k=10)) == 10
+
+            index.update([], removed=[f"doc{i}.md" for i in range(count - 2)])
+            stats = index.get_stats()
+            assert stats["documents"] == 2 and stats["terms"] == 3, stats
+            assert len(index.search("common", top_k=10)) == 2
+            index.close()
+            print("✅ Common terms skipped, document frequencies maintained")
+
+            root = Path(tmp) / "repo"
+            make_repo(root)
+            config = make_config(root)
+            config.keyword.refresh_interval = 3600
+            repo = PromptRepo(config)
+            assert repo.search_prompts("hello", top_k=5)
+            (root / "sub" / "b.md").write_text("# Title\nGoodbye\n", encoding="utf-8")
+            # Within the interval the last scan is reused
+            assert repo.search_prompts("hello", top_k=5)
+            config.keyword.refresh_interval = 0
+            assert repo.search_prompts("hello", top_k=5) == []
+            print("✅ Keyword index refresh throttled")
+
+        return True
+    except Exception as e:
+        print(f"❌ Query pruning test failed: {e}")
+        raise
+
+
+def main():
+    """Run all tests."""
+    print("🧪 Starting keyword search tests...\n")
+
+    tests = [
+        ("Keyword search", test_keyword_search),
+        ("CJK tokenization", test_cjk_tokenization),
+        ("Query pruning", test_query_pruning),
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        print(f"🔍 Testing: {test_name}")
+        try:
+            if test_func():
+                passed += 1
+                print(f"✅ {test_name} passed\n")
+            else:
+                print(f"❌ {test_name} failed\n")
+        except Exception as e:
+            print(f"❌ {test_name} raised an exception: {e}\n")
+
+    print("=" * 50)
+    print(f"📊 Results: {passed}/{total} passed")
+
+    if passed == total:
+        print("🎉 All tests passed!")
+        return 0
+    else:
+        print("⚠️ Some tests failed")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""Parallel content loader tests."""
+
+import sys
+import tempfile
+from pathlib import Path
+
+# Add project root to Python path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+
+def test_parallel_loading():
+    """Test that the thread-pool loader streams contents in input order."""
+    try:
+        from prompts_tool.core.config import Config, RepoConfig
+        from prompts_tool.core.repo import PromptRepo
+
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            files = []
+            for i in range(50):
+                path = root / f"p{i:02d}.txt"
+                path.write_text(f"prompt {i}", encoding="utf-8")
+                files.append(path)
+            missing = root / "missing.txt"
+
+            config = Config(repo=RepoConfig(local_paths=[str(root)], load_workers=4))
+            repo = PromptRepo(config)
+            pairs = list(repo.iter_prompt_contents(files + [missing]))
+
+            assert [p for p, _ in pairs] == files + [missing]
+            assert [c for _, c in pairs[:50]] == [f"prompt {i}" for i in range(50)]
+            assert pairs[-1][1] == ""
+            stats = repo.last_load_stats
+            assert stats.files == 51 and stats.bytes == sum(len(f"prompt {i}") for i in range(50))
+            print(f"✅ Loaded {stats.summary()}")
+
+            # Stopping early must not hang or leak reads
+            first = next(iter(repo.iter_prompt_contents(files, workers=2)))
+            assert first == (files[0], "prompt 0")
+            print("✅ Early stop handled")
+
+        return True
+    except Exception as e:
+        print(f"❌ Parallel loading test failed: {e}")
+        raise
+
+
+def main():
+    """Run all tests."""
+    print("🧪 Starting loader tests...\n")
+
+    tests = [
+        ("Parallel loading", test_parallel_loading),
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        print(f"🔍 Testing: {test_name}")
+        try:
+            if test_func():
+                passed += 1
+                print(f"✅ {test_name} passed\n")
+            else:
+                print(f"❌ {test_name} failed\n")
+        except Exception as e:
+            print(f"❌ {test_name} raised an exception: {e}\n")
+
+    print("=" * 50)
+    print(f"📊 Results: {passed}/{total} passed")
+
+    if passed == total:
+        print("🎉 All tests passed!")
+        return 0
+    else:
+        print("⚠️ Some tests failed")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,1039 @@
+#!/usr/bin/env python3
+"""Semantic search index tests."""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Add project root to Python path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from test_fixtures import HashingModel, load_hashing_model, make_config, make_repo, make_searcher
+
+
+def test_incremental_index():
+    """Test that only changed files are re-encoded after a rebuild."""
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            make_repo(root)
+            (root / "c.txt").write_text("Review this code carefully\n", encoding="utf-8")
+            config = make_config(root)
+
+            searcher = make_searcher(config)
+            assert searcher.ensure_index()
+            assert searcher.model.encoded == 3
+            print("✅ Initial build encoded 3 prompts")
+
+            # A fresh process only encodes the edited file and drops the deleted one
+            (root / "c.txt").write_text("Summarize this article\n", encoding="utf-8")
+            os.remove(root / "sub" / "b.md")
+            searcher = make_searcher(config)
+            assert searcher.ensure_index()
+            assert searcher.model.encoded == 1, searcher.model.encoded
+            assert searcher.shards[0].index.ntotal == 2
+            results = searcher.search("summarize article", top_k=1)
+            assert results[0]["name"] == "c.txt", results
+            print("✅ Incremental refresh encoded 1 prompt")
+
+            searcher = make_searcher(config)
+            assert searcher.ensure_index() and searcher.model.encoded == 0
+            assert searcher.get_index_info()["mmap"]
+            assert searcher.search("summarize article", top_k=1)[0]["name"] == "c.txt"
+            print("✅ Unchanged repository needs no encoding and is searched via mmap")
+
+        return True
+    except Exception as e:
+        print(f"❌ Incremental index test failed: {e}")
+        raise
+
+
+def test_embedding_cache():
+    """Test that rebuilds reuse cached embeddings and the LRU cap holds."""
+    try:
+        import numpy as np
+        from prompts_tool.core.embed_cache import EmbeddingCache
+
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            make_repo(root)
+            config = make_config(root)
+
+            searcher = make_searcher(config)
+            assert searcher.ensure_index() and searcher.model.encoded == 2
+            assert searcher.rebuild_index()
+            assert searcher.model.encoded == 2, searcher.model.encoded
+            stats = searcher.embedding_cache.get_stats()
+            assert stats["hits"] == 2 and stats["entries"] == 2, stats
+            print(f"✅ Rebuild served from cache (hit rate {stats['hit_rate']:.0%})")
+
+            cache = EmbeddingCache(root / "lru", "test-model", max_entries=3)
+            vectors = np.arange(12, dtype="float32").reshape(4, 3)
+            cache.put_many(["a", "b", "c"], vectors[:3])
+            cache.get_many(["a"])
+            cache.put_many(["d"], vectors[3:])
+            found = cache.get_many(["a", "b", "c", "d"])
+            assert sorted(found) == ["a", "c", "d"], sorted(found)
+            assert np.array_equal(found["d"], vectors[3])
+            assert cache.get_stats()["evictions"] == 1
+            cache.close()
+            print("✅ Least recently used entry evicted")
+
+        return True
+    except Exception as e:
+        print(f"❌ Embedding cache test failed: {e}")
+        raise
+
+
+def test_docstore():
+    """Test the memory-mapped document store across updates and compaction."""
+    try:
+        from prompts_tool.core.docstore import DocStore
+
+        with tempfile.TemporaryDirectory() as tmp:
+            store = DocStore(Path(tmp))
+            assert not store.open()
+            store.update([(0, "/p/a.txt", "Alpha 你好"), (1, "/p/b.txt", "Beta")])
+            store.update([(2, "/p/c.txt", "Gamma")], removed_ids=[1])
+
+            reopened = DocStore(Path(tmp))
+            assert reopened.open() and len(reopened) == 2
+            assert reopened.get(0) == {"file_path": Path("/p/a.txt"), "content": "Alpha 你好"}
+            assert 1 not in reopened and reopened.get_path(2) == "/p/c.txt"
+            print("✅ Documents survive reopen; removed IDs are gone")
+
+            # Dropping most documents rewrites the blob without the garbage
+            store.update([], removed_ids=[0])
+            assert store.get(2)["content"] == "Gamma"
+            stats = store.get_stats()
+            assert stats["blob_bytes"] == len("/p/c.txtGamma"), stats
+            assert len(list(Path(tmp).glob("docs.*"))) == 3
+            print("✅ Blob compacted and old generations removed")
+
+        return True
+    except Exception as e:
+        print(f"❌ Document store test failed: {e}")
+        raise
+
+
+def test_index_structure():
+    """Test that the index structure follows corpus size and survives removals."""
+    try:
+        import numpy as np
+        from prompts_tool.core import ann
+        from prompts_tool.core.config import IndexConfig
+
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            make_repo(root)
+            for i in range(4):
+                (root / f"extra{i}.txt").write_text(f"Topic number {i} about item{i}\n", encoding="utf-8")
+            config = make_config(root)
+            config.index = IndexConfig(flat_max_vectors=5, hnsw_max_vectors=1000)
+
+            searcher = make_searcher(config)
+            assert searcher.ensure_index()
+            info = searcher.get_index_info()["shards"][0]
+            assert info["structure"] == "hnsw" and info["structure_params"]["efSearch"] == 64, info
+            print(f"✅ 6 prompts indexed with HNSW {info['structure_params']}")
+
+            # HNSW cannot remove vectors; the graph is rebuilt without them
+            os.remove(root / "extra3.txt")
+            searcher = make_searcher(config)
+            assert searcher.ensure_index() and searcher.shards[0].index.ntotal == 5
+            assert searcher.search("Topic number 2 about item2", top_k=1)[0]["name"] == "extra2.txt"
+            print("✅ Deleted prompt dropped from the HNSW graph")
+
+            # Falling below the threshold switches back to an exact index
+            os.remove(root / "extra2.txt")
+            searcher = make_searcher(config)
+            assert searcher.ensure_index() and searcher.get_index_info()["shards"][0]["structure"] == "flat"
+            print("✅ Small corpus switched back to flat")
+
+        spec = ann.choose_index_spec(2_000_000, 384, IndexConfig())
+        assert spec["type"] == "ivfpq" and 384 % spec["params"]["pq_m"] == 0, spec
+
+        rng = np.random.default_rng(0)
+        vectors = rng.standard_normal((3000, 32), dtype=np.float32)
+        spec = {"type": "ivfpq", "factory": "IVF64,PQ8", "params": {"nlist": 64, "pq_m": 8, "nprobe": 64}}
+        index = ann.create_index(spec, 32, vectors)
+        index.add_with_ids(vectors, np.arange(100, 3100, dtype="int64"))
+        assert index.search(vectors[:1], 1)[1][0][0] == 100
+        extracted, ids = ann.extract_vectors(index)
+        assert sorted(ids) == list(range(100, 3100)) and extracted.shape == (3000, 32)
+        print("✅ IVF-PQ trained, searched and extracted")
+
+        return True
+    except Exception as e:
+        print(f"❌ Index structure test failed: {e}")
+        raise
+
+
+def test_quantized_storage():
+    """Test float16 / SQ8 storage with float32 re-scoring kept in sync with updates."""
+    try:
+        import numpy as np
+        from prompts_tool.core.config import IndexConfig
+
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            make_repo(root)
+            for i in range(6):
+                (root / f"extra{i}.txt").write_text(f"Topic number {i} about item{i}\n", encoding="utf-8")
+            config = make_config(root)
+            config.search.mode = "vector"
+            query = "Topic number 4 about item4"
+
+            exact = make_searcher(config).search(query, top_k=3)
+
+            config.index = IndexConfig(storage="sq8")
+            searcher = make_searcher(config)
+            rescored = searcher.search(query, top_k=3)
+            info = searcher.get_index_info()["shards"][0]
+            assert info["storage"] == "sq8" and info["rescore"], info
+            assert [r["name"] for r in rescored] == [r["name"] for r in exact]
+            assert np.allclose([r["score"] for r in rescored], [r["score"] for r in exact], atol=1e-5)
+            assert len(searcher.shards[0].rescore_store) == searcher.shards[0].index.ntotal
+            print("✅ SQ8 index re-scored with float32 vectors matches the exact ranking")
+
+            # Updates keep the float32 vectors in step, and a reload maps them
+            os.remove(root / "extra5.txt")
+            (root / "extra0.txt").write_text("Topic number 0 changed\n", encoding="utf-8")
+            searcher = make_searcher(config)
+            assert searcher.ensure_index()
+            assert len(searcher.shards[0].rescore_store) == searcher.shards[0].index.ntotal == 7
+            searcher = make_searcher(config)
+            assert searcher._load_index() and searcher.shards[0].rescore_store.is_open
+            assert searcher.search(query, top_k=1)[0]["name"] == "extra4.txt"
+            print("✅ Rescore vectors follow incremental updates and reload")
+
+            # Without rescoring the float32 copy is removed
+            config.index = IndexConfig(storage="float16", rescore=False)
+            (root / "extra1.txt").write_text("Topic number 1 changed\n", encoding="utf-8")
+            searcher = make_searcher(config)
+            assert searcher.ensure_index()
+            info = searcher.get_index_info()["shards"][0]
+            assert info["storage"] == "float16" and not info["rescore"], info
+            assert not searcher.shards[0].rescore_store.path.exists()
+            assert searcher.search(query, top_k=1)[0]["name"] == "extra4.txt"
+            print("✅ float16 storage without rescoring")
+
+            # Small updates go to the delta / tombstone files; the table is compacted later
+            from prompts_tool.core.rescore import RescoreStore
+            rng = np.random.default_rng(0)
+            vectors = rng.standard_normal((100, 8)).astype("float32")
+            store = RescoreStore(root / "rescore")
+            store.write(vectors, np.arange(100))
+            table_inode = store.path.stat().st_ino
+            store.update(vectors[:1] * 2, [100], removed_ids=[3, 7])
+            assert store.path.stat().st_ino == table_inode and len(store) == 99
+            found_vectors, found = store.lookup(np.array([3, 4, 100]))
+            assert found.tolist() == [False, True, True]
+            assert np.allclose(found_vectors[2], vectors[0] * 2)
+            chunk_ids = np.concatenate([ids for _, ids in store.iter_chunks(chunk_rows=16)])
+            assert sorted(chunk_ids) == [i for i in range(101) if i not in (3, 7)]
+            assert len(store.sample(10)) == 10
+            store.update(vectors[:30], range(200, 230))
+            assert store.path.stat().st_ino != table_inode and store.get_stats()["pending"] == 0
+            reopened = RescoreStore(root / "rescore")
+            assert reopened.open() and len(reopened) == 129
+            assert np.allclose(reopened.lookup(np.array([229]))[0][0], vectors[29])
+            print("✅ Rescore updates append a delta and compact once it outgrows the table")
+
+        return True
+    except Exception as e:
+        print(f"❌ Quantized storage test failed: {e}")
+        raise
+
+
+def test_reduction():
+    """Test PCA / truncation projections stored with the index and applied to queries."""
+    try:
+        import numpy as np
+        from prompts_tool.core.projection import Projection
+
+        rng = np.random.default_rng(0)
+        basis = rng.standard_normal((4, 16)).astype("float32")
+        vectors = rng.standard_normal((200, 4)).astype("float32") @ basis
+        pca = Projection.fit("pca", vectors, 4)
+        assert pca.explained_variance(vectors) > 0.999
+        projected = pca.apply(vectors)
+        assert projected.shape == (200, 4) and np.allclose(np.linalg.norm(projected, axis=1), 1, atol=1e-5)
+        assert Projection.fit("pca", vectors[:3], 8).components.shape == (16, 8)
+        assert np.allclose(Projection.fit("truncate", vectors, 3).apply(vectors[:1])[0],
+                           vectors[0, :3] / np.linalg.norm(vectors[0, :3]), atol=1e-6)
+        print("✅ Rank-4 data keeps all variance in 4 PCA dimensions")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            make_repo(root)
+            for i in range(6):
+                (root / f"extra{i}.txt").write_text(f"Topic number {i} about item{i}\n", encoding="utf-8")
+            config = make_config(root)
+            config.search.mode = "vector"
+            config.index.reduce = "pca"
+            config.index.reduce_dim = 16
+
+            searcher = make_searcher(config)
+            assert searcher.search("Topic number 3 about item3", top_k=1)[0]["name"] == "extra3.txt"
+            assert searcher.shards[0].index.d == 16
+            assert searcher.get_index_info()["shards"][0]["reduction"] == {"method": "pca", "input_dim": 32, "dim": 16}
+
+            # The saved projection is applied to queries and new documents after a reload
+            (root / "extra6.txt").write_text("Completely different zebra text\n", encoding="utf-8")
+            searcher = make_searcher(config)
+            assert searcher.ensure_index() and searcher.shards[0].projection is not None
+            assert searcher.search("Completely different zebra text", top_k=1)[0]["name"] == "extra6.txt"
+            print("✅ PCA projection saved with the index and applied to queries")
+
+            config.index.reduce = "truncate"
+            searcher = make_searcher(config)
+            assert not searcher._load_index()
+            print("✅ Changing the reduction forces a rebuild")
+
+        # A basis fit on a tiny corpus is refit once the corpus has doubled
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            make_repo(root)
+            config = make_config(root)
+            config.search.mode = "vector"
+            config.index.reduce = "pca"
+            config.index.reduce_dim = 16
+
+            searcher = make_searcher(config)
+            assert searcher.ensure_index()
+            projection = searcher.shards[0].projection
+            assert projection.fit_count == 2
+            assert np.count_nonzero(np.abs(projection.components).sum(axis=0)) == 2
+
+            for i in range(6):
+                (root / f"grown{i}.txt").write_text(f"Grown topic {i} about subject{i}\n", encoding="utf-8")
+            searcher = make_searcher(config)
+            assert searcher.ensure_index()
+            projection = searcher.shards[0].projection
+            assert projection.fit_count == 8 and searcher.shards[0].index.ntotal == 8
+            assert np.count_nonzero(np.abs(projection.components).sum(axis=0)) > 2
+            assert searcher.search("Grown topic 4 about subject4", top_k=1)[0]["name"] == "grown4.txt"
+
+            searcher = make_searcher(config)
+            assert searcher.ensure_index() and searcher.model.encoded == 0
+            assert searcher.shards[0].projection.fit_count == 8
+            print("✅ PCA refit after the corpus grew past the fitted size")
+
+        return True
+    except Exception as e:
+        print(f"❌ Reduction test failed: {e}")
+        raise
+
+
+def test_numpy_backend():
+    """Test the NumPy index reads / writes FAISS flat files and serves search without faiss."""
+    try:
+        import faiss
+        import numpy as np
+        from prompts_tool.core import ann, npindex
+
+        rng = np.random.default_rng(0)
+        vectors = rng.standard_normal((300, 24)).astype("float32")
+        npindex.normalize_L2(vectors)
+        queries = vectors[:5] + 0.1
+        ids = np.arange(300, dtype="int64") * 7
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "prompts.index"
+            reference = faiss.IndexIDMap(faiss.IndexFlatIP(24))
+            reference.add_with_ids(vectors, ids)
+            expected_scores, expected_ids = reference.search(queries, 10)
+
+            faiss.write_index(reference, str(path))
+            mapped = npindex.read_index(path)
+            assert isinstance(mapped.vectors, np.memmap) and mapped.ntotal == 300
+            scores, found = mapped.search(queries, 10)
+            assert (found == expected_ids).all() and np.allclose(scores, expected_scores, atol=1e-5)
+
+            npindex.write_index(mapped.copy(), path)
+            scores, found = faiss.read_index(str(path)).search(queries, 10)
+            assert (found == expected_ids).all()
+            _, padded = mapped.search(queries[:1], 400)
+            assert (padded[0, 300:] == -1).all()
+        print("✅ NumPy index and FAISS read each other's flat index files")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            make_repo(root)
+            config = make_config(root)
+            config.search.mode = "vector"
+            config.index.type = "hnsw"
+            config.index.storage = "sq8"
+            assert make_searcher(config).ensure_index()
+
+            ann.HAS_FAISS = False
+            try:
+                # HNSW / SQ8 files fall back to the saved float32 vectors
+                searcher = make_searcher(config)
+                assert searcher.search("hello name", top_k=1)[0]["name"] == "b.md"
+                assert searcher.shards[0].index.name == "numpy"
+
+                (root / "c.md").write_text("Summarize the zebra migration\n", encoding="utf-8")
+                searcher = make_searcher(config)
+                assert searcher.search("zebra migration", top_k=1)[0]["name"] == "c.md"
+                assert searcher.shards[0].manifest["index"]["factory"] == "IDMap,Flat"
+            finally:
+                ann.HAS_FAISS = True
+            print("✅ Search without faiss, index rewritten as a flat file")
+
+            config.index.type = "flat"
+            config.index.storage = "float32"
+            searcher = make_searcher(config)
+            assert searcher._load_index() and searcher.shards[0].index.name == "faiss"
+            assert searcher.search("zebra migration", top_k=1)[0]["name"] == "c.md"
+            print("✅ FAISS loads the index written by the NumPy backend")
+
+        return True
+    except Exception as e:
+        print(f"❌ NumPy backend test failed: {e}")
+        raise
+
+
+def test_backends():
+    """Run every installed vector backend through the same conformance checks."""
+    try:
+        import numpy as np
+        from prompts_tool.core.backends import available_backends, select_backend
+        from prompts_tool.core.config import IndexConfig
+        from prompts_tool.core.npindex import normalize_L2
+
+        rng = np.random.default_rng(0)
+        vectors = rng.standard_normal((200, 16)).astype("float32")
+        normalize_L2(vectors)
+        ids = np.arange(200, dtype="int64") * 3 + 1
+
+        for name, backend_type in available_backends().items():
+            spec = backend_type.choose_spec(150, 16, IndexConfig())
+            index = backend_type.build(spec, vectors[:150], ids[:150])
+            assert (index.ntotal, index.d) == (150, 16), name
+            _, found = index.search(vectors[:5], 3)
+            assert (found[:, 0] == ids[:5]).all(), name
+            _, padded = index.search(vectors[:1], 160)
+            assert (padded[0, 150:] == -1).all() and (padded[0, :150] >= 0).all(), name
+
+            index.add(vectors[150:], ids[150:])
+            assert index.ntotal == 200 and index.search(vectors[199:], 1)[1][0, 0] == ids[199], name
+            if index.remove(ids[:10]):
+                assert index.ntotal == 190 and not np.isin(index.search(vectors[:10], 5)[1], ids[:10]).any(), name
+            stored, stored_ids = index.vectors()
+            assert len(stored) == len(stored_ids) == index.ntotal, name
+
+            with tempfile.TemporaryDirectory() as tmp:
+                path = Path(tmp) / "prompts.index"
+                index.save(path)
+                reopened = backend_type.open(path, spec)
+                assert reopened.ntotal == index.ntotal, name
+                assert (reopened.search(vectors[20:25], 5)[1] == index.search(vectors[20:25], 5)[1]).all(), name
+                reopened.make_writable(path)
+                reopened.add(vectors[:1], np.array([10_000], dtype="int64"))
+                assert reopened.ntotal == index.ntotal + 1 and reopened.stats()["backend"] == name, name
+            print(f"✅ {name} backend passed the conformance checks")
+
+        assert select_backend("numpy").name == "numpy"
+        assert select_backend("auto").name in available_backends()
+
+        # The searcher keeps the configured backend and rebuilds when its file format changes
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            make_repo(root)
+            config = make_config(root)
+            config.search.mode = "vector"
+            for name in available_backends():
+                config.index.backend = name
+                searcher = make_searcher(config)
+                assert searcher.search("hello name", top_k=1)[0]["name"] == "b.md", name
+                assert searcher.get_index_info()["index_type"] == name
+            if "hnswlib" in available_backends():
+                config.index.backend = "numpy"
+                assert not make_searcher(config)._load_index()
+        print("✅ Searcher runs on every installed backend")
+
+        if "hnswlib" in available_backends():
+            # hnswlib marks changed vectors deleted and rebuilds past the configured ratio
+            with tempfile.TemporaryDirectory() as tmp:
+                root = Path(tmp)
+                make_repo(root)
+                config = make_config(root)
+                config.cache.enabled = False
+                config.search.mode = "vector"
+                config.index.backend = "hnswlib"
+                config.index.rebuild_deleted_ratio = 0.5
+                assert make_searcher(config).ensure_index()
+
+                (root / "a.txt").write_text("Translate the zebra manual\n", encoding="utf-8")
+                searcher = make_searcher(config)
+                assert searcher.ensure_index()
+                shard = searcher.shards[0]
+                assert (shard.index.ntotal, shard.index.deleted_count) == (2, 1)
+                assert "zebra" in searcher.search("zebra manual", top_k=1)[0]["content"]
+                reloaded = make_searcher(config)
+                assert reloaded.ensure_index() and reloaded.shards[0].index.deleted_count == 1
+
+                (root / "a.txt").write_text("Summarize the giraffe report\n", encoding="utf-8")
+                assert searcher.refresh_index()
+                assert (shard.index.ntotal, shard.index.deleted_count) == (2, 0)
+                assert "giraffe" in searcher.search("giraffe report", top_k=1)[0]["content"]
+            print("✅ hnswlib removals marked deleted, graph rebuilt past the threshold")
+        return True
+    except Exception as e:
+        print(f"❌ Backend test failed: {e}")
+        raise
+
+
+def test_shards():
+    """Test one index shard per configured path, refreshed independently and merged at search time."""
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            team_a, team_b = root / "team_a", root / "team_b"
+            make_repo(team_a)
+            team_b.mkdir()
+            (team_b / "deploy.md").write_text("Deploy the zebra service to production\n", encoding="utf-8")
+            config = make_config(team_a)
+            config.repo.local_paths = [str(team_a), str(team_b)]
+            config.cache.enabled = False
+            config.search.mode = "vector"
+
+            searcher = make_searcher(config)
+            assert searcher.ensure_index()
+            assert [shard.index.ntotal for shard in searcher.shards] == [2, 1]
+            assert (team_b / ".prompts_index" / "CURRENT").exists()
+            results = searcher.search("zebra service production", top_k=3)
+            assert results[0]["name"] == "deploy.md" and len(results) == 3, results
+            assert [r["score"] for r in results] == sorted((r["score"] for r in results), reverse=True)
+            assert searcher.search("zebra service", top_k=2, mode="hybrid")[0]["name"] == "deploy.md"
+            print("✅ Two shards searched in parallel and merged")
+
+            # Changing one repository only re-encodes its shard
+            (team_b / "deploy.md").write_text("Deploy the zebra service to staging\n", encoding="utf-8")
+            searcher = make_searcher(config)
+            assert searcher.ensure_index() and searcher.model.encoded == 1
+            print("✅ Only the changed shard was re-encoded")
+
+            # A newly configured path costs only its own embeddings
+            team_c = root / "team_c"
+            team_c.mkdir()
+            (team_c / "budget.txt").write_text("Review the quarterly budget\n", encoding="utf-8")
+            (team_c / "notes.txt").write_text("Summarize meeting notes\n", encoding="utf-8")
+            config.repo.local_paths.append(str(team_c))
+            searcher = make_searcher(config)
+            assert searcher.ensure_index() and searcher.model.encoded == 2
+            assert searcher.search("quarterly budget", top_k=1)[0]["name"] == "budget.txt"
+            info = searcher.get_index_info()
+            assert len(info["shards"]) == 3 and info["total_prompts"] == 5, info
+            print("✅ Added path indexed without touching existing shards")
+
+        return True
+    except Exception as e:
+        print(f"❌ Shard test failed: {e}")
+        raise
+
+
+def test_generations():
+    """Test atomic generation publishing, reader leases and garbage collection."""
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            make_repo(root)
+            config = make_config(root)
+            config.cache.enabled = False
+            config.search.mode = "vector"
+            index_dir = root / ".prompts_index"
+
+            def generations():
+                return sorted(path.name for path in index_dir.glob("gen-*"))
+
+            reader = make_searcher(config)
+            assert reader.ensure_index()
+            assert (index_dir / "CURRENT").read_text() == "gen-000001"
+            assert not (index_dir / "manifest.json").exists()
+            assert reader.get_index_info()["shards"][0]["generation"] == "gen-000001"
+            print("✅ First build published as gen-000001")
+
+            # A writer publishes a new generation while the reader keeps its own
+            (root / "a.txt").write_text("Translate the zebra manual\n", encoding="utf-8")
+            writer = make_searcher(config)
+            assert writer.ensure_index() and writer.model.encoded == 1
+            assert (index_dir / "CURRENT").read_text() == "gen-000002"
+            assert generations() == ["gen-000001", "gen-000002"]
+            assert reader.search("zebra manual", top_k=1)[0]["name"] == "a.txt"
+            assert "Write about" in reader.search("Write about topic", top_k=1)[0]["content"]
+            print("✅ Reader keeps serving the leased generation during the swap")
+
+            # The reader switches over on its next refresh; the old generation is then collected
+            encoded = reader.model.encoded
+            assert reader.refresh_index() and reader.model.encoded == encoded
+            assert "zebra" in reader.search("zebra manual", top_k=1)[0]["content"]
+            assert writer.shards[0].generations.collect() == 1
+            assert generations() == ["gen-000002"]
+            print("✅ Released generation garbage-collected")
+
+            # A failed update leaves the published generation untouched
+            (root / "a.txt").write_text("Describe the giraffe habitat\n", encoding="utf-8")
+
+            def crash(texts, hashes):
+                raise RuntimeError("simulated crash")
+
+            writer.shards[0].encode = crash
+            assert not writer.refresh_index()
+            assert (index_dir / "CURRENT").read_text() == "gen-000002"
+            assert generations() == ["gen-000002"]
+            print("✅ Aborted build left the published generation intact")
+
+            # Rebuilding writes a fresh generation; the leased one survives until released
+            rebuilt = make_searcher(config)
+            assert rebuilt.rebuild_index()
+            assert (index_dir / "CURRENT").read_text() == "gen-000003"
+            assert "giraffe" in rebuilt.search("giraffe habitat", top_k=1)[0]["content"]
+            assert "gen-000002" in generations()
+            for searcher in (reader, writer):
+                searcher.shards[0].reset()
+            rebuilt.shards[0].generations.collect()
+            assert generations() == ["gen-000003"]
+            print("✅ Rebuild published without removing the index in use")
+
+        return True
+    except Exception as e:
+        print(f"❌ Generation test failed: {e}")
+        raise
+
+
+def test_build_lock():
+    """Test the inter-process build lock: exclusion, stale locks and waiting builders."""
+    try:
+        import json
+        import socket
+        import subprocess
+        import threading
+        import time
+        from prompts_tool.core.buildlock import BuildLock
+
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            lock_path = root / "build.lock"
+
+            holder = BuildLock(lock_path, stale_seconds=0.3)
+            assert holder.acquire()
+            other = BuildLock(lock_path, stale_seconds=0.3)
+            assert not other.acquire(timeout=0.5)
+            assert other.holder()["pid"] == os.getpid()
+            print("✅ Second builder times out while the lock is held (heartbeat kept it fresh)")
+            holder.release()
+            assert not lock_path.exists() and other.acquire()
+            other.release()
+
+            # A lock left by a dead process is taken over immediately
+            dead = subprocess.Popen([sys.executable, "-c", "pass"])
+            dead.wait()
+            lock_path.write_text(json.dumps({"pid": dead.pid, "host": socket.gethostname(), "token": "x"}))
+            assert other.acquire()
+            other.release()
+            print("✅ Lock of a dead process broken")
+
+            # A lock from another host is broken once its heartbeat stops
+            lock_path.write_text(json.dumps({"pid": 1, "host": "elsewhere", "token": "y"}))
+            assert not other.acquire(timeout=0.1)
+            past = time.time() - 60
+            os.utime(lock_path, (past, past))
+            assert other.acquire()
+            other.release()
+            print("✅ Lock without heartbeat broken")
+
+            make_repo(root)
+            config = make_config(root)
+            config.cache.enabled = False
+            config.index.build_lock_timeout = 0.2
+            shard_lock = BuildLock(root / ".prompts_index" / "build.lock")
+
+            # While another process builds, searches are answered from the keyword index
+            assert shard_lock.acquire()
+            searcher = make_searcher(config)
+            results = searcher.search("topic", top_k=2)
+            assert results and results[0]["name"] == "a.txt", results
+            assert searcher.model.encoded == 0 and searcher.shards[0].build_pending
+            assert searcher.get_index_info()["status"] == "building"
+            # Later queries only try the lock, without waiting or rescanning the files
+            config.index.build_lock_timeout = 30
+            scan = searcher.repo.get_prompt_files_by_path
+            searcher.repo.get_prompt_files_by_path = None
+            start = time.monotonic()
+            assert searcher.search("topic", top_k=2)[0]["name"] == "a.txt"
+            assert time.monotonic() - start < 5 and searcher.shards[0].build_pending
+            searcher.repo.get_prompt_files_by_path = scan
+            print("✅ Pending build checked without blocking")
+            shard_lock.release()
+            assert searcher.search("topic", top_k=1, mode="vector")[0]["name"] == "a.txt"
+            print("✅ Keyword results served while the lock was held elsewhere")
+
+            # A waiting process picks up the generation built by the lock holder
+            (root / "a.txt").write_text("Translate the zebra manual\n", encoding="utf-8")
+            builder, waiter = make_searcher(config), make_searcher(config)
+            encode = builder.model.encode
+
+            def slow_encode(texts, **kwargs):
+                time.sleep(0.5)
+                return encode(texts, **kwargs)
+
+            builder.model.encode = slow_encode
+            thread = threading.Thread(target=builder.ensure_index)
+            thread.start()
+            time.sleep(0.2)
+            assert waiter.ensure_index()
+            thread.join()
+            assert builder.model.encoded == 1 and waiter.model.encoded == 0
+            assert "zebra" in waiter.search("zebra manual", top_k=1, mode="vector")[0]["content"]
+            print("✅ Waiting process reused the concurrent build instead of encoding again")
+
+        return True
+    except Exception as e:
+        print(f"❌ Build lock test failed: {e}")
+        raise
+
+
+def test_hybrid_search():
+    """Test that hybrid search fuses BM25 and vector hits with per-retriever scores."""
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            make_repo(root)
+            (root / "fixtures.md").write_text("Explain this pytest fixture setup\n", encoding="utf-8")
+            config = make_config(root)
+
+            searcher = make_searcher(config)
+            results = searcher.search("pytest fixture", top_k=3)
+            top = results[0]
+            assert top["name"] == "fixtures.md", results
+            assert top["keyword_rank"] == 1 and top["vector_rank"] == 1, top
+            assert top["score"] == 2 / (config.search.rrf_k + 1)
+            print(f"✅ Hybrid top hit fused from both retrievers (score {top['score']:.4f})")
+
+            # Prompts missed by one retriever keep None for its score
+            others = [r for r in results[1:] if r["keyword_rank"] is None]
+            assert others and all(r["vector_score"] is not None for r in others), results
+            print("✅ Vector-only hits report no keyword score")
+
+            vector_only = searcher.search("pytest fixture", top_k=3, mode="vector")
+            assert "keyword_rank" not in vector_only[0] and vector_only[0]["name"] == "fixtures.md"
+            print("✅ Vector mode unchanged")
+
+            try:
+                searcher.search("pytest fixture", mode="hybird")
+            except ValueError:
+                print("✅ Unknown search mode rejected")
+            else:
+                raise AssertionError("unknown search mode was accepted")
+
+        return True
+    except Exception as e:
+        print(f"❌ Hybrid search test failed: {e}")
+        raise
+
+
+def test_search_many():
+    """Test that batched search matches per-query search and keeps input order."""
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            make_repo(root)
+            (root / "fixtures.md").write_text("Explain this pytest fixture setup\n", encoding="utf-8")
+            config = make_config(root)
+
+            searcher = make_searcher(config)
+            queries = ["pytest fixture", "hello name", "write about topic"]
+            for mode in ("vector", "hybrid"):
+                batched = searcher.search_many(queries, top_k=2, mode=mode)
+                assert len(batched) == len(queries)
+                for query, results in zip(queries, batched):
+                    single = searcher.search(query, top_k=2, mode=mode)
+                    assert [r["name"] for r in results] == [r["name"] for r in single], (query, mode)
+            assert [r[0]["name"] for r in batched] == ["fixtures.md", "b.md", "a.txt"], batched
+            assert searcher.search_many([]) == []
+            print("✅ search_many results aligned with single searches")
+
+            # Without the query cache every query is encoded again
+            config.cache.query_max_entries = 0
+            searcher = make_searcher(config)
+            assert searcher.ensure_index()
+            encoded = searcher.model.encoded
+            searcher.search_many(queries, top_k=2, mode="vector")
+            assert searcher.model.encoded == encoded + len(queries)
+            print("✅ Each query encoded exactly once")
+
+        return True
+    except Exception as e:
+        print(f"❌ Batched search test failed: {e}")
+        raise
+
+
+def test_query_cache():
+    """Test that repeated queries skip the encoder, also after a restart."""
+    try:
+        import time
+        from prompts_tool.core.query_cache import QueryCache
+
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            make_repo(root)
+            config = make_config(root)
+
+            searcher = make_searcher(config)
+            assert searcher.ensure_index()
+            encoded = searcher.model.encoded
+            first = searcher.search("Hello  Name", top_k=1)
+            again = searcher.search_many(["hello name", " HELLO name "], top_k=1)
+            assert searcher.model.encoded == encoded + 1, searcher.model.encoded - encoded
+            assert first[0]["name"] == again[0][0]["name"] == again[1][0]["name"] == "b.md"
+            stats = searcher.get_index_info()["query_cache"]
+            assert stats["hits"] == 1 and stats["misses"] == 1 and stats["entries"] == 1, stats
+            print("✅ Normalized repeat served from the query cache")
+
+            # New entries are written after the save delay or when the searcher closes
+            cache_file = config.get_query_cache_path()
+            assert not cache_file.exists()
+            searcher.close()
+            assert cache_file.exists()
+
+            restarted = make_searcher(config)
+            assert restarted.search("hello name", top_k=1)[0]["name"] == "b.md"
+            assert restarted.model.encoded == 0
+            print("✅ Persisted query cache hit after restart")
+
+            config.cache.query_save_delay = 0.1
+            delayed = make_searcher(config)
+            written = cache_file.stat().st_mtime_ns
+            delayed.search("write about topic", top_k=1)
+            delayed.search("first line", top_k=1)
+            deadline = time.monotonic() + 5
+            while cache_file.stat().st_mtime_ns == written and time.monotonic() < deadline:
+                time.sleep(0.05)
+            reloaded = QueryCache(config.model.name, path=cache_file)
+            reloaded.load()
+            assert len(reloaded) == 3, len(reloaded)
+            print("✅ Query cache saved after the debounce delay")
+
+            config.cache.query_max_entries = 2
+            bounded = make_searcher(config)
+            for query in ("one", "two", "three"):
+                bounded.search(query, top_k=1)
+            assert len(bounded.query_cache) == 2
+            print("✅ Query cache bounded by LRU")
+
+        return True
+    except Exception as e:
+        print(f"❌ Query cache test failed: {e}")
+        raise
+
+
+def test_passages():
+    """Test that long prompts are split into passages and the tail is searchable."""
+    try:
+        from prompts_tool.core.chunker import split_passages
+
+        text = "".join(f"Line {i} filler words here\n" for i in range(100))
+        spans = split_passages(text, max_chars=300, overlap=60)
+        assert spans[0][0] == 0 and spans[-1][1] == len(text)
+        assert all(b[0] < a[1] for a, b in zip(spans, spans[1:])), "passages should overlap"
+        assert all(text[s - 1] == "\n" for s, _ in spans[1:]), "passages should start at a line"
+        assert split_passages("short") == [(0, 5)] and split_passages("   ") == []
+        print(f"✅ {len(text)} chars split into {len(spans)} overlapping passages")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            make_repo(root)
+            long_text = text + "Finally translate the quarterly zebra report\n"
+            (root / "long.md").write_text(long_text, encoding="utf-8")
+            config = make_config(root)
+            config.index.chunk_chars = 300
+            config.index.chunk_overlap = 60
+
+            searcher = make_searcher(config)
+            result = searcher.search("translate quarterly zebra report", top_k=1, mode="vector")[0]
+            assert result["name"] == "long.md", result["name"]
+            passage = result["content"][result["match_start"]:result["match_end"]]
+            assert "zebra" in passage and result["match_start"] > 0, passage
+            passages = searcher.shards[0].manifest["files"][str(root / "long.md")]["passages"]
+            assert passages > 1 and searcher.shards[0].index.ntotal == passages + 2
+            print(f"✅ Tail passage matched ({passages} passages indexed for long.md)")
+
+            # Changing the passage size invalidates the index
+            config.index.chunk_chars = 500
+            searcher = make_searcher(config)
+            assert not searcher._load_index()
+            print("✅ Chunking change forces a rebuild")
+
+        return True
+    except Exception as e:
+        print(f"❌ Passage test failed: {e}")
+        raise
+
+
+def test_batch_encoder():
+    """Test length-sorted batching keeps order, respects the token budget and calibrates."""
+    try:
+        import numpy as np
+        from prompts_tool.core.batching import BatchEncoder, plan_batches, token_lengths
+
+        model = HashingModel()
+        texts = [f"prompt {i} " + "word " * (i % 97 * 13) for i in range(600)]
+        lengths = token_lengths(model, texts)
+        order = sorted(range(len(texts)), key=lambda i: -lengths[i])
+        batches = plan_batches(order, lengths, 2048)
+        assert sorted(i for b in batches for i in b) == list(range(len(texts)))
+        assert all(max(lengths[i] for i in b) * len(b) <= 2048 or len(b) == 1 for b in batches)
+        print(f"✅ {len(texts)} texts planned into {len(batches)} batches within 2048 tokens")
+
+        encoder = BatchEncoder(model, memory_mb=16)
+        embeddings = encoder.encode(texts)
+        assert np.allclose(embeddings, model.encode(texts)), "order not restored"
+        assert encoder.batch_tokens > 0, "budget was not calibrated"
+        stats = encoder.stats
+        assert stats["texts"] == len(texts) and stats["tokens_per_second"] > 0
+        print(f"✅ Calibrated {stats['batch_tokens']} tokens/batch, "
+              f"{stats['tokens_per_second']:.0f} tokens/s, padding {stats['padding']:.0%}")
+
+        # 固定预算时跳过校准
+        fixed = BatchEncoder(model, memory_mb=64, batch_tokens=4096)
+        assert np.allclose(fixed.encode(texts[:10]), embeddings[:10])
+        assert fixed.stats["batch_tokens"] == 4096
+        print("✅ Fixed batch budget is used as configured")
+        return True
+    except Exception as e:
+        print(f"❌ Batch encoder test failed: {e}")
+        raise
+
+
+def test_encode_pool():
+    """Test that multi-process encoding matches single-process embeddings in order."""
+    try:
+        import numpy as np
+        from prompts_tool.core.batching import token_lengths
+        from prompts_tool.core.config import ModelConfig
+        from prompts_tool.core.encode_pool import EncodePool, plan_shards
+
+        model = HashingModel()
+        texts = [f"prompt {i} " + "word " * (i % 37 * 9) for i in range(300)]
+        lengths = token_lengths(model, texts)
+        shards = plan_shards(lengths, 8)
+        assert len(shards) <= 8 and sorted(i for s in shards for i in s) == list(range(len(texts)))
+        totals = [sum(lengths[i] for i in s) for s in shards]
+        print(f"✅ {len(texts)} texts in {len(shards)} shards ({min(totals)}-{max(totals)} tokens)")
+
+        with EncodePool(ModelConfig(), workers=2, threads=1, loader=load_hashing_model) as pool:
+            embeddings = pool.encode(texts, lengths)
+        assert np.allclose(embeddings, model.encode(texts)), "embeddings differ or out of order"
+        stats = pool.stats
+        assert stats["workers"] == 2 and stats["texts"] == len(texts)
+        print(f"✅ 2 workers encoded {stats['texts']} texts, "
+              f"{stats['tokens_per_second']:.0f} tokens/s")
+        return True
+    except Exception as e:
+        print(f"❌ Encode pool test failed: {e}")
+        raise
+
+
+def test_encoders():
+    """Test encoder backend selection, pooling and that search does not import torch eagerly."""
+    try:
+        import subprocess
+        import numpy as np
+        from prompts_tool.core.config import ModelConfig
+        from prompts_tool.core.encoders import load_encoder, pool_embeddings
+
+        hidden = np.arange(2 * 3 * 4, dtype="float32").reshape(2, 3, 4)
+        mask = np.array([[1, 1, 0], [1, 0, 0]])
+        mean = pool_embeddings(hidden, mask, "mean", normalize=False)
+        assert np.allclose(mean[0], hidden[0, :2].mean(axis=0)) and np.allclose(mean[1], hidden[1, 0])
+        assert np.allclose(pool_embeddings(hidden, mask, "cls", normalize=False), hidden[:, 0])
+        assert np.allclose(pool_embeddings(hidden, mask, "max", normalize=False)[0], hidden[0, 1])
+        assert np.allclose(np.linalg.norm(pool_embeddings(hidden, mask), axis=1), 1.0)
+        print("✅ mean / cls / max pooling match SentenceTransformer semantics")
+
+        # Stub SentenceTransformer so the fallback does not load a real model
+        import types
+        from unittest import mock
+
+        class StubSentenceTransformer:
+            def __init__(self, name, device=None):
+                self.name, self.device = name, device
+
+        stub = types.ModuleType("sentence_transformers")
+        stub.SentenceTransformer = StubSentenceTransformer
+        with tempfile.TemporaryDirectory() as tmp, \
+                mock.patch.dict(sys.modules, {"sentence_transformers": stub}):
+            model = load_encoder(ModelConfig(name="stub-model", backend="onnx"), Path(tmp) / "missing")
+        assert isinstance(model, StubSentenceTransformer) and model.name == "stub-model", model
+        print("✅ Missing ONNX model falls back to the torch backend")
+
+        output = subprocess.run(
+            [sys.executable, "-c",
+             "import sys, prompts_tool.core.search; print('sentence_transformers' in sys.modules)"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+        assert output == "False", "search module imports sentence_transformers eagerly"
+        print("✅ Importing the search module does not load sentence-transformers / torch")
+        return True
+    except Exception as e:
+        print(f"❌ Encoder test failed: {e}")
+        raise
+
+
+def main():
+    """Run all tests."""
+    print("🧪 Starting semantic search tests...\n")
+
+    tests = [
+        ("Incremental index", test_incremental_index),
+        ("Embedding cache", test_embedding_cache),
+        ("Document store", test_docstore),
+        ("Index structure", test_index_structure),
+        ("Quantized storage", test_quantized_storage),
+        ("Reduction", test_reduction),
+        ("NumPy backend", test_numpy_backend),
+        ("Backends", test_backends),
+        ("Shards", test_shards),
+        ("Generations", test_generations),
+        ("Build lock", test_build_lock),
+        ("Hybrid search", test_hybrid_search),
+        ("Batched search", test_search_many),
+        ("Query cache", test_query_cache),
+        ("Passages", test_passages),
+        ("Batch encoder", test_batch_encoder),
+        ("Encode pool", test_encode_pool),
+        ("Encoders", test_encoders),
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        print(f"🔍 Testing: {test_name}")
+        try:
+            if test_func():
+                passed += 1
+                print(f"✅ {test_name} passed\n")
+            else:
+                print(f"❌ {test_name} failed\n")
+        except Exception as e:
+            print(f"❌ {test_name} raised an exception: {e}\n")
+
+    print("=" * 50)
+    print(f"📊 Results: {passed}/{total} passed")
+
+    if passed == total:
+        print("🎉 All tests passed!")
+        return 0
+    else:
+        print("⚠️ Some tests failed")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
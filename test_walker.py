@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Prompt file walker tests."""
+
+import sys
+import tempfile
+from pathlib import Path
+
+# Add project root to Python path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+
+def test_walker_pruning():
+    """Test extension matching, pruning, ignore rules and depth limit."""
+    try:
+        from prompts_tool.core.walker import walk_prompt_files
+
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            for rel in [
+                "a.txt", "b.md", "c.prompt", "skip.py", ".hidden.txt",
+                ".git/objects/x.txt", ".cache/y.md", "drafts/d.txt",
+                "docs/e.md", "docs/deep/f.md", "notes/scratch.txt",
+            ]:
+                path = root / rel
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_text("x", encoding="utf-8")
+            (root / ".promptsignore").write_text(
+                "# comment\ndrafts/\nnotes/scratch.txt\n", encoding="utf-8"
+            )
+
+            exts = [".txt", ".md", ".prompt"]
+            found = sorted(
+                str(p.relative_to(root)) for p in walk_prompt_files(root, exts)
+            )
+            assert found == [".hidden.txt", "a.txt", "b.md", "c.prompt", "docs/deep/f.md", "docs/e.md"], found
+            print(f"✅ Walk result: {found}")
+
+            shallow = sorted(
+                str(p.relative_to(root)) for p in walk_prompt_files(root, exts, max_depth=1)
+            )
+            assert shallow == [".hidden.txt", "a.txt", "b.md", "c.prompt", "docs/e.md"], shallow
+            print("✅ Depth limit respected")
+
+        return True
+    except Exception as e:
+        print(f"❌ Walker test failed: {e}")
+        raise
+
+
+def main():
+    """Run all tests."""
+    print("🧪 Starting walker tests...\n")
+
+    tests = [
+        ("Walker pruning", test_walker_pruning),
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        print(f"🔍 Testing: {test_name}")
+        try:
+            if test_func():
+                passed += 1
+                print(f"✅ {test_name} passed\n")
+            else:
+                print(f"❌ {test_name} failed\n")
+        except Exception as e:
+            print(f"❌ {test_name} raised an exception: {e}\n")
+
+    print("=" * 50)
+    print(f"📊 Results: {passed}/{total} passed")
+
+    if passed == total:
+        print("🎉 All tests passed!")
+        return 0
+    else:
+        print("⚠️ Some tests failed")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())